@@ -0,0 +1,237 @@
+import os
+import json
+import requests
+import numpy as np
+from functools import lru_cache
+from datetime import datetime, timedelta
+from sqlalchemy import select, func
+from models import db, WeatherRequest, WeatherAlert
+from live_updates import location_id
+
+# Rule-based severe-weather alerts over every tracked location.
+#
+# Each cycle reads only the latest payload of every distinct location, skips
+# payloads older than ALERT_MAX_AGE_SECONDS and forecast days before today,
+# packs the rest into NumPy feature matrices (locations x forecast days) and evaluates
+# every rule as one vectorized comparison. Firings are deduplicated against
+# weather_alerts (one row per location and rule), and notifications are rate
+# limited per location.
+
+ALERT_INTERVAL_SECONDS = int(os.getenv("ALERT_INTERVAL_SECONDS", "600"))
+# the same alert is not re-sent within this long, even if it clears and fires again
+ALERT_COOLDOWN_SECONDS = int(os.getenv("ALERT_COOLDOWN_SECONDS", "21600"))
+ALERT_RATE_LIMIT = int(os.getenv("ALERT_RATE_LIMIT", "3"))  # notifications per location per window
+ALERT_RATE_WINDOW_SECONDS = int(os.getenv("ALERT_RATE_WINDOW_SECONDS", "3600"))
+ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")
+# payloads stored longer ago than this are not evaluated; their alerts clear
+ALERT_MAX_AGE_SECONDS = int(os.getenv("ALERT_MAX_AGE_SECONDS", "86400"))
+
+# (rule, group, severity, feature, comparison, threshold, message). Within a group
+# rules run most severe first and a location gets only the first one that fires.
+ALERT_RULES = [
+    ("extreme_heat", "heat", "warning", "temp_max", ">=", 40.0, "Extreme heat, highs near {value:.0f}°C"),
+    ("heat", "heat", "advisory", "temp_max", ">=", 35.0, "Heat advisory, highs near {value:.0f}°C"),
+    ("hard_freeze", "cold", "warning", "temp_min", "<=", -10.0, "Hard freeze, lows near {value:.0f}°C"),
+    ("frost", "cold", "advisory", "temp_min", "<=", 0.0, "Frost likely, lows near {value:.0f}°C"),
+    # Beaufort 8 (gale) and 6 (strong breeze)
+    ("gale", "wind", "warning", "wind_speed", ">=", 17.2, "Gale-force wind at {value:.0f} m/s"),
+    ("strong_wind", "wind", "advisory", "wind_speed", ">=", 10.8, "Strong wind at {value:.0f} m/s"),
+    ("dense_fog", "visibility", "warning", "visibility", "<=", 0.2, "Dense fog, visibility {value:.1f} km"),
+    ("low_visibility", "visibility", "advisory", "visibility", "<=", 1.0, "Low visibility, {value:.1f} km"),
+    ("tornado", "storm", "warning", "condition", "in", ("Tornado", "Squall"), "Tornado or squall conditions"),
+    ("thunderstorm", "storm", "warning", "condition", "in", ("Thunderstorm",), "Thunderstorms forecast"),
+    ("snow", "precipitation", "advisory", "condition", "in", ("Snow",), "Snow forecast"),
+    ("dust", "air", "advisory", "condition", "in", ("Dust", "Sand", "Ash", "Smoke"), "Dust, sand, ash or smoke in the air"),
+]
+SEVERITY_ORDER = {"warning": 0, "advisory": 1}
+
+CONDITIONS = ["Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Snow", "Mist", "Smoke", "Haze",
+              "Dust", "Fog", "Sand", "Ash", "Squall", "Tornado"]
+CONDITION_CODES = {name: i for i, name in enumerate(CONDITIONS)}
+
+def _condition(entry):
+    main = entry.get("main_condition") or entry.get("main") or (entry.get("weather") or [{}])[0].get("main")
+    return CONDITION_CODES.get(main, -1)
+
+FORECAST_DAYS = 5
+
+@lru_cache(maxsize=1024)
+def _date_of(dt):
+    return datetime.utcfromtimestamp(dt).strftime("%Y-%m-%d") if dt else None
+
+def _day_of(entry):
+    return entry.get("date") or _date_of(entry.get("dt"))
+
+def build_features(payloads, today=None):
+    """Feature matrices for a list of weather payloads (rows = locations).
+
+    Forecast days before today (UTC by default) are dropped. Values are gathered
+    into flat, fixed-width lists and converted with one np.array call per feature.
+    """
+    n = len(payloads)
+    today = today or datetime.utcnow().strftime("%Y-%m-%d")
+    missing = [{}] * FORECAST_DAYS
+    temp_max, temp_min, conditions, wind, visibility, days = [], [], [], [], [], []
+    codes = CONDITION_CODES.get
+    for weather in payloads:
+        daily = [d for d in weather.get("daily") or [] if (_day_of(d) or today) >= today][:FORECAST_DAYS]
+        current = weather.get("current") or {}
+        days.append((current.get("dt"), daily))
+        daily = daily + missing[len(daily):]
+        for d in daily:
+            temp = d.get("temp") or missing[0]
+            temp_max.append(temp.get("max", np.nan))
+            temp_min.append(temp.get("min", np.nan))
+        conditions.append(_condition(current))
+        conditions.extend(codes(d.get("main_condition") or d.get("main") or (d.get("weather") or missing)[0].get("main"), -1)
+                          for d in daily)
+        wind.append(current.get("wind_speed", np.nan))
+        visibility.append(current.get("visibility", np.nan))
+    shape = (n, FORECAST_DAYS)
+    return {
+        # the int is the column of the first forecast day; condition column 0 is the current observation
+        "temp_max": (np.array(temp_max, dtype=float).reshape(shape), 0),
+        "temp_min": (np.array(temp_min, dtype=float).reshape(shape), 0),
+        "condition": (np.array(conditions, dtype=np.int16).reshape(n, FORECAST_DAYS + 1), 1),
+        "wind_speed": (np.array(wind, dtype=float).reshape(n, 1), 1),
+        "visibility": (np.array(visibility, dtype=float).reshape(n, 1), 1),
+        "days": days,
+    }
+
+def _cell_date(days, row, day):
+    """Date of a feature cell: day < 0 is the current observation, otherwise a forecast day"""
+    current_dt, daily = days[row]
+    if day < 0:
+        return _date_of(current_dt)
+    if day < len(daily):
+        return _day_of(daily[day])
+    return None
+
+def evaluate(features, rules=ALERT_RULES):
+    """Fired alerts as (row, rule, date, value) with the first day each rule fires per row"""
+    fired = []
+    taken = {}
+    for rule, group, severity, feature, op, threshold, message in rules:
+        matrix, first_day = features[feature]
+        if op == "in":
+            mask = np.isin(matrix, [CONDITION_CODES[c] for c in threshold])
+        else:
+            with np.errstate(invalid="ignore"):
+                mask = matrix >= threshold if op == ">=" else matrix <= threshold
+        hit = mask.any(axis=1)
+        if group in taken:
+            hit &= ~taken[group]
+            taken[group] |= hit
+        else:
+            taken[group] = hit.copy()
+        rows = np.flatnonzero(hit)
+        if not len(rows):
+            continue
+        days = mask[rows].argmax(axis=1)
+        values = matrix[rows, days]
+        for row, day, value in zip(rows.tolist(), days.tolist(), values.tolist()):
+            fired.append((row, rule, _cell_date(features["days"], row, day - first_day),
+                          None if op == "in" else float(value)))
+    return fired
+
+RULES_BY_ID = {r[0]: r for r in ALERT_RULES}
+
+def tracked_locations(now=None):
+    """Latest stored payload per distinct location as (key, name, request id, weather), if within ALERT_MAX_AGE_SECONDS"""
+    oldest = (now or datetime.utcnow()) - timedelta(seconds=ALERT_MAX_AGE_SECONDS)
+    # only the newest row of each ~100 m cell (location_id's grid) is read and decoded
+    newest = func.row_number().over(
+        partition_by=(func.round(WeatherRequest.lat, 3), func.round(WeatherRequest.lon, 3)),
+        order_by=(WeatherRequest.updated_at.desc(), WeatherRequest.id.desc())).label("newest")
+    ranked = (select(WeatherRequest.id, WeatherRequest.lat, WeatherRequest.lon, WeatherRequest.resolved_name,
+                     WeatherRequest.weather_json, WeatherRequest.updated_at, newest)
+              .where(WeatherRequest.lat.isnot(None), WeatherRequest.lon.isnot(None)).subquery())
+    query = (select(ranked.c.id, ranked.c.lat, ranked.c.lon, ranked.c.resolved_name, ranked.c.weather_json)
+             .where(ranked.c.newest == 1, ranked.c.updated_at >= oldest).order_by(ranked.c.updated_at))
+    latest = {}
+    for rec_id, lat, lon, name, weather_json in db.session.execute(query):
+        key = location_id(lat, lon)
+        latest[key] = (key, name, rec_id, weather_json)
+    locations = []
+    for key, name, rec_id, weather_json in latest.values():
+        try:
+            locations.append((key, name, rec_id, json.loads(weather_json or "{}")))
+        except ValueError:
+            continue
+    return locations
+
+def send_notifications(alerts):
+    """Deliver newly raised alerts to ALERT_WEBHOOK_URL, or the log when none is configured"""
+    if not alerts:
+        return
+    if ALERT_WEBHOOK_URL:
+        try:
+            requests.post(ALERT_WEBHOOK_URL, json={"alerts": alerts}, timeout=10).raise_for_status()
+            return
+        except Exception as e:
+            print(f"Alert webhook failed, logging instead: {e}")
+    for alert in alerts:
+        print(f"ALERT [{alert['severity']}] {alert['location']}: {alert['message']}")
+
+def run_alert_cycle(now=None, notify=send_notifications):
+    """Evaluate every tracked location, update weather_alerts and send rate-limited notifications"""
+    now = now or datetime.utcnow()
+    locations = tracked_locations(now)
+    fired = evaluate(build_features([weather for *_, weather in locations], today=now.strftime("%Y-%m-%d")))
+
+    rows = {(a.location_key, a.rule): a for a in WeatherAlert.query.all()}
+    seen = set()
+    for row, rule_id, target_date, value in fired:
+        key, name, rec_id, _ = locations[row]
+        rule = RULES_BY_ID[rule_id]
+        alert = rows.get((key, rule_id))
+        if alert is None:
+            alert = rows[(key, rule_id)] = WeatherAlert(location_key=key, rule=rule_id)
+            db.session.add(alert)
+        if not alert.active or alert.first_seen is None:
+            alert.active, alert.first_seen = True, now
+        message = rule[6].format(value=value) if value is not None else rule[6]
+        alert.location_name, alert.request_id, alert.severity = name, rec_id, rule[2]
+        alert.target_date, alert.value, alert.last_seen = target_date, value, now
+        alert.message = f"{message} on {target_date}" if target_date else message
+        seen.add((key, rule_id))
+
+    # includes locations that are stale or no longer stored at all
+    cleared = 0
+    for (key, rule_id), alert in rows.items():
+        if alert.active and (key, rule_id) not in seen:
+            alert.active = False
+            cleared += 1
+
+    # notify each activation once, most severe first, within the per-location budget
+    window_start = now - timedelta(seconds=ALERT_RATE_WINDOW_SECONDS)
+    cooldown = timedelta(seconds=ALERT_COOLDOWN_SECONDS)
+    sent_recently = {}
+    for alert in rows.values():
+        if alert.notified_at and alert.notified_at >= window_start:
+            sent_recently[alert.location_key] = sent_recently.get(alert.location_key, 0) + 1
+    pending = [a for a in rows.values() if a.active and (a.notified_at is None or a.notified_at < a.first_seen)]
+    pending.sort(key=lambda a: (SEVERITY_ORDER.get(a.severity, 9), a.first_seen))
+    outgoing = []
+    for alert in pending:
+        if alert.notified_at and now - alert.notified_at < cooldown:
+            continue
+        if sent_recently.get(alert.location_key, 0) >= ALERT_RATE_LIMIT:
+            continue
+        sent_recently[alert.location_key] = sent_recently.get(alert.location_key, 0) + 1
+        alert.notified_at = now
+        outgoing.append(alert.to_dict())
+    db.session.commit()
+    notify(outgoing)
+    return {"locations": len(locations), "fired": len(fired), "cleared": cleared,
+            "notified": len(outgoing), "suppressed": len(pending) - len(outgoing)}
+
+def active_alerts(severity=None, location_key=None):
+    query = WeatherAlert.query.filter_by(active=True)
+    if severity:
+        query = query.filter_by(severity=severity)
+    if location_key:
+        query = query.filter_by(location_key=location_key)
+    alerts = query.all()
+    alerts.sort(key=lambda a: (SEVERITY_ORDER.get(a.severity, 9), a.location_name or "", a.target_date or ""))
+    return [a.to_dict() for a in alerts]
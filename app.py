@@ -1,17 +1,55 @@
-from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, flash
-from models import db, WeatherRequest
-from utils import ai_chat_response, geocode_location, reverse_geocode, get_weather
+from flask import Flask, render_template, request, redirect, url_for, jsonify, send_file, flash, session, abort, Response
+from models import db, WeatherRequest, ensure_columns, WITHOUT_PAYLOAD
+from utils import ai_chat_response, geocode_location, reverse_geocode, get_weather, get_weather_or_stale, invalidate_chat_answers, chat_cache_stats
+from utils import ai_generate_summary, stream_summary, restrict_to_dates, refilter_weather, get_current_observation
+from conversation import get_conversation_store
 from export_utils import export_as_csv, export_as_markdown, export_as_json
+from derived_utils import store_weather, refresh_derived, load_derived, is_stale, compute_derived, payload_hash
+from edit_utils import EditTimer, edit_stats
+from resilience import Deadline, UpstreamUnavailable, DeadlineExceeded, RETRY_AFTER_SECONDS, breaker_stats, last_known
+from profiling import PROFILE_TOKEN, PROFILE_MAX_SECONDS, install_profiler, capture, collapsed_text, flamegraph_svg, write_profile
+from memwatch import memory_watch, start_tracing
+from assets import install_assets, asset_version, fetch_vendor, build_assets
+import utils
+from db_profile import configure_app, install_pragmas, WriteBehindQueue
+from compression import init_storage, train_dictionary
+from retention import RETENTION_DAYS, prune_old_records, recompress_records, compact, storage_stats
+from http_cache import make_etag, record_etag, record_last_modified, is_not_modified, apply_validators, not_modified
+from streaming import sse_event, sse_response, sentence_chunks, SharedStreams
+from live_updates import LiveHub, LIVE_HEARTBEAT_SECONDS, location_id, covers_today
+from alerts import ALERT_INTERVAL_SECONDS, run_alert_cycle, active_alerts
+from ingest import INGEST_BATCH_SIZE, INGEST_GEOCODE_WORKERS, INGEST_WEATHER_WORKERS, INGEST_SUMMARY_WORKERS, run_ingest
+from timeseries import (COLLECTOR_INTERVAL_SECONDS, init_timeseries, record_observation, collection_targets,
+                        collect_once, query_observations, query_rollups, GRANULARITIES)
 from dotenv import load_dotenv
-import os, json, io
-from datetime import datetime
+import os, json, io, uuid, time, hmac
+import click
+from datetime import datetime, timezone
 load_dotenv()
 
 app = Flask(__name__)
 app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv("DATABASE_URL", "sqlite:///weather.db")
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = os.getenv("SECRET_KEY", "devkey")
+# group concurrent /create inserts into batched transactions (useful with threaded workers)
+app.config['SQLITE_WRITE_BATCHING'] = os.getenv("SQLITE_WRITE_BATCHING", "0") == "1"
+# redirect from /create straight away and stream the summary into the view page
+app.config['SUMMARY_STREAMING'] = os.getenv("SUMMARY_STREAMING", "1") == "1"
+configure_app(app)
+install_profiler(app)
+install_assets(app)
 db.init_app(app)
+with app.app_context():
+    install_pragmas(db.engine)
+
+_write_queue = None
+
+def get_write_queue():
+    """Lazily start the write-behind queue in this worker, if enabled"""
+    global _write_queue
+    if _write_queue is None and app.config['SQLITE_WRITE_BATCHING']:
+        _write_queue = WriteBehindQueue(db.engine)
+    return _write_queue
 
 # Add template filter for date formatting
 @app.template_filter('datetime')
@@ -22,17 +60,47 @@ def datetime_filter(timestamp):
     except:
         return "N/A"
 
+def setup_database():
+    db.create_all()
+    ensure_columns()
+    init_storage(db.engine)
+    init_timeseries(db.engine)
+
 @app.before_first_request
 def create_tables():
-    db.create_all()
+    setup_database()
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
+def stored_weather(lat, lon, start_date="", end_date=""):
+    """(fetched_at, payload) of the latest stored record at this location, the stale fallback after a restart"""
+    rec = (WeatherRequest.query
+           .filter(WeatherRequest.lat.between(lat - 0.0005, lat + 0.0005), WeatherRequest.lon.between(lon - 0.0005, lon + 0.0005))
+           .order_by(WeatherRequest.updated_at.desc()).first())
+    if rec is None or not rec.weather_json:
+        return None
+    weather = rec.weather()
+    if (rec.start_date or "", rec.end_date or "") != (start_date or "", end_date or ""):
+        weather = refilter_weather(weather, rec.start_date, rec.end_date, start_date, end_date)
+    fetched_at = (rec.updated_at or rec.created_at).replace(tzinfo=timezone.utc).timestamp()
+    return (fetched_at, weather) if weather else None
+
+def fetch_weather(lat, lon, start_date="", end_date="", deadline=None):
+    """Weather for a page request: fresh within the deadline, else the last known payload marked stale"""
+    weather = get_weather_or_stale(lat, lon, start_date, end_date, deadline,
+                                   fallback=lambda: stored_weather(lat, lon, start_date, end_date))
+    if weather.get("stale"):
+        minutes = (weather.get("stale_age_seconds") or 0) // 60
+        flash(f"The weather service is not responding; showing data from {minutes} minute(s) ago.", "warning")
+    return weather
+
 @app.route("/create", methods=["GET","POST"])
 def create():
     if request.method == "POST":
+        # one latency budget for geocode -> weather -> summary
+        deadline = Deadline()
         user_input = request.form.get("location").strip()
         start_date = request.form.get("start_date") or ""
         end_date = request.form.get("end_date") or ""
@@ -41,7 +109,11 @@ def create():
             flash("Please enter location", "danger")
             return redirect(url_for("create"))
 
-        geo = geocode_location(user_input)
+        try:
+            geo = geocode_location(user_input, deadline)
+        except (UpstreamUnavailable, DeadlineExceeded) as e:
+            flash(f"The location service is not responding, please try again shortly ({e}).", "danger")
+            return redirect(url_for("create"))
         if not geo:
             flash("Could not resolve location. Try more specific input.", "danger")
             return redirect(url_for("create"))
@@ -52,13 +124,14 @@ def create():
             return redirect(url_for("create"))
 
         # fetch weather with date range if provided
-        weather = get_weather(geo["lat"], geo["lon"], start_date=start_date, end_date=end_date)
-        
-        # Import the summary function
-        from utils import ai_generate_summary
+        try:
+            weather = fetch_weather(geo["lat"], geo["lon"], start_date, end_date, deadline)
+        except (UpstreamUnavailable, DeadlineExceeded) as e:
+            flash(f"The weather service is not responding, please try again shortly ({e}).", "danger")
+            return redirect(url_for("create"))
         
-        # Generate AI summary
-        summary = ai_generate_summary(weather, geo["name"])
+        # Generate AI summary (left empty when the view page streams it in)
+        summary = None if app.config['SUMMARY_STREAMING'] else ai_generate_summary(weather, geo["name"], deadline)
         
         # Create the weather request object with summary
         w = WeatherRequest(
@@ -68,19 +141,36 @@ def create():
             lon=geo["lon"],
             start_date=start_date,
             end_date=end_date,
-            weather_json=json.dumps(weather),
             ai_summary=summary
         )
+        store_weather(w, weather)
+        record_observation(geo["lat"], geo["lon"], weather, geo["name"])
         
         # Add to database and commit to get the ID
-        db.session.add(w)
-        db.session.commit()
+        write_queue = get_write_queue()
+        if write_queue:
+            new_id = write_queue.insert_model(w)
+        else:
+            db.session.add(w)
+            db.session.commit()
+            new_id = w.id
         flash("Weather fetched and stored!", "success")
 
-        return redirect(url_for("view", id=w.id))
+        return redirect(url_for("view", id=new_id))
     
     return render_template("create.html")
 
+def conversation_id(rec_id, client_id=None):
+    """Chat session key for this record and client (API clients may send their own session_id)"""
+    if not client_id:
+        if "chat_client" not in session:
+            session["chat_client"] = uuid.uuid4().hex
+        client_id = session["chat_client"]
+    return f"{rec_id}:{client_id}"
+
+def forget_conversations(rec_id):
+    get_conversation_store().delete_prefix(f"{rec_id}:")
+
 @app.route("/chat/<int:id>", methods=["GET", "POST"])
 def chat(id):
     rec = WeatherRequest.query.get_or_404(id)
@@ -88,19 +178,36 @@ def chat(id):
     if request.method == "POST":
         question = request.form.get("message")
         weather = rec.weather()
-        answer = ai_chat_response(question, rec.resolved_name, weather, rec.start_date, rec.end_date)
+        answer = ai_chat_response(question, rec.resolved_name, weather, rec.start_date, rec.end_date,
+                                  snapshot=(rec.id, rec.payload_hash), session_id=conversation_id(rec.id))
     return render_template("chat.html", rec=rec, answer=answer)
 
 @app.route("/view/<int:id>")
 def view(id):
-    rec = WeatherRequest.query.get_or_404(id)
-    weather_data = rec.weather()
-    
-    # Calculate predicted temperature
-    from utils import predict_next_temp
-    pred_temp = predict_next_temp(weather_data)
+    rec = WeatherRequest.query.options(*WITHOUT_PAYLOAD).get_or_404(id)
+    live = covers_today(rec.start_date, rec.end_date)
+    etag, last_modified = record_etag(rec, asset_version(), live), record_last_modified(rec)
+    # pending flash messages are part of the page, so never answer 304 while one is queued
+    if not session.get("_flashes") and is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified, "view")
+    # prediction, chart series and display fields are materialized when the weather is written
+    derived = load_derived(rec)
     
-    return render_template("view.html", rec=rec, weather=weather_data, pred_temp=pred_temp)
+    resp = app.make_response(render_template("view.html", rec=rec, derived=derived, pred_temp=derived["pred_temp"], live=live))
+    return apply_validators(resp, etag, last_modified, "view")
+
+@app.route("/api/chart/<int:id>")
+def api_chart(id):
+    """Chart series for the view page's dashboard, fetched when it scrolls into view"""
+    rec = WeatherRequest.query.options(*WITHOUT_PAYLOAD).get_or_404(id)
+    etag, last_modified = record_etag(rec, "chart"), record_last_modified(rec)
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified, "chart")
+    chart = load_derived(rec)["chart"]
+    rounded = lambda values: [round(v, 1) if v is not None else None for v in values]
+    resp = jsonify({"labels": chart["labels"], "day": rounded(chart["day"]), "min": rounded(chart["min"]),
+                    "max": rounded(chart["max"]), "current_temp": chart["current_temp"]})
+    return apply_validators(resp, etag, last_modified, "chart")
 
 @app.route("/list")
 def list_requests():
@@ -115,31 +222,98 @@ def api_list():
         out.append({"id": r.id, "user_input": r.user_input, "resolved": r.resolved_name, "lat": r.lat, "lon": r.lon})
     return jsonify(out)
 
+def apply_edit(rec, timer):
+    """Apply a submitted edit form to rec; returns the redirect and sets timer.outcome"""
+    # only the steps the changed fields need: geocode on a new location, a local
+    # re-filter on new dates, and summary/derived data only for a new payload
+    id = rec.id
+    user_input = (request.form.get("location") or "").strip()
+    start_date = request.form.get("start_date") or ""
+    end_date = request.form.get("end_date") or ""
+    if not user_input:
+        timer.outcome = "invalid"
+        flash("Please enter location", "danger")
+        return redirect(url_for("edit", id=id))
+    if start_date and end_date and start_date > end_date:
+        timer.outcome = "invalid"
+        flash("Start date must be before end date", "danger")
+        return redirect(url_for("edit", id=id))
+
+    deadline = Deadline()
+    location_changed = user_input != rec.user_input
+    dates_changed = (start_date, end_date) != (rec.start_date or "", rec.end_date or "")
+    if not location_changed and not dates_changed:
+        timer.outcome = "unchanged"
+        flash("Nothing changed", "info")
+        return redirect(url_for("view", id=id))
+
+    moved, old_name = False, rec.resolved_name
+    if location_changed:
+        with timer.step("geocode"):
+            try:
+                geo = geocode_location(user_input, deadline)
+            except (UpstreamUnavailable, DeadlineExceeded) as e:
+                timer.outcome = "upstream_error"
+                flash(f"The location service is not responding, please try again shortly ({e}).", "danger")
+                return redirect(url_for("edit", id=id))
+        if not geo:
+            timer.outcome = "unresolved"
+            flash("Could not resolve location. Try more specific input.", "danger")
+            return redirect(url_for("edit", id=id))
+        # a reworded location that resolves to the same place keeps its forecast
+        moved = rec.lat is None or location_id(geo["lat"], geo["lon"]) != location_id(rec.lat, rec.lon)
+        rec.resolved_name, rec.lat, rec.lon = geo["name"], geo["lat"], geo["lon"]
+
+    weather = None
+    outcome = "renamed"
+    if not moved and dates_changed:
+        with timer.step("refilter"):
+            weather = refilter_weather(rec.weather(), rec.start_date, rec.end_date, start_date, end_date)
+        outcome = "refiltered"
+    if moved or (dates_changed and weather is None):
+        with timer.step("fetch"):
+            try:
+                weather = fetch_weather(rec.lat, rec.lon, start_date, end_date, deadline)
+            except (UpstreamUnavailable, DeadlineExceeded) as e:
+                db.session.rollback()
+                timer.outcome = "upstream_error"
+                flash(f"The weather service is not responding, please try again shortly ({e}).", "danger")
+                return redirect(url_for("edit", id=id))
+        record_observation(rec.lat, rec.lon, weather, rec.resolved_name)
+        outcome = "refetched"
+
+    rec.user_input, rec.start_date, rec.end_date = user_input, start_date, end_date
+    if weather is not None and payload_hash(json.dumps(weather)) != rec.payload_hash:
+        with timer.step("derive"):
+            store_weather(rec, weather)
+        with timer.step("summary"):
+            # the view streams a fresh summary in when streaming is on
+            rec.ai_summary = None if app.config['SUMMARY_STREAMING'] else ai_generate_summary(weather, rec.resolved_name, deadline)
+    elif rec.resolved_name != old_name:
+        # same payload under a new name: only the summary's wording changes
+        with timer.step("summary"):
+            rec.ai_summary = None if app.config['SUMMARY_STREAMING'] else ai_generate_summary(rec.weather(), rec.resolved_name, deadline)
+    with timer.step("commit"):
+        db.session.commit()
+    invalidate_chat_answers(rec.id)
+    forget_conversations(rec.id)
+    timer.outcome = outcome
+    flash("Record updated", "success")
+    return redirect(url_for("view", id=id))
+
 @app.route("/edit/<int:id>", methods=["GET","POST"])
 def edit(id):
     rec = WeatherRequest.query.get_or_404(id)
     if request.method == "POST":
-        # permit update of user_input and dates; revalidate and optionally re-fetch weather
-        rec.user_input = request.form.get("location").strip()
-        start_date = request.form.get("start_date")
-        end_date = request.form.get("end_date")
-        if start_date and end_date and start_date > end_date:
-            flash("Start date must be before end date", "danger")
-            return redirect(url_for("edit", id=id))
-
-        geo = geocode_location(rec.user_input)
-        if geo:
-            rec.resolved_name = geo["name"]
-            rec.lat = geo["lat"]
-            rec.lon = geo["lon"]
-            # re-fetch weather with date range
-            weather = get_weather(rec.lat, rec.lon, start_date=start_date, end_date=end_date)
-            rec.weather_json = json.dumps(weather)
-        rec.start_date = start_date
-        rec.end_date = end_date
-        db.session.commit()
-        flash("Record updated", "success")
-        return redirect(url_for("view", id=id))
+        timer = EditTimer()
+        try:
+            resp = apply_edit(rec, timer)
+            if timer.steps:
+                resp.headers["Server-Timing"] = timer.server_timing()
+            return resp
+        finally:
+            # every submission counts, including rejected and failed ones
+            timer.finish(timer.outcome or "error")
     return render_template("edit.html", rec=rec)
 
 @app.route("/delete/<int:id>", methods=["POST"])
@@ -147,22 +321,36 @@ def delete(id):
     rec = WeatherRequest.query.get_or_404(id)
     db.session.delete(rec)
     db.session.commit()
+    invalidate_chat_answers(id)
+    forget_conversations(id)
     flash("Record deleted", "success")
     return redirect(url_for("list_requests"))
 
 @app.route("/export/<int:id>/<string:fmt>")
 def export(id, fmt):
-    rec = WeatherRequest.query.get_or_404(id)
-    if fmt.lower() == "csv":
+    rec = WeatherRequest.query.options(*WITHOUT_PAYLOAD).get_or_404(id)
+    fmt = fmt.lower()
+    if fmt not in ("csv", "md", "json"):
+        return "Unsupported format", 400
+    etag, last_modified = record_etag(rec, fmt), record_last_modified(rec)
+    if is_not_modified(etag, last_modified):
+        return not_modified(etag, last_modified, "export")
+    if fmt == "csv":
         data = export_as_csv(rec)
-        return send_file(io.BytesIO(data.encode()), mimetype="text/csv", as_attachment=True, download_name=f"weather_{id}.csv")
-    if fmt.lower() == "md":
+        resp = send_file(io.BytesIO(data.encode()), mimetype="text/csv", as_attachment=True, download_name=f"weather_{id}.csv")
+    elif fmt == "md":
         data = export_as_markdown(rec)
-        return send_file(io.BytesIO(data.encode()), mimetype="text/markdown", as_attachment=True, download_name=f"weather_{id}.md")
-    if fmt.lower() == "json":
+        resp = send_file(io.BytesIO(data.encode()), mimetype="text/markdown", as_attachment=True, download_name=f"weather_{id}.md")
+    else:
         data = export_as_json(rec)
-        return jsonify(data)
-    return "Unsupported format", 400
+        resp = jsonify(data)
+    return apply_validators(resp, etag, last_modified, "export")
+
+def upstream_error_response(e):
+    """503 when an upstream is down, 504 when it was too slow; both with a Retry-After hint"""
+    status = 504 if isinstance(e, DeadlineExceeded) else 503
+    retry_after = getattr(e, "retry_after", RETRY_AFTER_SECONDS)
+    return jsonify({"error": str(e)}), status, {"Retry-After": str(int(retry_after) + 1)}
 
 @app.route("/api/weather")
 def api_weather():
@@ -171,11 +359,62 @@ def api_weather():
     if not lat or not lon:
         return jsonify({"error":"lat & lon required"}), 400
     try:
-        w = get_weather(float(lat), float(lon))
-        return jsonify(w)
+        lat, lon = float(lat), float(lon)
+        w = get_weather_or_stale(lat, lon, deadline=Deadline(), fallback=lambda: stored_weather(lat, lon))
+        resp = jsonify(w)
+        if w.get("stale"):
+            # last known data while the upstream is down or slow: never cache it, never 304 it
+            resp.headers["Cache-Control"] = "no-store"
+            resp.headers["Warning"] = '110 - "Response is Stale"'
+            return resp
+        # validators follow the upstream observation time and the payload itself
+        etag, last_modified = make_etag(resp.get_data()), w.get("current", {}).get("dt")
+        if is_not_modified(etag, last_modified):
+            return not_modified(etag, last_modified, "api_weather")
+        return apply_validators(resp, etag, last_modified, "api_weather")
+    except (UpstreamUnavailable, DeadlineExceeded) as e:
+        return upstream_error_response(e)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def require_debug_token():
+    """/debug endpoints exist only when PROFILE_TOKEN is set and the caller sends it"""
+    token = request.headers.get("X-Profile-Token", "")
+    if not PROFILE_TOKEN or not hmac.compare_digest(token, PROFILE_TOKEN):
+        abort(404)
+
+@app.route("/debug/profile", methods=["POST"])
+def debug_profile():
+    """Sample every thread of this worker for ?seconds=N; collapsed stacks, or an SVG flamegraph with ?format=svg"""
+    require_debug_token()
+    seconds = min(max(request.args.get("seconds", 10, type=float), 0.1), PROFILE_MAX_SECONDS)
+    stacks = capture(seconds)
+    path = write_profile(stacks, f"capture-{seconds:g}s")
+    if request.args.get("format") == "svg":
+        return Response(flamegraph_svg(stacks, f"pid {os.getpid()}, {seconds:g}s"), mimetype="image/svg+xml")
+    return Response(collapsed_text(stacks), mimetype="text/plain", headers={"X-Profile-File": path})
+
+@app.route("/debug/memory", methods=["GET", "POST"])
+def debug_memory():
+    """RSS and top allocation sites of this worker, with growth since the last call; POST ?trace=N starts tracing"""
+    require_debug_token()
+    if request.method == "POST" and request.args.get("trace", type=int):
+        start_tracing(request.args.get("trace", type=int))
+    info = memory_watch.snapshot(top=min(request.args.get("top", 15, type=int), 100))
+    # the long-lived per-process state most likely to hold memory
+    info["components"] = {
+        "summarizer_loaded": bool(utils.summarizer),
+        "chat_cache": utils._dynamic_chatbot.answer_cache.stats() if utils._dynamic_chatbot else None,
+        "conversations": len(get_conversation_store()),
+        "live": get_live_hub().stats() if _live_hub is not None else None,
+        "last_known_weather": len(last_known),
+    }
+    return jsonify(info)
+
+@app.route("/api/upstreams")
+def api_upstreams():
+    return jsonify(breaker_stats())
+
 @app.route("/api/chat/<int:id>", methods=["POST"])
 def api_chat(id):
     rec = WeatherRequest.query.get_or_404(id)
@@ -187,11 +426,300 @@ def api_chat(id):
     
     try:
         weather_data = rec.weather()
-        response = ai_chat_response(message, rec.resolved_name, weather_data, rec.start_date, rec.end_date)
-        return jsonify({"response": response})
+        sid = conversation_id(rec.id, str(data.get("session_id") or "")[:64])
+        response = ai_chat_response(message, rec.resolved_name, weather_data, rec.start_date, rec.end_date,
+                                    snapshot=(rec.id, rec.payload_hash), session_id=sid)
+        return jsonify({"response": response, "session_id": sid.split(":", 1)[1]})
     except Exception as e:
         return jsonify({"error": "Failed to generate response"}), 500
 
+@app.route("/api/chat/<int:id>/stream", methods=["POST"])
+def api_chat_stream(id):
+    """Chat reply as server-sent events: start, then the reply sentence by sentence, then done"""
+    rec = WeatherRequest.query.get_or_404(id)
+    data = request.get_json(silent=True) or {}
+    message = str(data.get("message", "")).strip()
+    if not message:
+        return jsonify({"error": "Message is required"}), 400
+    # resolve the session (and set its cookie) before the response starts
+    sid = conversation_id(rec.id, str(data.get("session_id") or "")[:64])
+    weather_data = rec.weather()
+    name, start_date, end_date, snapshot = rec.resolved_name, rec.start_date, rec.end_date, (rec.id, rec.payload_hash)
+
+    def events():
+        yield sse_event({"session_id": sid.split(":", 1)[1]}, "start")
+        response = ai_chat_response(message, name, weather_data, start_date, end_date,
+                                    snapshot=snapshot, session_id=sid)
+        for piece in sentence_chunks(response):
+            yield sse_event({"text": piece})
+        yield sse_event({"response": response}, "done")
+
+    return sse_response(events())
+
+def save_summary(rec, summary):
+    rec.ai_summary = summary
+    db.session.commit()
+
+# one in-flight summary generation per record snapshot, shared by everyone viewing it
+summary_streams = SharedStreams(idle_timeout=LIVE_HEARTBEAT_SECONDS)
+
+def follow_summary(rec):
+    """Pieces of the record's summary from the shared generation, starting it if needed; stored once complete"""
+    rec_id, payload_hash = rec.id, rec.payload_hash
+    weather_data, name = rec.weather(), rec.resolved_name
+
+    def store(summary):
+        with app.app_context():
+            current = WeatherRequest.query.get(rec_id)
+            # skip if the record was edited or summarised meanwhile
+            if current is not None and current.payload_hash == payload_hash and not current.ai_summary:
+                save_summary(current, summary.strip())
+
+    # don't hold a pooled connection while the model decodes
+    db.session.close()
+    return summary_streams.follow((rec_id, payload_hash), lambda: stream_summary(weather_data, name), store)
+
+@app.route("/api/summary/<int:id>")
+def api_summary(id):
+    """Summary of a record, generated and stored on first request (non-streaming fallback)"""
+    rec = WeatherRequest.query.get_or_404(id)
+    if rec.ai_summary:
+        return jsonify({"summary": rec.ai_summary})
+    return jsonify({"summary": "".join(piece for piece in follow_summary(rec) if piece).strip()})
+
+@app.route("/api/summary/<int:id>/stream")
+def api_summary_stream(id):
+    """Summary as server-sent events while the model decodes it; stored once complete"""
+    rec = WeatherRequest.query.get_or_404(id)
+    if rec.ai_summary:
+        summary = rec.ai_summary
+
+        def stored():
+            yield sse_event({"text": summary})
+            yield sse_event({"summary": summary}, "done")
+
+        return sse_response(stored())
+    pieces = follow_summary(rec)
+
+    def events():
+        text = []
+        try:
+            yield sse_event({}, "start")
+            for piece in pieces:
+                if piece is None:
+                    # writing between pieces is what notices a client that has gone
+                    yield ": keepalive\n\n"
+                    continue
+                text.append(piece)
+                yield sse_event({"text": piece})
+            yield sse_event({"summary": "".join(text).strip()}, "done")
+        finally:
+            pieces.close()
+
+    return sse_response(events())
+
+@app.route("/api/edit/stats")
+def api_edit_stats():
+    return jsonify(edit_stats())
+
+@app.route("/api/chat/cache-stats")
+def api_chat_cache_stats():
+    return jsonify(chat_cache_stats())
+
+_live_hub = None
+
+def record_live_observation(key, record_ids, weather):
+    """Append a poller's fresh observation to the history; the records themselves keep their stored payload"""
+    record_observation(key[0], key[1], weather)
+
+def get_live_hub():
+    """Lazily create this worker's live-update hub"""
+    global _live_hub
+    if _live_hub is None:
+        _live_hub = LiveHub(get_weather, on_update=record_live_observation)
+    return _live_hub
+
+@app.route("/api/live/<int:id>")
+def api_live(id):
+    """Server-sent weather updates for an open /view page"""
+    rec = WeatherRequest.query.get_or_404(id)
+    if not covers_today(rec.start_date, rec.end_date):
+        # nothing live to show for a past or future range; 204 also stops EventSource reconnecting
+        return "", 204
+    last_dt = (rec.weather().get("current") or {}).get("dt")
+    start_date, end_date = rec.start_date, rec.end_date
+    sub = get_live_hub().subscribe(rec.lat, rec.lon, record_id=rec.id, last_dt=last_dt)
+    # don't hold a pooled connection for the life of the stream
+    db.session.close()
+    if sub is None:
+        return jsonify({"error": "Too many live subscribers, try again later"}), 503
+
+    def events():
+        try:
+            yield sse_event({"poll_seconds": sub.hub.poll_seconds}, "start")
+            while not sub.closed:
+                weather = sub.get(timeout=LIVE_HEARTBEAT_SECONDS)
+                if weather is None:
+                    # comment frame: keeps proxies from timing out and detects gone clients
+                    yield ": keepalive\n\n"
+                    continue
+                derived = compute_derived(restrict_to_dates(weather, start_date, end_date))
+                derived.pop("analysis", None)
+                yield sse_event(derived, "weather")
+        finally:
+            sub.close()
+
+    return sse_response(events())
+
+@app.route("/api/live/stats")
+def api_live_stats():
+    return jsonify(get_live_hub().stats())
+
+@app.route("/api/history")
+def api_history():
+    """Observed history for a record's location (or ?lat=&lon=): rollups by default, raw with ?raw=1"""
+    if request.args.get("request_id"):
+        rec = WeatherRequest.query.get_or_404(request.args.get("request_id", type=int))
+        lat, lon = rec.lat, rec.lon
+    else:
+        lat, lon = request.args.get("lat", type=float), request.args.get("lon", type=float)
+    granularity = request.args.get("granularity", "day")
+    if lat is None or lon is None or granularity not in GRANULARITIES:
+        return jsonify({"error": "request_id or lat/lon required; granularity is hour or day"}), 400
+    end = int(time.time())
+    start = end - request.args.get("days", 30, type=int) * 86400
+    key = location_id(lat, lon)
+    if request.args.get("raw") == "1":
+        return jsonify({"location_key": key, "observations": query_observations(key, start, end)})
+    return jsonify({"location_key": key, "granularity": granularity, "buckets": query_rollups(key, granularity, start, end)})
+
+@app.route("/api/alerts")
+def api_alerts():
+    """Active severe-weather alerts, optionally for one record's location or one severity"""
+    key = None
+    if request.args.get("request_id"):
+        rec = WeatherRequest.query.get_or_404(request.args.get("request_id", type=int))
+        key = location_id(rec.lat, rec.lon)
+    return jsonify({"alerts": active_alerts(request.args.get("severity"), key)})
+
+
+@app.cli.command("backfill-derived")
+def backfill_derived():
+    """Materialize derived view data for rows written before it existed or with a stale version"""
+    setup_database()
+    ids = [row.id for row in db.session.query(WeatherRequest.id).order_by(WeatherRequest.id)]
+    updated = 0
+    for i in range(0, len(ids), 200):
+        for rec in WeatherRequest.query.filter(WeatherRequest.id.in_(ids[i:i + 200])):
+            if is_stale(rec):
+                refresh_derived(rec)
+                updated += 1
+        db.session.commit()
+    print(f"Backfilled derived data for {updated} record(s)")
+
+@app.cli.command("evaluate-alerts")
+@click.option("--loop", is_flag=True, help="Keep evaluating every ALERT_INTERVAL_SECONDS")
+def evaluate_alerts(loop):
+    """Evaluate the severe-weather rules over every tracked location"""
+    setup_database()
+    while True:
+        started = time.perf_counter()
+        stats = run_alert_cycle()
+        print(f"Evaluated {stats['locations']} location(s) in {time.perf_counter() - started:.2f}s: "
+              f"{stats['fired']} firing, {stats['cleared']} cleared, {stats['notified']} notified, "
+              f"{stats['suppressed']} held back by rate limits")
+        if not loop:
+            break
+        db.session.remove()
+        time.sleep(ALERT_INTERVAL_SECONDS)
+
+@app.cli.command("collect")
+@click.option("--loop", is_flag=True, help="Keep collecting every COLLECTOR_INTERVAL_SECONDS")
+def collect(loop):
+    """Record current observations for configured and popular locations"""
+    setup_database()
+    if db.engine.dialect.name != "sqlite":
+        raise click.ClickException("observation history is only kept on SQLite databases")
+    while True:
+        targets = collection_targets(db.engine)
+        added, failed = collect_once(get_current_observation, targets)
+        print(f"Collected {added} new observation(s) from {len(targets)} location(s), {failed} failed")
+        if not loop:
+            break
+        time.sleep(COLLECTOR_INTERVAL_SECONDS)
+
+@app.cli.command("ingest")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--job", default=None, help="Checkpoint name; rerunning a job skips rows it already wrote (default: file name)")
+@click.option("--summary", type=click.Choice(["ai", "simple", "none"]), default="ai",
+              help="none leaves summaries to be generated on first view")
+@click.option("--batch", "batch_size", default=INGEST_BATCH_SIZE, help="Rows per transaction")
+@click.option("--geocode-workers", default=INGEST_GEOCODE_WORKERS)
+@click.option("--weather-workers", default=INGEST_WEATHER_WORKERS)
+@click.option("--summary-workers", default=INGEST_SUMMARY_WORKERS)
+def ingest(path, job, summary, batch_size, geocode_workers, weather_workers, summary_workers):
+    """Create weather requests in bulk from a CSV or NDJSON list of locations"""
+    setup_database()
+    pipeline, written, skipped, seconds = run_ingest(
+        path, job, summary, batch_size, geocode_workers=geocode_workers,
+        weather_workers=weather_workers, summary_workers=summary_workers)
+    print(f"Wrote {written} record(s) in {seconds:.1f}s, skipped {skipped} already ingested, "
+          f"{len(pipeline.failures)} failed")
+    print(pipeline.report())
+    for key, stage, error in pipeline.failures[:20]:
+        print(f"  item {key} failed at {stage}: {error}")
+
+@app.cli.command("build-assets")
+@click.option("--skip-download", is_flag=True, help="Only fingerprint what is already under static/")
+def build_assets_command(skip_download):
+    """Vendor third-party bundles, then fingerprint and precompress static assets into static/dist"""
+    if not skip_download:
+        for name in fetch_vendor():
+            print(f"Downloaded {name}")
+    manifest = build_assets()
+    print(f"Built {len(manifest)} asset(s) into static/dist")
+
+@app.cli.command("train-dict")
+@click.option("--samples", default=500, help="Number of recent records to train on")
+def train_dict(samples):
+    """Train a shared compression dictionary from recent payloads and make it active"""
+    setup_database()
+    recs = WeatherRequest.query.order_by(WeatherRequest.id.desc()).limit(samples).all()
+    docs = [r.weather_json for r in recs] + [r.ai_summary for r in recs]
+    dict_id, codec, size = train_dictionary(docs)
+    print(f"Trained dictionary {dict_id} ({codec}, {size} bytes) from {len(recs)} record(s)")
+
+@app.cli.command("recompress")
+def recompress():
+    """Compress rows still stored as plain text"""
+    setup_database()
+    print(f"Recompressed {recompress_records()} record(s)")
+
+@app.cli.command("prune")
+@click.option("--days", type=int, default=None, help="Delete records older than this (default RETENTION_DAYS)")
+@click.option("--archive", default=None, help="Append pruned rows to this .ndjson.gz file first")
+def prune(days, archive):
+    """Apply the retention policy"""
+    setup_database()
+    days = days if days is not None else RETENTION_DAYS
+    print(f"Pruned {prune_old_records(days, archive)} record(s)")
+
+@app.cli.command("compact")
+@click.option("--step", default=256, help="Pages to free per transaction")
+@click.option("--enable-incremental", is_flag=True, help="One-time full VACUUM to switch to incremental auto_vacuum")
+def compact_db(step, enable_incremental):
+    """Reclaim free pages incrementally"""
+    setup_database()
+    pages = compact(step, enable_incremental=enable_incremental)
+    print(f"Reclaimed {pages} page(s)")
+
+@app.cli.command("storage-report")
+def storage_report():
+    """Show stored vs decoded payload sizes"""
+    setup_database()
+    for key, value in storage_stats().items():
+        print(f"{key:>16}: {value}")
+
 
 if __name__ == "__main__":
     app.run(debug=True, host="0.0.0.0")
\ No newline at end of file
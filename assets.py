@@ -0,0 +1,161 @@
+import os
+import re
+import gzip
+import json
+import hashlib
+import mimetypes
+import requests
+from flask import request, send_from_directory, url_for, abort
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fingerprinted static assets.
+#
+# `flask build-assets` downloads the pinned third-party bundles into
+# static/vendor, then copies everything under static/ to static/dist as
+# name.<content hash>.ext with gzip (and brotli, when installed) siblings and a
+# manifest.json mapping logical names to hashed ones. /assets serves those with
+# a one-year immutable Cache-Control, picking the precompressed variant the
+# client accepts. Until assets are built, asset_url falls back to /static or
+# the pinned CDN URL, so a fresh checkout still works.
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST = os.path.join(DIST_DIR, "manifest.json")
+IMMUTABLE = "public, max-age=31536000, immutable"
+COMPRESSIBLE = (".js", ".css", ".svg", ".json", ".map")
+
+# logical name under static/ -> pinned upstream URL
+VENDOR_ASSETS = {
+    # the charts only use scatter and bar traces, which the basic bundle covers at under a third of the full size
+    "vendor/plotly-basic.min.js": "https://cdn.plot.ly/plotly-basic-2.35.2.min.js",
+    "vendor/leaflet/leaflet.js": "https://unpkg.com/leaflet@1.9.4/dist/leaflet.js",
+    "vendor/leaflet/leaflet.css": "https://unpkg.com/leaflet@1.9.4/dist/leaflet.css",
+    "vendor/leaflet/images/marker-icon.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon.png",
+    "vendor/leaflet/images/marker-icon-2x.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-icon-2x.png",
+    "vendor/leaflet/images/marker-shadow.png": "https://unpkg.com/leaflet@1.9.4/dist/images/marker-shadow.png",
+    "vendor/leaflet/images/layers.png": "https://unpkg.com/leaflet@1.9.4/dist/images/layers.png",
+    "vendor/leaflet/images/layers-2x.png": "https://unpkg.com/leaflet@1.9.4/dist/images/layers-2x.png",
+}
+
+CSS_URL = re.compile(r"""url\((['"]?)([^'")]+)\1\)""")
+
+_manifest = None
+
+def fetch_vendor(static_dir=STATIC_DIR, force=False):
+    """Download missing vendor bundles; returns the names fetched"""
+    fetched = []
+    for name, url in VENDOR_ASSETS.items():
+        path = os.path.join(static_dir, name)
+        if os.path.exists(path) and not force:
+            continue
+        r = requests.get(url, timeout=60)
+        r.raise_for_status()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(r.content)
+        fetched.append(name)
+    return fetched
+
+def _hashed_name(name, data):
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+def _rewrite_css(name, data, manifest):
+    # point relative url()s at the fingerprinted files, keeping them relative
+    base = os.path.dirname(name)
+
+    def replace(match):
+        target = match.group(2)
+        if re.match(r"^(data:|https?:|/|#)", target):
+            return match.group(0)
+        logical = os.path.normpath(os.path.join(base, target)).replace(os.sep, "/")
+        if logical not in manifest:
+            return match.group(0)
+        return f"url({os.path.relpath(manifest[logical], base or '.').replace(os.sep, '/')})"
+    return CSS_URL.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+def build_assets(static_dir=STATIC_DIR, dist_dir=DIST_DIR):
+    """Fingerprint and precompress every file under static/ into dist/; returns the manifest"""
+    names = []
+    for root, dirs, files in os.walk(static_dir):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist_dir]
+        names += [os.path.relpath(os.path.join(root, f), static_dir).replace(os.sep, "/") for f in files]
+    # CSS last, so the files it references already have their hashed names
+    names.sort(key=lambda n: (n.endswith(".css"), n))
+    manifest = {}
+    for name in names:
+        with open(os.path.join(static_dir, name), "rb") as f:
+            data = f.read()
+        if name.endswith(".css"):
+            data = _rewrite_css(name, data, manifest)
+        hashed = _hashed_name(name, data)
+        manifest[name] = hashed
+        target = os.path.join(dist_dir, hashed)
+        if os.path.exists(target):
+            continue  # same content, already built
+        _write(target, data)
+        if name.endswith(COMPRESSIBLE):
+            _write(target + ".gz", gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                _write(target + ".br", brotli.compress(data, quality=11))
+    _write(os.path.join(dist_dir, "manifest.json"), json.dumps(manifest, indent=1, sort_keys=True).encode())
+    global _manifest
+    _manifest = manifest
+    return manifest
+
+def load_manifest():
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+def asset_version():
+    """Digest of the manifest, so pages that link assets change validators when the assets do"""
+    return hashlib.sha1(json.dumps(load_manifest(), sort_keys=True).encode()).hexdigest()[:12]
+
+def asset_url(name):
+    """URL of a static asset: fingerprinted when built, else /static, else its pinned CDN URL"""
+    hashed = load_manifest().get(name)
+    if hashed:
+        return url_for("asset", filename=hashed)
+    if name in VENDOR_ASSETS and not os.path.exists(os.path.join(STATIC_DIR, name)):
+        return VENDOR_ASSETS[name]
+    return url_for("static", filename=name)
+
+def serve_asset(filename):
+    """Serve a built asset with immutable caching, precompressed when the client accepts it"""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    accepted = request.accept_encodings
+    for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+        if accepted[encoding] and os.path.isfile(os.path.join(DIST_DIR, filename + suffix)):
+            resp = send_from_directory(DIST_DIR, filename + suffix, mimetype=mimetype, max_age=31536000)
+            resp.headers["Content-Encoding"] = encoding
+            break
+    else:
+        resp = send_from_directory(DIST_DIR, filename, mimetype=mimetype, max_age=31536000)
+    if filename.endswith(COMPRESSIBLE):
+        resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = IMMUTABLE
+    return resp
+
+def install_assets(app):
+    """Register /assets and the asset_url template helper"""
+    app.add_url_rule("/assets/<path:filename>", "asset", serve_asset)
+    app.add_template_global(asset_url)
@@ -0,0 +1,117 @@
+"""Severe-weather alert cycle time per 10k tracked locations, end to end.
+
+Builds synthetic payloads shaped like get_weather output and stores them, with
+older rows for the same locations, in a scratch database. Times loading the
+latest row per location, feature packing and the vectorized rule evaluation,
+and the total, against a per-location Python loop over the same rules and the
+same loaded payloads. Both must fire the same alerts.
+
+    python -m benchmarks.alert_bench [--locations 10000] [--rows-per-location 2] [--repeat 5]
+"""
+import argparse, json, os, tempfile, time
+import numpy as np
+from alerts import ALERT_RULES, CONDITIONS, build_features, evaluate, tracked_locations
+
+TODAY = "2026-10-19"  # the synthetic forecasts start the day after
+
+def synthetic_payloads(n, seed=0):
+    rng = np.random.default_rng(seed)
+    payloads = []
+    base = rng.normal(18, 12, size=n).tolist()
+    # mostly benign skies, with the occasional storm, snow or dust
+    weights = np.array([30, 30, 15, 5, 3, 3, 3, 1, 4, 1, 2, 1, 0.5, 0.3, 0.2])
+    mains = rng.choice(CONDITIONS, size=(n, 6), p=weights / weights.sum()).tolist()
+    for i in range(n):
+        daily = []
+        for d in range(5):
+            mid = base[i] + float(rng.normal(0, 3))
+            daily.append({"date": f"2026-10-{20 + d}", "temp": {"min": mid - 5, "max": mid + 5, "day": mid},
+                          "main_condition": mains[i][d + 1]})
+        payloads.append({
+            "current": {"dt": 1792454400, "temp": base[i], "wind_speed": float(rng.gamma(2, 2)),
+                        "visibility": float(min(10, rng.exponential(6))), "main": mains[i][0]},
+            "daily": daily,
+        })
+    return payloads
+
+def evaluate_loop(payloads, rules=ALERT_RULES):
+    """Reference: the same rules, one location and one day at a time"""
+    fired = []
+    for row, weather in enumerate(payloads):
+        current, daily = weather["current"], weather["daily"]
+        today = TODAY
+        series = {
+            "temp_max": [(d["date"], d["temp"]["max"]) for d in daily],
+            "temp_min": [(d["date"], d["temp"]["min"]) for d in daily],
+            "wind_speed": [(today, current["wind_speed"])],
+            "visibility": [(today, current["visibility"])],
+            "condition": [(today, current["main"])] + [(d["date"], d["main_condition"]) for d in daily],
+        }
+        taken = set()
+        for rule, group, severity, feature, op, threshold, message in rules:
+            if group in taken:
+                continue
+            for day, value in series[feature]:
+                if (value in threshold) if op == "in" else (value >= threshold if op == ">=" else value <= threshold):
+                    fired.append((row, rule))
+                    taken.add(group)
+                    break
+    return fired
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def store_payloads(payloads, rows_per_location):
+    """Scratch database with rows_per_location rows (same payload, different ages) per location"""
+    from datetime import datetime, timedelta
+    from app import app, db, setup_database
+    from models import WeatherRequest
+    with app.app_context():
+        setup_database()
+        now = datetime.utcnow()
+        for age in range(rows_per_location - 1, -1, -1):
+            db.session.add_all(
+                WeatherRequest(user_input=f"loc{i}", resolved_name=f"Location {i}", lat=i * 0.01, lon=i * 0.01,
+                               weather_json=json.dumps(weather),
+                               created_at=now - timedelta(hours=age), updated_at=now - timedelta(hours=age))
+                for i, weather in enumerate(payloads))
+            db.session.commit()
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--locations", type=int, default=10000)
+    parser.add_argument("--rows-per-location", type=int, default=2, help="stored rows per location (older ones are skipped)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # before app is imported, so the scratch database is used
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='alerts-'), 'bench.db')}"
+    payloads = synthetic_payloads(args.locations)
+    app = store_payloads(payloads, args.rows_per_location)
+    with app.app_context():
+        load_s, locations = timed(tracked_locations, args.repeat)
+    payloads = [weather for *_, weather in locations]
+    pack_s, features = timed(lambda: build_features(payloads, today=TODAY), args.repeat)
+    eval_s, fired = timed(lambda: evaluate(features), args.repeat)
+    loop_s, reference = timed(lambda: evaluate_loop(payloads), args.repeat)
+
+    same = sorted((row, rule) for row, rule, *_ in fired) == sorted(reference)
+    scale = 10000 / args.locations * 1e3
+    print(f"{len(locations)} locations ({args.rows_per_location} stored rows each), {len(ALERT_RULES)} rules, "
+          f"{len(fired)} alerts firing (matches loop: {same})")
+    print(f"  load latest rows       {load_s * scale:8.1f} ms per 10k locations")
+    print(f"  feature packing        {pack_s * scale:8.1f} ms per 10k locations")
+    print(f"  vectorized evaluation  {eval_s * scale:8.1f} ms per 10k locations")
+    print(f"  per-location loop      {loop_s * scale:8.1f} ms per 10k locations")
+    print(f"End to end: vectorized {(load_s + pack_s + eval_s) * scale:.1f} ms, "
+          f"loop {(load_s + loop_s) * scale:.1f} ms per 10k locations "
+          f"(packing + evaluation {(pack_s + eval_s) * scale:.1f} ms vs loop {loop_s * scale:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
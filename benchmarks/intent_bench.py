@@ -0,0 +1,114 @@
+"""Intent engine accuracy on a labelled message set, and messages/s.
+
+Compares the compiled IntentEngine with the previous substring chain
+(`any(word in message for word in [...])`, first match wins).
+
+    python -m benchmarks.intent_bench [--n 50000]
+"""
+import argparse, time
+from datetime import date, timedelta
+from intent_engine import IntentEngine
+
+TODAY = date(2026, 10, 19)  # a Monday
+D = lambda n: TODAY + timedelta(days=n)
+
+# (message, expected intents, expected location, expected date)
+LABELLED = [
+    ("What should I wear in Mumbai?", ["clothing"], "Mumbai", None),
+    ("Is it good weather for a picnic in Delhi?", ["activity"], "Delhi", None),
+    ("Do I need an umbrella in London tomorrow?", ["rain"], "London", D(1)),
+    ("Should I carry an umbrella tomorrow in Mumbai?", ["rain"], "Mumbai", D(1)),
+    ("what to wear and will it rain in Paris on friday", ["clothing", "rain"], "Paris", D(4)),
+    ("temperature in New York in 3 days", ["temperature"], "New York", D(3)),
+    ("weather in Goa the day after tomorrow", [], "Goa", D(2)),
+    ("things to do in Rome next monday", ["activity"], "Rome", D(7)),
+    ("forecast for Tokyo this weekend", ["forecast"], "Tokyo", D(5)),
+    ("how humid is it in Chennai today", ["humidity"], "Chennai", D(0)),
+    ("I don't think so", [], None, None),
+    ("my last attempt failed", [], None, None),
+    ("is driving safe in Shimla tonight?", ["travel"], "Shimla", D(0)),
+    ("will my flight to Berlin be delayed", ["travel"], "Berlin", None),
+    ("how hot will it be in Jaipur on saturday", ["temperature"], "Jaipur", D(5)),
+    ("any showers expected in Kochi in two days?", ["rain"], "Kochi", D(2)),
+    ("is it too cold for a hike at Manali", ["activity", "temperature"], "Manali", None),
+    ("what about tomorrow?", [], None, D(1)),
+    ("should I wear a jacket", ["clothing"], None, None),
+    ("what's the forecast for 2026-10-22 in Pune", ["forecast"], "Pune", D(3)),
+    ("can I go out in Bangalore this evening", ["activity"], "Bangalore", None),
+    ("tell me about the weather", [], None, None),
+    ("is it muggy in Kolkata", ["humidity"], "Kolkata", None),
+    ("outfit ideas for a wet day in Seattle", ["clothing", "rain"], "Seattle", None),
+    ("what was the weather like in Pune last week?", ["history"], "Pune", None),
+    ("was it rainy in Delhi over the past few days", ["rain", "history"], "Delhi", None),
+    ("What about Monday", [], None, D(7)),
+    ("is it cold in St. Louis tomorrow?", ["temperature"], "St. Louis", D(1)),
+    ("Will it rain in St. Louis.", ["rain"], "St. Louis", None),
+    ("trekking at Mt. Abu this monday", [], "Mt. Abu", D(0)),
+    ("weather in Pune. What about friday?", [], "Pune", D(4)),
+]
+
+LEGACY_KEYWORDS = [
+    ("clothing", ['wear', 'clothes', 'clothing', 'dress', 'outfit']),
+    ("rain", ['rain', 'umbrella', 'wet', 'precipitation']),
+    ("activity", ['activity', 'activities', 'do', 'picnic', 'outdoor', 'visit']),
+    ("travel", ['travel', 'drive', 'driving', 'flight', 'transport']),
+    ("temperature", ['temperature', 'temp', 'hot', 'cold', 'warm']),
+    ("forecast", ['forecast', 'tomorrow', 'next', 'future']),
+    ("humidity", ['humid', 'humidity']),
+]
+
+def legacy_intent(message):
+    message = message.lower().strip()
+    for name, words in LEGACY_KEYWORDS:
+        if any(word in message for word in words):
+            return name
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=50000, help="messages to time")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    engine = IntentEngine()
+    build_ms = (time.perf_counter() - t0) * 1e3
+
+    intent_ok = location_ok = date_ok = legacy_ok = 0
+    for message, intents, location, target in LABELLED:
+        parsed = engine.parse(message, TODAY)
+        ok = parsed["intents"] == intents
+        intent_ok += ok
+        location_ok += parsed["location"] == location
+        date_ok += parsed["date"] == target
+        legacy_ok += legacy_intent(message) == (intents[0] if intents else None)
+        if not ok or parsed["location"] != location or parsed["date"] != target:
+            print(f"  miss: {message!r} -> {parsed}")
+
+    n = len(LABELLED)
+    print(f"\nLabelled set: {n} messages")
+    print(f"  engine primary+all intents  {intent_ok / n:6.1%}")
+    print(f"  engine location             {location_ok / n:6.1%}")
+    print(f"  engine date                 {date_ok / n:6.1%}")
+    print(f"  legacy first intent         {legacy_ok / n:6.1%}")
+
+    messages = [m for m, *_ in LABELLED] * (args.n // n + 1)
+    messages = messages[:args.n]
+    t0 = time.perf_counter()
+    for m in messages:
+        engine.parse(m, TODAY)
+    engine_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for m in messages:
+        engine.intents(m)
+    intents_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for m in messages:
+        legacy_intent(m)
+    legacy_s = time.perf_counter() - t0
+    print(f"\nThroughput over {len(messages)} messages (engine built in {build_ms:.1f} ms)")
+    print(f"  engine full parse           {len(messages) / engine_s:>10.0f} msg/s")
+    print(f"  engine intents only         {len(messages) / intents_s:>10.0f} msg/s")
+    print(f"  legacy substring chain      {len(messages) / legacy_s:>10.0f} msg/s")
+
+if __name__ == "__main__":
+    main()
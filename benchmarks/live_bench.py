@@ -0,0 +1,70 @@
+"""Upstream fetches and fan-out of the live-update hub as viewers grow.
+
+Subscribes V viewers spread over L locations to a LiveHub backed by a fake
+provider that publishes a new observation every --cadence seconds, runs for
+--duration seconds and reports upstream fetches against a per-viewer polling
+baseline. A tenth of the viewers never read, to show the drop-oldest buffer
+keeping them bounded.
+
+    python -m benchmarks.live_bench [--viewers 500] [--locations 10] [--duration 3] [--cadence 0.5]
+"""
+import argparse, threading, time
+from live_updates import LiveHub
+
+def fake_provider(cadence, latency=0.005):
+    start = time.time()
+
+    def fetch(lat, lon):
+        time.sleep(latency)
+        tick = int((time.time() - start) / cadence)
+        return {"current": {"dt": start + tick * cadence, "temp": 20 + tick % 5}, "daily": []}
+    return fetch
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--viewers", type=int, default=500)
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--cadence", type=float, default=0.5, help="seconds between provider observations")
+    args = parser.parse_args()
+
+    hub = LiveHub(fake_provider(args.cadence), poll_seconds=args.cadence, retry_seconds=args.cadence / 10,
+                  max_subscribers=args.viewers)
+    received = [0] * args.viewers
+    stop = threading.Event()
+    subs = []
+    for v in range(args.viewers):
+        loc = v % args.locations
+        subs.append(hub.subscribe(10 + loc, 20 + loc, record_id=v))
+
+    def reader(i, sub):
+        while not stop.is_set():
+            if sub.get(timeout=0.1) is not None:
+                received[i] += 1
+
+    slow = set(range(0, args.viewers, 10))
+    threads = [threading.Thread(target=reader, args=(i, s), daemon=True)
+               for i, s in enumerate(subs) if i not in slow]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stats = hub.stats()
+    stop.set()
+    for t in threads:
+        t.join()
+    for s in subs:
+        s.close()
+
+    observations = args.duration / args.cadence
+    readers = [received[i] for i in range(args.viewers) if i not in slow]
+    print(f"{args.viewers} viewers over {args.locations} locations for {args.duration:.1f}s "
+          f"(~{observations:.0f} provider observations each)")
+    print(f"  upstream fetches        {stats['upstream_fetches']:>8}")
+    print(f"  per-viewer polling      {int(args.viewers * observations):>8}  (one fetch per viewer per observation)")
+    print(f"  updates published       {stats['updates_published']:>8}")
+    print(f"  updates per reader      {sum(readers) / len(readers):>8.1f}")
+    print(f"  dropped (slow viewers)  {stats['updates_dropped']:>8}  buffered at most {hub.queue_size} each")
+    print(f"  locations after close   {hub.stats()['locations']:>8}")
+
+if __name__ == "__main__":
+    main()
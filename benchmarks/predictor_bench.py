@@ -0,0 +1,101 @@
+"""Accuracy vs cost of the trend predictors, replayed over stored forecasts.
+
+Each stored forecast is replayed by hiding its last day and predicting it from
+the earlier days. Timings compare per-call scikit-learn fits (the old
+implementation) with the closed-form NumPy models, per call and batched.
+
+    python -m benchmarks.predictor_bench [--db instance/weather.db] [--n 10000]
+"""
+import argparse, json, sqlite3, time
+import numpy as np
+from sqlalchemy import create_engine
+import compression
+from predictor import MODELS, pack_series, predict_series
+
+def load_series(db_path):
+    """Daily temperature series of the stored forecasts, and how many rows could not be decoded"""
+    series, skipped = [], 0
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.text_factory = bytes
+        rows = conn.execute("SELECT weather_json FROM weather_requests").fetchall()
+        conn.close()
+    except sqlite3.Error:
+        rows = []
+    if rows:
+        # trained dictionaries live in the database
+        compression.init_storage(create_engine(f"sqlite:///{db_path}"))
+    for (blob,) in rows:
+        try:
+            data = json.loads(compression.decompress(blob) if compression.is_compressed(blob)
+                              else (blob or b"{}").decode("utf-8"))
+        except (ValueError, TypeError, KeyError, UnicodeDecodeError):
+            skipped += 1
+            continue
+        temps = [d.get("temp", {}).get("day") for d in data.get("daily", [])]
+        temps = [t for t in temps if t is not None]
+        if len(temps) >= 3:
+            series.append(temps)
+    return series, skipped
+
+def synthetic_series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.uniform(-5, 35, size=(n, 1))
+    slope = rng.normal(0, 1.5, size=(n, 1))
+    return (base + slope * np.arange(5) + rng.normal(0, 1.0, size=(n, 5))).tolist()
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="instance/weather.db")
+    parser.add_argument("--n", type=int, default=10000, help="number of series to score")
+    args = parser.parse_args()
+
+    series, skipped = load_series(args.db)
+    source = f"{len(series)} stored forecasts from {args.db}"
+    if skipped:
+        source += f", {skipped} undecodable row(s) skipped"
+    if not series:
+        series = synthetic_series(args.n)
+        source = f"synthetic forecasts (no usable stored rows in {args.db}{f', {skipped} undecodable' if skipped else ''})"
+    # replicate the replay set up to n series for stable timings
+    series = (series * (args.n // len(series) + 1))[:args.n]
+    history = [s[:-1] for s in series]
+    actual = np.array([s[-1] for s in series])
+    matrix, lengths = pack_series(history)
+
+    print(f"Replaying {len(series)} series ({source})\n")
+    print(f"{'model':<22}{'MAE (C)':>10}{'total ms':>12}{'us/series':>12}")
+
+    def report(name, seconds, preds):
+        mae = float(np.nanmean(np.abs(np.asarray(preds, dtype=float) - actual)))
+        print(f"{name:<22}{mae:>10.3f}{seconds * 1e3:>12.2f}{seconds / len(series) * 1e6:>12.2f}")
+
+    try:
+        from sklearn.linear_model import LinearRegression
+
+        def sklearn_loop():
+            out = []
+            for temps in history:
+                X = np.arange(len(temps)).reshape(-1, 1)
+                model = LinearRegression().fit(X, np.array(temps))
+                out.append(model.predict([[len(temps)]])[0])
+            return out
+        report("sklearn per-call", *timed(sklearn_loop, repeat=1))
+    except ImportError:
+        print(f"{'sklearn per-call':<22}{'(scikit-learn not installed)':>34}")
+
+    report("numpy linear per-call", *timed(lambda: [predict_series(t) for t in history]))
+    for name, fn in MODELS.items():
+        report(f"numpy {name} batch", *timed(lambda: fn(matrix, lengths)))
+    report("persistence (last)", 0.0, [t[-1] for t in history])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Soak test: a mixed workload against the app for a long time, watching memory.
+
+Runs --threads clients against the Flask app in-process (create, view, API
+weather, chat, summaries, exports, edits, history and deletes) with offline
+stand-ins for OpenWeatherMap and Nominatim, on a scratch database. Every
+--sample-every seconds it records RSS and the top growing allocation sites
+(tracemalloc), and at the end fits the RSS trend after warmup. Exits 1 when
+growth is sustained above --max-growth, so it can gate a release.
+--self-check only runs the trend test against synthetic RSS series.
+
+    python -m benchmarks.soak [--duration 3600] [--threads 4] [--sample-every 60] [--max-growth 20] [--csv soak.csv]
+    python -m benchmarks.soak --self-check
+"""
+import argparse, os, random, sys, tempfile, threading, time
+from collections import Counter
+
+CITIES = [("Pune", 18.52, 73.86), ("Mumbai", 19.08, 72.88), ("Delhi", 28.61, 77.21), ("London", 51.51, -0.13),
+          ("Paris", 48.86, 2.35), ("Berlin", 52.52, 13.40), ("Tokyo", 35.68, 139.69), ("Sydney", -33.87, 151.21),
+          ("New York", 40.71, -74.01), ("Chicago", 41.88, -87.63), ("Cairo", 30.04, 31.24), ("Lima", -12.05, -77.04),
+          ("Oslo", 59.91, 10.75), ("Nairobi", -1.29, 36.82), ("Toronto", 43.65, -79.38), ("Madrid", 40.42, -3.70)]
+QUESTIONS = ["Will it rain tomorrow?", "What's the temperature today?", "Should I carry an umbrella?",
+             "How windy will it be this week?", "What was it like last week?", "Is it good weather for a picnic?",
+             "What about the day after?", "Compare today and tomorrow", "What should I wear?"]
+WORKLOAD = [("create", 8), ("view", 25), ("api_weather", 12), ("chat", 15), ("summary", 8), ("export", 10),
+            ("edit", 5), ("history", 7), ("list", 5), ("delete", 5)]
+
+def install_offline_upstreams():
+    """Answer OpenWeatherMap and Nominatim calls locally with plausible, slowly changing data"""
+    import requests
+    from geopy.geocoders import Nominatim
+    from geopy.location import Location
+
+    class OfflineResponse:
+        status_code = 200
+        headers = {}
+
+        def __init__(self, data):
+            self._data = data
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return self._data
+
+    def weather_now(lat, lon, t):
+        temp = 15 + (lat % 10) + 5 * ((t // 600) % 4)
+        return {"dt": t - t % 600, "main": {"temp": temp, "feels_like": temp - 1, "humidity": 40 + int(lon) % 40,
+                "pressure": 1010}, "visibility": 10000, "wind": {"speed": 3.5},
+                "weather": [{"main": "Clouds", "description": "scattered clouds", "icon": "03d"}]}
+
+    def offline_get(url, params=None, **kwargs):
+        params = params or {}
+        lat, lon, t = float(params.get("lat", 0)), float(params.get("lon", 0)), int(time.time())
+        if url.endswith("/forecast"):
+            start = t - t % 10800
+            return OfflineResponse({"list": [
+                {"dt": start + i * 10800, "dt_txt": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 10800)),
+                 "main": {"temp": 12 + (lat % 10) + (i % 8)},
+                 "weather": [{"main": ("Rain", "Clear", "Clouds")[i % 3], "description": "offline", "icon": "01d"}]}
+                for i in range(40)]})
+        return OfflineResponse(weather_now(lat, lon, t))
+
+    def offline_geocode(self, query, *args, **kwargs):
+        query = str(query).lower()
+        for name, lat, lon in CITIES:
+            if name.lower() in query:
+                return Location(f"{name} (offline)", (lat, lon, 0), {})
+        return None
+
+    def offline_reverse(self, point, *args, **kwargs):
+        return Location("Somewhere (offline)", (point[0], point[1], 0), {})
+
+    requests.get = offline_get
+    Nominatim.geocode = offline_geocode
+    Nominatim.reverse = offline_reverse
+
+def run_client(app, stop, ids, lock, counts, errors, max_records, seed):
+    rng = random.Random(seed)
+    client = app.test_client()
+    ops, weights = zip(*WORKLOAD)
+    while not stop.is_set():
+        op = rng.choices(ops, weights)[0]
+        with lock:
+            rec_id = rng.choice(ids) if ids else None
+        if rec_id is None and op not in ("create", "api_weather", "list"):
+            op = "create"
+        city, lat, lon = rng.choice(CITIES)
+        try:
+            if op == "create":
+                resp = client.post("/create", data={"location": city, "start_date": "", "end_date": ""})
+                location = resp.headers.get("Location", "")
+                if "/view/" in location:
+                    with lock:
+                        ids.append(int(location.rsplit("/", 1)[1]))
+            elif op == "view":
+                resp = client.get(f"/view/{rec_id}")
+            elif op == "api_weather":
+                resp = client.get(f"/api/weather?lat={lat}&lon={lon}")
+            elif op == "chat":
+                resp = client.post(f"/api/chat/{rec_id}", json={"message": rng.choice(QUESTIONS),
+                                                                "session_id": f"soak{rng.randrange(50)}"})
+            elif op == "summary":
+                resp = client.get(f"/api/summary/{rec_id}")
+            elif op == "export":
+                resp = client.get(f"/export/{rec_id}/{rng.choice(['csv', 'md', 'json'])}")
+            elif op == "edit":
+                resp = client.post(f"/edit/{rec_id}", data={"location": rng.choice(CITIES)[0], "start_date": "",
+                                                            "end_date": ""})
+            elif op == "history":
+                resp = client.get(f"/api/history?request_id={rec_id}&granularity=hour&days=2")
+            elif op == "list":
+                resp = client.get("/list")
+            else:
+                with lock:
+                    if len(ids) <= max_records:
+                        continue
+                    rec_id = ids.pop(0)
+                resp = client.post(f"/delete/{rec_id}")
+            resp.get_data()
+            key = op if resp.status_code < 400 or resp.status_code == 404 else f"{op}:{resp.status_code}"
+            (counts if key == op else errors)[key] += 1
+        except Exception as e:
+            errors[f"{op}:{type(e).__name__}"] += 1
+
+def synthetic_rss(shape, hours=4, every=60, seed=0):
+    """(seconds, MB) samples around 300 MB with 2 MB of noise, shaped by shape(fraction of the run)"""
+    rng = random.Random(seed)
+    n = int(hours * 3600 / every) + 1
+    return [(i * every, 300 + shape(i / (n - 1)) + rng.gauss(0, 2)) for i in range(n)]
+
+# (name, extra MB as a function of the run fraction, sustained?) over a 4 hour run
+TREND_CASES = [
+    ("flat", lambda x: 0, False),
+    ("steady leak, 30 MB/hour", lambda x: 120 * x, True),
+    ("slow leak, 5 MB/hour", lambda x: 20 * x, True),
+    ("one step mid-run", lambda x: 80 if x >= 0.5 else 0, False),
+    ("one step early in the window", lambda x: 80 if x >= 0.3 else 0, False),
+    ("one step late in the window", lambda x: 80 if x >= 0.8 else 0, False),
+    ("cache filling, then plateau", lambda x: 60 * min(x / 0.4, 1), False),
+    ("staircase, 10 MB every 20 minutes", lambda x: 10 * int(x * 12), True),
+]
+
+def self_check():
+    """Run growth_trend over TREND_CASES; True when every case is classified as expected"""
+    from memwatch import growth_trend
+    ok = True
+    for name, shape, expected in TREND_CASES:
+        slope, sustained = growth_trend(synthetic_rss(shape))
+        ok &= sustained == expected
+        print(f"{name:<36} {slope:+7.1f} MB/hour  {'sustained' if sustained else 'not sustained':<13}  "
+              f"{'ok' if sustained == expected else 'WRONG'}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=3600, help="seconds to run")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--sample-every", type=float, default=60, help="seconds between memory samples")
+    parser.add_argument("--max-growth", type=float, default=20, help="MB/hour of sustained RSS growth that fails the run")
+    parser.add_argument("--max-records", type=int, default=300, help="records kept before deletes start")
+    parser.add_argument("--trace-frames", type=int, default=1, help="tracemalloc frames (0 = no allocation tracking)")
+    parser.add_argument("--csv", help="write the samples here")
+    parser.add_argument("--self-check", action="store_true", help="only check the trend test on synthetic series")
+    args = parser.parse_args()
+    if args.self_check:
+        sys.exit(0 if self_check() else 1)
+
+    scratch = tempfile.mkdtemp(prefix="soak-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(scratch, 'soak.db')}"
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    install_offline_upstreams()
+    from memwatch import MemoryWatch, start_tracing, growth_trend
+    if args.trace_frames:
+        start_tracing(args.trace_frames)
+    from app import app, setup_database
+    with app.app_context():
+        setup_database()
+
+    watch = MemoryWatch()
+    stop = threading.Event()
+    ids, lock = [], threading.Lock()
+    counts, errors = Counter(), Counter()
+    clients = [threading.Thread(target=run_client, daemon=True,
+                                args=(app, stop, ids, lock, counts, errors, args.max_records, seed))
+               for seed in range(args.threads)]
+    for t in clients:
+        t.start()
+
+    started = time.monotonic()
+    samples, rows = [], []
+    print(f"{'elapsed':>8} {'requests':>9} {'rss MB':>8} {'traced MB':>10}  top growth")
+    while True:
+        elapsed = time.monotonic() - started
+        snap = watch.snapshot(top=3)
+        samples.append((elapsed, snap["rss_mb"]))
+        growth = ", ".join(f"{g['where']} +{g['growth_kb']:.0f}KB" for g in snap.get("growth", [])[:2])
+        total = sum(counts.values()) + sum(errors.values())
+        rows.append((round(elapsed), total, snap["rss_mb"], snap.get("traced_mb", "")))
+        print(f"{elapsed:>7.0f}s {total:>9} {snap['rss_mb']:>8.1f} {snap.get('traced_mb', '-'):>10}  {growth}")
+        if elapsed >= args.duration:
+            break
+        time.sleep(min(args.sample_every, max(0.0, args.duration - elapsed)))
+    stop.set()
+    for t in clients:
+        t.join(timeout=30)
+
+    slope, sustained = growth_trend(samples)
+    failed = sustained and slope > args.max_growth
+    print(f"\nrequests: {dict(counts)}")
+    print(f"errors: {dict(errors) or 'none'}")
+    if slope is None:
+        print(f"RSS {samples[0][1]:.1f} -> {samples[-1][1]:.1f} MB, too few samples for a trend")
+    else:
+        print(f"RSS {samples[0][1]:.1f} -> {samples[-1][1]:.1f} MB, trend after warmup {slope:+.1f} MB/hour, "
+              f"{'sustained' if sustained else 'not sustained'}: {'FAIL' if failed else 'ok'}")
+    final = watch.snapshot(top=10)
+    if final.get("top"):
+        print("top allocation sites:")
+        for stat in final["top"]:
+            print(f"  {stat['size_kb']:>10.1f} KB {stat['count']:>8}  {stat['where']}")
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write("elapsed_s,requests,rss_mb,traced_mb\n")
+            f.writelines(",".join(map(str, row)) + "\n" for row in rows)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Concurrent insert throughput against SQLite with N worker processes.
+
+Each worker process (like a gunicorn worker) runs several threads inserting
+weather_requests-sized rows. Modes:
+
+    default   SQLAlchemy defaults, rollback journal, one commit per row
+    wal       db_profile engine options and pragmas, one commit per row
+    batched   wal + WriteBehindQueue grouping each worker's inserts per transaction
+
+    python -m benchmarks.sqlite_write_bench [--workers 4] [--threads 4] [--rows 200]
+"""
+import argparse, json, os, tempfile, threading, time
+from multiprocessing import Pool
+from sqlalchemy import create_engine, MetaData, Table, Column, Integer, String, Text, Float, DateTime
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
+import db_profile
+
+metadata = MetaData()
+table = Table(
+    "weather_requests", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("user_input", String(256), nullable=False),
+    Column("resolved_name", String(256)),
+    Column("lat", Float), Column("lon", Float),
+    Column("weather_json", Text),
+    Column("ai_summary", Text),
+    Column("created_at", DateTime, default=datetime.utcnow),
+)
+
+PAYLOAD = json.dumps({"current": {"dt": 1761655752, "temp": 25.04, "humidity": 78},
+                      "daily": [{"dt": 1761663600 + i * 86400, "temp": {"min": 23.4, "max": 24.4, "day": 23.9},
+                                 "weather": [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10n"}]}
+                                for i in range(5)]})
+ROW = {"user_input": "Mumbai", "resolved_name": "Mumbai, Maharashtra, India", "lat": 19.07, "lon": 72.87,
+       "weather_json": PAYLOAD, "ai_summary": "Light rain expected over the next few days. " * 4}
+
+def make_engine(uri, mode):
+    if mode == "default":
+        return create_engine(uri)
+    engine = create_engine(uri, **db_profile.engine_options(uri))
+    db_profile.install_pragmas(engine)
+    return engine
+
+def worker(args):
+    uri, mode, threads, rows = args
+    engine = make_engine(uri, mode)
+    write_queue = db_profile.WriteBehindQueue(engine) if mode == "batched" else None
+    errors = []
+
+    def run():
+        for _ in range(rows):
+            try:
+                if write_queue:
+                    write_queue.submit(table, dict(ROW)).result(60)
+                else:
+                    with engine.begin() as conn:
+                        conn.execute(table.insert().values(**ROW))
+            except OperationalError as e:
+                errors.append(str(e.orig))
+
+    ts = [threading.Thread(target=run) for _ in range(threads)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    batches = write_queue.batches if write_queue else None
+    engine.dispose()
+    return len(errors), batches
+
+def run_mode(mode, workers, threads, rows):
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    uri = f"sqlite:///{path}"
+    metadata.create_all(create_engine(uri))
+    t0 = time.perf_counter()
+    with Pool(workers) as pool:
+        results = pool.map(worker, [(uri, mode, threads, rows)] * workers)
+    elapsed = time.perf_counter() - t0
+    errors = sum(r[0] for r in results)
+    batches = sum(r[1] for r in results) if mode == "batched" else None
+    committed = workers * threads * rows - errors
+    return committed, errors, elapsed, batches
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--rows", type=int, default=200, help="inserts per thread")
+    parser.add_argument("--modes", default="default,wal,batched")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.threads} threads x {args.rows} rows\n")
+    print(f"{'mode':<10}{'rows/s':>10}{'committed':>11}{'locked':>8}{'txns':>8}{'seconds':>9}")
+    for mode in args.modes.split(","):
+        committed, errors, elapsed, batches = run_mode(mode, args.workers, args.threads, args.rows)
+        txns = batches if batches is not None else committed
+        print(f"{mode:<10}{committed / elapsed:>10.0f}{committed:>11}{errors:>8}{txns:>8}{elapsed:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Storage ratio and decode cost of the payload codecs on stored rows.
+
+Half of the stored documents train the dictionaries and the other half are
+measured, so the trained-dictionary numbers are not flattered by training on
+the test set.
+
+    python -m benchmarks.storage_bench [--db instance/weather.db]
+"""
+import argparse, sqlite3, time, zlib
+import compression
+
+def load_docs(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.text_factory = bytes
+    rows = conn.execute("SELECT weather_json, ai_summary FROM weather_requests ORDER BY id").fetchall()
+    conn.close()
+    # one list of documents per row, so train/test can be split by row
+    return [[compression.decompress(v) if compression.is_compressed(v) else v.decode("utf-8") for v in row if v]
+            for row in rows]
+
+def zlib_codec(zdict=None):
+    def enc(s):
+        c = zlib.compressobj(9, zlib.DEFLATED, -15, **({"zdict": zdict} if zdict else {}))
+        return c.compress(s.encode()) + c.flush()
+    def dec(b):
+        d = zlib.decompressobj(-15, **({"zdict": zdict} if zdict else {}))
+        return (d.decompress(b) + d.flush()).decode()
+    return enc, dec
+
+def zstd_codec(zdict=None):
+    z = compression.zstandard
+    d = z.ZstdCompressionDict(zdict) if zdict else None
+    cctx = z.ZstdCompressor(level=compression.ZSTD_LEVEL, dict_data=d)
+    dctx = z.ZstdDecompressor(dict_data=d)
+    return (lambda s: cctx.compress(s.encode())), (lambda b: dctx.decompress(b).decode())
+
+def measure(name, enc, dec, docs, repeat=20):
+    blobs = [enc(d) for d in docs]
+    raw = sum(len(d.encode()) for d in docs)
+    stored = sum(len(b) + compression.HEADER.size for b in blobs)
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for b in blobs:
+            dec(b)
+    per_doc = (time.perf_counter() - t0) / (repeat * len(blobs))
+    print(f"{name:<26}{raw:>10}{stored:>10}{raw / stored:>8.2f}{per_doc * 1e6:>12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default="instance/weather.db")
+    args = parser.parse_args()
+
+    rows = load_docs(args.db)
+    if len(rows) < 4:
+        raise SystemExit(f"need a few stored rows in {args.db}")
+    train = [d for row in rows[::2] for d in row]
+    test = [d for row in rows[1::2] for d in row]
+    print(f"{len(test)} documents measured, {len(train)} used for training\n")
+    print(f"{'codec':<26}{'raw B':>10}{'stored B':>10}{'ratio':>8}{'decode us':>12}")
+
+    seed = compression._dictionaries[0][1]
+    zlib_trained = b"".join(s.encode() for s in train[-64:])[-32 * 1024:]
+    measure("zlib", *zlib_codec(), test)
+    measure("zlib + seed dict", *zlib_codec(seed), test)
+    measure("zlib + trained dict", *zlib_codec(zlib_trained), test)
+    if compression.zstandard is not None:
+        measure("zstd", *zstd_codec(), test)
+        try:
+            trained = compression.zstandard.train_dictionary(16 * 1024, [s.encode() for s in train]).as_bytes()
+            measure("zstd + trained dict", *zstd_codec(trained), test)
+        except compression.zstandard.ZstdError as e:
+            print(f"{'zstd + trained dict':<26}(training failed: {e})")
+    else:
+        print("(zstandard not installed; zstd rows skipped)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Latency, peak RSS and output quality of the summarizer backends.
+
+Each backend runs in its own subprocess (so peak RSS is per backend) over a
+fixed set of weather prompts built by build_summary_prompt. Quality is the
+ROUGE-1 / ROUGE-L F1 of each backend's summaries against the full-precision
+bart output for the same prompt, so the bart row is 1.000 by definition.
+
+    python -m benchmarks.summarizer_bench [--backends bart,int8,onnx,distilled] [--repeat 3]
+"""
+import argparse, json, re, resource, subprocess, sys, time
+
+# (city, current conditions, five daily (min, max, main, description))
+CASES = [
+    ("Mumbai", (31, 36, 78, "haze"), [(27, 32, "Rain", "moderate rain"), (27, 31, "Rain", "heavy intensity rain"),
+                                      (26, 31, "Rain", "light rain"), (27, 32, "Clouds", "overcast clouds"),
+                                      (27, 33, "Rain", "light rain")]),
+    ("Delhi", (38, 41, 22, "clear sky"), [(29, 40, "Clear", "clear sky"), (30, 41, "Clear", "clear sky"),
+                                          (30, 42, "Clear", "sky is clear"), (31, 42, "Clouds", "few clouds"),
+                                          (30, 40, "Clear", "clear sky")]),
+    ("London", (12, 10, 84, "light rain"), [(8, 13, "Rain", "light rain"), (7, 12, "Clouds", "broken clouds"),
+                                            (6, 11, "Clouds", "overcast clouds"), (5, 10, "Rain", "moderate rain"),
+                                            (6, 12, "Clear", "clear sky")]),
+    ("Oslo", (-4, -9, 70, "snow"), [(-8, -3, "Snow", "light snow"), (-10, -5, "Snow", "snow"),
+                                    (-12, -6, "Clear", "clear sky"), (-11, -4, "Clouds", "few clouds"),
+                                    (-9, -2, "Snow", "light snow")]),
+    ("Sydney", (22, 22, 60, "scattered clouds"), [(17, 24, "Clouds", "scattered clouds"), (18, 26, "Clear", "clear sky"),
+                                                  (19, 27, "Clear", "clear sky"), (18, 23, "Rain", "light rain"),
+                                                  (16, 22, "Clouds", "broken clouds")]),
+    ("Denver", (18, 17, 30, "few clouds"), [(6, 20, "Clear", "clear sky"), (8, 24, "Clouds", "few clouds"),
+                                            (2, 11, "Snow", "light snow"), (-1, 7, "Snow", "snow"),
+                                            (4, 15, "Clear", "clear sky")]),
+]
+
+def weather_payload(current, days):
+    temp, feels, humidity, desc = current
+    return {
+        "current": {"temp": temp, "feels_like": feels, "humidity": humidity, "weather": [{"description": desc}]},
+        "daily": [{"temp": {"min": lo, "max": hi, "day": round((lo + hi) / 2, 1)},
+                   "weather": [{"main": main, "description": d}]} for lo, hi, main, d in days],
+    }
+
+def prompts():
+    from utils import build_summary_prompt
+    return [build_summary_prompt(weather_payload(cur, days), city) for city, cur, days in CASES]
+
+def tokens(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+def f1(overlap, n_ref, n_cand):
+    if not overlap:
+        return 0.0
+    p, r = overlap / n_cand, overlap / n_ref
+    return 2 * p * r / (p + r)
+
+def rouge1(ref, cand):
+    ref, cand = tokens(ref), tokens(cand)
+    counts = {}
+    for t in ref:
+        counts[t] = counts.get(t, 0) + 1
+    overlap = 0
+    for t in cand:
+        if counts.get(t):
+            counts[t] -= 1
+            overlap += 1
+    return f1(overlap, len(ref), len(cand))
+
+def rouge_l(ref, cand):
+    ref, cand = tokens(ref), tokens(cand)
+    prev = [0] * (len(cand) + 1)
+    for r in ref:
+        row = [0]
+        for j, c in enumerate(cand):
+            row.append(prev[j] + 1 if r == c else max(prev[j + 1], row[j]))
+        prev = row
+    return f1(prev[-1], len(ref), len(cand))
+
+def run_backend(backend, repeat):
+    """Child process: load one backend, summarize every prompt, report as JSON"""
+    from summarizer_backends import load_summarizer
+    from utils import SUMMARY_GENERATION
+    texts = prompts()
+    t0 = time.perf_counter()
+    model = load_summarizer(backend)
+    load_s = time.perf_counter() - t0
+    model(texts[0], **SUMMARY_GENERATION)  # warm-up
+    latencies, outputs = [], []
+    for text in texts:
+        best = float("inf")
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            out = model(text, **SUMMARY_GENERATION)[0]["summary_text"]
+            best = min(best, time.perf_counter() - t0)
+        latencies.append(best)
+        outputs.append(out)
+    # ru_maxrss is KiB on Linux
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    json.dump({"load_s": load_s, "latencies": latencies, "peak_rss_mb": peak_mb, "outputs": outputs}, sys.stdout)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="bart,int8,onnx,distilled")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per prompt (best is kept)")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--show", action="store_true", help="print every summary")
+    args = parser.parse_args()
+
+    if args.worker:
+        run_backend(args.worker, args.repeat)
+        return
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "bart" not in backends:
+        backends.insert(0, "bart")  # the quality reference
+    results = {}
+    for backend in backends:
+        proc = subprocess.run([sys.executable, "-m", "benchmarks.summarizer_bench", "--worker", backend,
+                               "--repeat", str(args.repeat)], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else ''}")
+            continue
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    if "bart" not in results:
+        print("bart reference backend did not run; no quality comparison possible")
+        return
+    reference = results["bart"]["outputs"]
+    print(f"\n{len(CASES)} prompts, best of {args.repeat} runs each")
+    print(f"{'backend':<10} {'load s':>8} {'mean ms':>9} {'max ms':>9} {'peak MB':>9} {'ROUGE-1':>8} {'ROUGE-L':>8}")
+    for backend, r in results.items():
+        lat = r["latencies"]
+        r1 = sum(rouge1(a, b) for a, b in zip(reference, r["outputs"])) / len(reference)
+        rl = sum(rouge_l(a, b) for a, b in zip(reference, r["outputs"])) / len(reference)
+        print(f"{backend:<10} {r['load_s']:>8.1f} {1e3 * sum(lat) / len(lat):>9.0f} {1e3 * max(lat):>9.0f} "
+              f"{r['peak_rss_mb']:>9.0f} {r1:>8.3f} {rl:>8.3f}")
+        if args.show:
+            for (city, *_), out in zip(CASES, r["outputs"]):
+                print(f"    {city}: {out}")
+
+if __name__ == "__main__":
+    main()
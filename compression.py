@@ -0,0 +1,175 @@
+import zlib
+import json
+import struct
+from sqlalchemy import text
+from sqlalchemy.types import TypeDecorator, Text
+
+# Transparent compression for large text columns (weather_json, ai_summary).
+#
+# Stored payloads are very repetitive JSON, so a shared dictionary does most of
+# the work: every blob records which dictionary and codec it was written with,
+# which lets new dictionaries be trained without rewriting old rows. Legacy rows
+# stored as plain TEXT are returned untouched.
+#
+# Blob layout: MAGIC | codec (1 byte) | dictionary id (2 bytes, big endian) | data
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b"\x00WZ"
+HEADER = struct.Struct(">3scH")
+CODEC_ZLIB, CODEC_ZSTD = b"z", b"s"
+MIN_COMPRESS_BYTES = 64
+ZLIB_LEVEL = 9
+ZSTD_LEVEL = 10
+
+def _seed_dictionary():
+    """Built-in zlib dictionary (id 0): a representative payload so compression works before any training.
+
+    NEVER change this. Every row written before training refers to dictionary 0
+    and becomes unreadable if these bytes change; to improve the seed, add a new
+    dictionary id (train_dictionary) instead.
+    """
+    day = {"dt": 1761663600, "date": "2025-10-28", "temp": {"min": 22.98, "max": 28.24, "day": 24.997500000000002, "avg": 24.997500000000002},
+           "weather": [{"id": 500, "main": "Rain", "description": "light rain", "icon": "10d"}],
+           "description": "scattered clouds", "main_condition": "Clouds"}
+    doc = {"current": {"dt": 1761655752, "temp": 25.04, "feels_like": 25.64, "humidity": 78, "pressure": 1012,
+                       "visibility": 10.0, "wind_speed": 3.6,
+                       "weather": [{"id": 803, "main": "Clouds", "description": "broken clouds", "icon": "04n"}],
+                       "description": "overcast clouds", "main": "Clouds"},
+           "daily": [day, day], "requested_start_date": "", "requested_end_date": ""}
+    summary = ("Right now in the city, it's clear sky at 25°C (pleasant weather). Over the next few days, "
+               "temperatures will be staying fairly consistent with several rainy days expected - perfect time "
+               "for indoor activities. Average temperature will be around 24.5°C. Light jacket or sweater should be sufficient.")
+    # zlib favours matches near the end of the dictionary, so put the most common strings last
+    return (summary + json.dumps(doc)).encode("utf-8")
+
+# dictionary id -> (codec, dictionary bytes)
+_dictionaries = {0: (CODEC_ZLIB, _seed_dictionary())}
+_active_id = 0
+_engine = None
+_zstd_dicts = {}
+
+def init_storage(engine):
+    """Load trained dictionaries and remember the engine to fetch ones trained by other workers.
+
+    A no-op on other databases, where CompressedText stores plain text.
+    """
+    global _engine
+    if engine.dialect.name != "sqlite":
+        return
+    _engine = engine
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS compression_dicts ("
+            "id INTEGER PRIMARY KEY, codec VARCHAR(1) NOT NULL, data BLOB NOT NULL, created_at DATETIME DEFAULT CURRENT_TIMESTAMP)"))
+        rows = conn.execute(text("SELECT id, codec, data FROM compression_dicts ORDER BY id")).fetchall()
+    for dict_id, codec, data in rows:
+        _register(dict_id, codec.encode(), bytes(data))
+
+def _register(dict_id, codec, data):
+    global _active_id
+    if codec == CODEC_ZSTD and zstandard is None:
+        return  # readable only where zstandard is installed; keep writing with the previous dictionary
+    _dictionaries[dict_id] = (codec, data)
+    _active_id = max(_active_id, dict_id)
+
+def _dictionary(dict_id):
+    if dict_id not in _dictionaries and _engine is not None:
+        with _engine.connect() as conn:
+            row = conn.execute(text("SELECT codec, data FROM compression_dicts WHERE id = :id"), {"id": dict_id}).fetchone()
+        if row:
+            _dictionaries[dict_id] = (row[0].encode(), bytes(row[1]))
+    return _dictionaries[dict_id]
+
+def _zstd(dict_id, data):
+    if dict_id not in _zstd_dicts:
+        _zstd_dicts[dict_id] = zstandard.ZstdCompressionDict(data)
+    return _zstd_dicts[dict_id]
+
+def compress(value, dict_id=None):
+    """Compress a string with the active (or given) dictionary; returns a self-describing blob"""
+    dict_id = _active_id if dict_id is None else dict_id
+    codec, zdict = _dictionary(dict_id)
+    raw = value.encode("utf-8")
+    if codec == CODEC_ZSTD:
+        data = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=_zstd(dict_id, zdict)).compress(raw)
+    else:
+        c = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=zdict)
+        data = c.compress(raw) + c.flush()
+    return HEADER.pack(MAGIC, codec, dict_id) + data
+
+def decompress(value):
+    """Inverse of compress(); plain strings (legacy rows) pass through unchanged"""
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    if not value.startswith(MAGIC):
+        return value.decode("utf-8")
+    _, codec, dict_id = HEADER.unpack_from(value)
+    data = value[HEADER.size:]
+    _, zdict = _dictionary(dict_id)
+    if codec == CODEC_ZSTD:
+        raw = zstandard.ZstdDecompressor(dict_data=_zstd(dict_id, zdict)).decompress(data)
+    else:
+        d = zlib.decompressobj(-15, zdict=zdict)
+        raw = d.decompress(data) + d.flush()
+    return raw.decode("utf-8")
+
+def is_compressed(value):
+    return isinstance(value, (bytes, memoryview)) and bytes(value[:len(MAGIC)]) == MAGIC
+
+def _encoded_size(codec, data, docs):
+    if codec == CODEC_ZSTD:
+        cctx = zstandard.ZstdCompressor(level=ZSTD_LEVEL, dict_data=zstandard.ZstdCompressionDict(data))
+        return sum(len(cctx.compress(d)) for d in docs)
+    total = 0
+    for d in docs:
+        c = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -15, zdict=data)
+        total += len(c.compress(d) + c.flush())
+    return total
+
+def train_dictionary(samples, size=16 * 1024):
+    """Train a shared dictionary from sample documents and store it as the new active dictionary.
+
+    Candidate zlib and zstd dictionaries are scored on held-out samples and the
+    smaller output wins; zstd's trainer needs a fair amount of data to beat a
+    plain zlib dictionary.
+    """
+    if _engine is None:
+        raise RuntimeError("compression dictionaries are only used with SQLite")
+    samples = [s.encode("utf-8") for s in samples if s]
+    if not samples:
+        raise ValueError("no samples to train on")
+    holdout = samples[::5] if len(samples) >= 10 else samples
+    train = [s for i, s in enumerate(samples) if i % 5] if len(samples) >= 10 else samples
+    # zlib has no trainer; concatenate recent samples (most recent last) up to its 32KB window
+    candidates = [(CODEC_ZLIB, b"".join(train[-64:])[-min(size * 2, 32 * 1024):])]
+    if zstandard is not None and len(train) >= 8:
+        try:
+            candidates.append((CODEC_ZSTD, zstandard.train_dictionary(size, train).as_bytes()))
+        except zstandard.ZstdError as e:
+            print("zstd dictionary training failed:", e)
+    codec, data = min(candidates, key=lambda c: _encoded_size(c[0], c[1], holdout))
+    with _engine.begin() as conn:
+        conn.execute(text("INSERT INTO compression_dicts (codec, data) VALUES (:codec, :data)"),
+                     {"codec": codec.decode(), "data": data})
+        dict_id = conn.execute(text("SELECT max(id) FROM compression_dicts")).scalar()
+    _register(dict_id, codec, data)
+    return dict_id, codec.decode(), len(data)
+
+
+class CompressedText(TypeDecorator):
+    """Text column stored as a compressed blob on SQLite, read back as str"""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or dialect.name != "sqlite" or len(value) < MIN_COMPRESS_BYTES:
+            return value
+        return compress(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress(value)
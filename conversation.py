@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Per-record chat sessions: the entities resolved so far (location and its
+# coordinates, target date, intents, a compact copy of the weather) plus the last
+# few turns, so follow-ups like "and the day after?" need no geocode or refetch.
+#
+# The default store lives in the worker process. Set CONVERSATION_BACKEND=redis
+# (and REDIS_URL) to share sessions between gunicorn workers.
+
+CONVERSATION_BACKEND = os.getenv("CONVERSATION_BACKEND", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+MAX_SESSIONS = int(os.getenv("CONVERSATION_MAX_SESSIONS", "5000"))
+SESSION_TTL = int(os.getenv("CONVERSATION_TTL", "900"))
+MAX_TURNS = int(os.getenv("CONVERSATION_MAX_TURNS", "6"))
+MAX_TURN_CHARS = 500
+MAX_SESSION_BYTES = int(os.getenv("CONVERSATION_MAX_BYTES", "8192"))
+
+def compact_weather(weather_data):
+    """The subset of a weather payload the chatbot analyses and answers from"""
+    current = weather_data.get("current", {})
+    return {
+        "location": weather_data.get("location"),
+        "current": {k: current.get(k) for k in ("dt", "temp", "feels_like", "humidity", "wind_speed",
+                                                 "visibility", "description", "main")},
+        "daily": [{"date": d.get("date"), "dt": d.get("dt"), "temp": d.get("temp"),
+                   "description": d.get("description"), "main_condition": d.get("main_condition")}
+                  for d in weather_data.get("daily", [])[:5]],
+    }
+
+def trim_session(session):
+    """Enforce the per-session caps: recent turns only, bounded text, bounded serialized size"""
+    turns = session.get("turns", [])[-MAX_TURNS:]
+    session["turns"] = [[u[:MAX_TURN_CHARS], b[:MAX_TURN_CHARS]] for u, b in turns]
+    while len(json.dumps(session)) > MAX_SESSION_BYTES:
+        if session["turns"]:
+            session["turns"].pop(0)
+        elif session.get("weather"):
+            # without the weather copy a follow-up refetches, but still skips the geocode
+            session.pop("weather")
+        else:
+            break
+    return session
+
+
+class MemoryConversationStore:
+    """In-process session store with LRU eviction and idle TTL"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, ttl=SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        with self._lock:
+            entry = self._data.get(session_id)
+            if entry is None:
+                return None
+            expires, payload = entry
+            if expires < time.monotonic():
+                del self._data[session_id]
+                return None
+            self._data.move_to_end(session_id)
+            return json.loads(payload)
+
+    def save(self, session_id, session):
+        # stored serialized so callers never share mutable state across requests
+        payload = json.dumps(trim_session(session))
+        with self._lock:
+            self._data[session_id] = (time.monotonic() + self.ttl, payload)
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.max_sessions:
+                self._data.popitem(last=False)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k.startswith(prefix)]:
+                del self._data[key]
+
+    def __len__(self):
+        return len(self._data)
+
+
+class RedisConversationStore:
+    """Shared session store; TTL via SETEX, LRU via the server's maxmemory-policy (allkeys-lru)"""
+
+    def __init__(self, url=REDIS_URL, ttl=SESSION_TTL, prefix="chat:"):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, session_id):
+        payload = self.client.get(self.prefix + session_id)
+        return json.loads(payload) if payload else None
+
+    def save(self, session_id, session):
+        self.client.setex(self.prefix + session_id, self.ttl, json.dumps(trim_session(session)))
+
+    def delete_prefix(self, prefix):
+        keys = list(self.client.scan_iter(match=self.prefix + prefix + "*", count=500))
+        if keys:
+            self.client.delete(*keys)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefix + "*", count=500))
+
+
+_store = None
+
+def get_conversation_store():
+    """Configured session store, created once per process"""
+    global _store
+    if _store is None:
+        if CONVERSATION_BACKEND == "redis":
+            try:
+                _store = RedisConversationStore()
+            except ImportError:
+                print("Warning: redis package not installed, using in-process conversation store")
+        if _store is None:
+            _store = MemoryConversationStore()
+    return _store
@@ -0,0 +1,110 @@
+import json, hashlib
+from predictor import predict_next_temp
+from timeseries import recent_daily_means
+
+# Bump whenever compute_derived changes shape or results so stored rows get recomputed
+# (2: the prediction uses observed history)
+DERIVED_VERSION = 2
+
+def payload_hash(weather_json):
+    """Content hash of a stored weather payload"""
+    return hashlib.sha1((weather_json or "").encode("utf-8")).hexdigest()
+
+def _first_weather(entry):
+    weather = entry.get("weather") or [{}]
+    return {"description": weather[0].get("description", ""), "icon": weather[0].get("icon")}
+
+def compute_derived(weather_data, history=None):
+    """Everything /view renders from a weather payload: display fields, chart series, prediction and analysis.
+
+    history is the observed daily mean temperatures leading up to the forecast, used by the prediction.
+    """
+    current = weather_data.get("current") or {}
+    daily = weather_data.get("daily", [])[:5]
+
+    derived = {
+        "current": None,
+        "daily": [],
+        "chart": {"labels": [], "day": [], "min": [], "max": [], "current_temp": None},
+        "pred_temp": predict_next_temp(weather_data, history=history),
+        "analysis": {},
+    }
+
+    if current:
+        derived["current"] = {
+            "temp": current.get("temp"),
+            "feels_like": current.get("feels_like"),
+            "humidity": current.get("humidity"),
+            "weather": [_first_weather(current)],
+        }
+        derived["chart"]["current_temp"] = current.get("temp")
+
+    for i, d in enumerate(daily):
+        temp = d.get("temp", {})
+        derived["daily"].append({
+            "dt": d.get("dt"),
+            "temp": {"min": temp.get("min"), "max": temp.get("max"), "day": temp.get("day")},
+            "weather": [_first_weather(d)],
+        })
+        derived["chart"]["labels"].append("Today" if i == 0 else "Tomorrow" if i == 1 else f"Day {i+1}")
+        derived["chart"]["day"].append(temp.get("day"))
+        derived["chart"]["min"].append(temp.get("min"))
+        derived["chart"]["max"].append(temp.get("max"))
+
+    temps = [t for t in derived["chart"]["day"] if t is not None]
+    if temps:
+        conditions = [(d.get("weather") or [{}])[0].get("main", "").lower() for d in daily]
+        if len(temps) >= 2 and temps[-1] > temps[0] + 2:
+            trend = "warming"
+        elif len(temps) >= 2 and temps[-1] < temps[0] - 2:
+            trend = "cooling"
+        else:
+            trend = "stable"
+        derived["analysis"] = {
+            "avg_temp": round(sum(temps) / len(temps), 2),
+            "min_temp": min(derived["chart"]["min"], default=None),
+            "max_temp": max(derived["chart"]["max"], default=None),
+            "trend": trend,
+            "rain_days": conditions.count("rain"),
+            "clear_days": conditions.count("clear"),
+            "dominant_condition": max(set(conditions), key=conditions.count) if conditions else None,
+        }
+    return derived
+
+def store_weather(rec, weather_data):
+    """Write a weather payload onto a record together with its materialized derived data"""
+    rec.weather_json = json.dumps(weather_data)
+    refresh_derived(rec, weather_data)
+
+def refresh_derived(rec, weather_data=None):
+    """Recompute and store derived data for the record's current payload"""
+    if weather_data is None:
+        weather_data = rec.weather()
+    rec.payload_hash = payload_hash(rec.weather_json)
+    first_day = (weather_data.get("daily") or [{}])[0].get("date")
+    derived = compute_derived(weather_data, recent_daily_means(rec.lat, rec.lon, first_day))
+    derived["version"] = DERIVED_VERSION
+    rec.derived_json = json.dumps(derived)
+    return derived
+
+def is_stale(rec):
+    """True when the stored derived data is missing, from an older version or for a different payload"""
+    if not rec.derived_json or rec.payload_hash != payload_hash(rec.weather_json):
+        return True
+    try:
+        return json.loads(rec.derived_json).get("version") != DERIVED_VERSION
+    except ValueError:
+        return True
+
+def load_derived(rec):
+    """Derived data for /view; rows not yet backfilled are computed on the fly without writing"""
+    if rec.derived_json and rec.payload_hash:
+        try:
+            derived = json.loads(rec.derived_json)
+            if derived.get("version") == DERIVED_VERSION:
+                return derived
+        except ValueError:
+            pass
+    derived = compute_derived(rec.weather())
+    derived["version"] = DERIVED_VERSION
+    return derived
@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-step timings for /edit. Each request gets a Server-Timing header with the
+# steps it actually ran, and the per-process totals are served by /api/edit/stats.
+
+_stats = {"edits": 0, "outcomes": {}, "steps": {}}
+_lock = threading.Lock()
+
+class EditTimer:
+    """Times the steps of one edit and records them into the process-wide stats"""
+
+    def __init__(self):
+        self.steps = {}
+        self.outcome = None
+
+    @contextmanager
+    def step(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[name] = self.steps.get(name, 0.0) + time.perf_counter() - started
+
+    def finish(self, outcome):
+        """Record the edit as `outcome` (unchanged, refiltered, refetched, ...)"""
+        self.outcome = outcome
+        with _lock:
+            _stats["edits"] += 1
+            _stats["outcomes"][outcome] = _stats["outcomes"].get(outcome, 0) + 1
+            for name, seconds in self.steps.items():
+                step = _stats["steps"].setdefault(name, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+                step["count"] += 1
+                step["total_ms"] += seconds * 1000
+                step["max_ms"] = max(step["max_ms"], seconds * 1000)
+
+    def server_timing(self):
+        """Server-Timing header value, e.g. `geocode;dur=312.4, derive;dur=1.2`"""
+        return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.steps.items())
+
+def edit_stats():
+    with _lock:
+        steps = {name: dict(step, mean_ms=round(step["total_ms"] / step["count"], 2),
+                            total_ms=round(step["total_ms"], 2), max_ms=round(step["max_ms"], 2))
+                 for name, step in _stats["steps"].items()}
+        return {"edits": _stats["edits"], "outcomes": dict(_stats["outcomes"]), "steps": steps}
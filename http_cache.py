@@ -0,0 +1,73 @@
+import os
+import hashlib
+from datetime import datetime, timezone
+from flask import request, make_response
+
+# How long fetched weather is considered fresh (OpenWeatherMap updates roughly every 10 minutes)
+WEATHER_FRESHNESS_SECONDS = int(os.getenv("WEATHER_FRESHNESS_SECONDS", "600"))
+# Bump to invalidate every validator after a deploy that changes rendered output
+CACHE_VERSION = os.getenv("CACHE_VERSION", "1")
+
+# Cache-Control policy per endpoint
+CACHE_POLICIES = {
+    # stored records only change on /edit, so let clients keep a copy but always revalidate
+    "view": "private, no-cache",
+    "export": "public, no-cache",
+    "chart": "private, no-cache",
+    # live weather is fresh for the provider's update window
+    "api_weather": f"public, max-age={WEATHER_FRESHNESS_SECONDS}, stale-while-revalidate={WEATHER_FRESHNESS_SECONDS // 2}",
+}
+
+def make_etag(*parts):
+    """Build a strong ETag value from the given content parts"""
+    h = hashlib.sha1(CACHE_VERSION.encode())
+    for part in parts:
+        h.update(b"\x1f")
+        h.update(str(part).encode("utf-8"))
+    return h.hexdigest()
+
+def record_etag(rec, *extra):
+    """ETag for a stored WeatherRequest, derived from everything that is rendered from it.
+
+    The payload and summary enter through their stored hashes and updated_at, so
+    building it never decodes the compressed columns.
+    """
+    return make_etag(rec.id, rec.user_input, rec.resolved_name, rec.lat, rec.lon, rec.start_date, rec.end_date,
+                     rec.payload_hash, rec.summary_hash, record_last_modified(rec), *extra)
+
+def record_last_modified(rec):
+    """Last-Modified for a stored WeatherRequest (rows created before updated_at existed use created_at)"""
+    return getattr(rec, "updated_at", None) or rec.created_at
+
+def _as_utc(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
+
+def is_not_modified(etag, last_modified=None):
+    """Check the current request's If-None-Match / If-Modified-Since against our validators"""
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    last_modified = _as_utc(last_modified)
+    if last_modified and request.if_modified_since:
+        return last_modified <= request.if_modified_since
+    return False
+
+def apply_validators(response, etag, last_modified=None, policy=None):
+    """Attach ETag, Last-Modified and the endpoint's Cache-Control policy to a response"""
+    response.set_etag(etag)
+    last_modified = _as_utc(last_modified)
+    if last_modified:
+        response.last_modified = last_modified
+    if policy:
+        response.headers["Cache-Control"] = CACHE_POLICIES[policy]
+    return response
+
+def not_modified(etag, last_modified=None, policy=None):
+    """Empty 304 response carrying the same validators as the full one"""
+    return apply_validators(make_response("", 304), etag, last_modified, policy)
@@ -0,0 +1,374 @@
+import os
+import csv
+import json
+import queue
+import threading
+import time
+import requests
+from geopy import exc as geopy_exc
+from resilience import CircuitOpen
+from models import db, WeatherRequest, IngestProgress
+from derived_utils import store_weather
+from live_updates import location_id
+from timeseries import record_observations
+from utils import geolocator, get_weather, ai_generate_summary, create_enhanced_summary
+
+# Bulk creation of WeatherRequest rows from a CSV or NDJSON location list.
+#
+# Items flow through geocode -> weather -> summary stages, each with its own
+# worker pool and a bounded queue in front of it (so a slow stage applies
+# backpressure instead of buffering the whole file). The writer commits rows in
+# batches together with their ingest_progress checkpoints, so a rerun of the
+# same job skips everything already written. Rate-limited or failing upstream
+# calls pause the whole stage and are retried with backoff.
+
+INGEST_GEOCODE_WORKERS = int(os.getenv("INGEST_GEOCODE_WORKERS", "1"))
+INGEST_GEOCODE_INTERVAL = float(os.getenv("INGEST_GEOCODE_INTERVAL", "1.0"))  # Nominatim allows 1 request/s
+INGEST_WEATHER_WORKERS = int(os.getenv("INGEST_WEATHER_WORKERS", "8"))
+INGEST_SUMMARY_WORKERS = int(os.getenv("INGEST_SUMMARY_WORKERS", "1"))
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "100"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "5"))
+
+_STOP = object()
+
+def read_locations(path):
+    """Yield (item key, fields, error) from a CSV file with a header row, or NDJSON.
+
+    The key is `id` or the line number. A malformed NDJSON line yields its line
+    number as the key, no fields and the parse error, so one bad row doesn't end the file.
+    A repeated `id` is an error too, rather than a second insert under the same checkpoint.
+    """
+    seen = set()
+    for n, fields, error in _read_rows(path):
+        if error:
+            yield str(n), None, f"line {n}: {error}"
+            continue
+        if fields.get("id"):
+            key = str(fields["id"])
+            if key in seen:
+                yield key, None, f"line {n}: duplicate id {key}"
+                continue
+            seen.add(key)
+        else:
+            key = str(n)
+        yield key, fields, None
+
+def _read_rows(path):
+    # (line number, fields, error)
+    if path.endswith((".ndjson", ".jsonl")):
+        with open(path, encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    fields = json.loads(line)
+                    if not isinstance(fields, dict):
+                        raise ValueError("expected a JSON object")
+                except ValueError as e:
+                    yield n, None, e
+                    continue
+                yield n, fields, None
+    else:
+        with open(path, newline="", encoding="utf-8") as f:
+            for n, row in enumerate(csv.DictReader(f), 2):
+                yield n, row, None
+
+def make_item(key, fields):
+    def number(name):
+        try:
+            return float(fields[name]) if fields.get(name) not in (None, "") else None
+        except ValueError:
+            return None
+    return {
+        "key": key,
+        "location": str(fields.get("location") or fields.get("user_input") or "").strip(),
+        "name": fields.get("name") or None,
+        "lat": number("lat"),
+        "lon": number("lon"),
+        "start_date": fields.get("start_date") or "",
+        "end_date": fields.get("end_date") or "",
+    }
+
+def _causes(exc):
+    # get_weather re-raises as a plain Exception, so look through the implicit chain too
+    while exc is not None:
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+def retry_delay(exc, attempt):
+    """Seconds to wait before retrying a transient failure, or None when retrying won't help"""
+    backoff = min(60.0, 2.0 ** attempt)
+    for e in _causes(exc):
+        if isinstance(e, CircuitOpen):
+            return max(1.0, e.retry_after)
+        if isinstance(e, geopy_exc.GeocoderRateLimited):
+            return float(e.retry_after or backoff)
+        if isinstance(e, (geopy_exc.GeocoderTimedOut, geopy_exc.GeocoderUnavailable)):
+            return backoff
+        if isinstance(e, requests.HTTPError) and e.response is not None:
+            status = e.response.status_code
+            if status == 429 or status >= 500:
+                retry_after = e.response.headers.get("Retry-After", "")
+                return float(retry_after) if retry_after.isdigit() else backoff
+            return None
+        if isinstance(e, (requests.ConnectionError, requests.Timeout)):
+            return backoff
+    return None
+
+
+class Stage:
+    """A pipeline step: worker count, call spacing, shared rate-limit pause and throughput counters"""
+
+    def __init__(self, name, func, workers=1, min_interval=0.0, needs_call=None):
+        self.name = name
+        self.func = func
+        # items this rejects are handled locally, without waiting for the stage's call spacing
+        self.needs_call = needs_call
+        self.workers = max(1, workers)
+        self.min_interval = min_interval
+        self.done = self.failed = self.retries = 0
+        self.busy = 0.0
+        self.first = self.last = None
+        self.pause_until = 0.0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def _wait_turn(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self.pause_until, self._next_call)
+            self._next_call = start + self.min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def call(self, item):
+        for attempt in range(INGEST_MAX_RETRIES + 1):
+            if self.needs_call is None or self.needs_call(item):
+                self._wait_turn()
+            t0 = time.perf_counter()
+            try:
+                return self.func(item)
+            except Exception as e:
+                delay = retry_delay(e, attempt)
+                if delay is None or attempt == INGEST_MAX_RETRIES:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                    # one worker hitting a rate limit pauses the whole stage
+                    self.pause_until = max(self.pause_until, time.monotonic() + delay)
+                print(f"{self.name}: retrying item {item['key']} in {delay:.0f}s ({e})")
+            finally:
+                with self._lock:
+                    self.busy += time.perf_counter() - t0
+
+    def record(self, ok):
+        with self._lock:
+            now = time.monotonic()
+            self.first = self.first or now
+            self.last = now
+            if ok:
+                self.done += 1
+            else:
+                self.failed += 1
+
+    def rate(self):
+        if not self.done or self.first is None:
+            return 0.0
+        return self.done / max(self.last - self.first, self.busy / self.workers, 1e-6)
+
+    def report(self):
+        return (f"  {self.name:<9} {self.done:>7} done {self.failed:>5} failed {self.retries:>5} retries "
+                f"{self.rate():>9.1f} items/s  ({self.workers} worker(s), {self.busy:.1f}s busy)")
+
+
+class IngestPipeline:
+    """Run items through stages with bounded queues, handing results to a batching writer"""
+
+    def __init__(self, stages, write_batch, batch_size=INGEST_BATCH_SIZE, progress_every=10.0):
+        self.stages = stages
+        self.write_batch = write_batch
+        self.batch_size = batch_size
+        self.progress_every = progress_every
+        self.writer = Stage("write", None)
+        self.failures = []
+        self._lock = threading.Lock()
+
+    def fail(self, key, stage, error):
+        with self._lock:
+            self.failures.append((key, stage, error))
+
+    def _worker(self, stage, inbox, outbox, remaining, downstream_workers):
+        while True:
+            item = inbox.get()
+            if item is _STOP:
+                with self._lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    for _ in range(downstream_workers):
+                        outbox.put(_STOP)
+                return
+            try:
+                outbox.put(stage.call(item))
+                stage.record(True)
+            except Exception as e:
+                stage.record(False)
+                with self._lock:
+                    self.failures.append((item["key"], stage.name, str(e)))
+
+    def run(self, items):
+        queues = [queue.Queue(maxsize=2 * s.workers) for s in self.stages]
+        queues.append(queue.Queue(maxsize=2 * self.batch_size))
+        threads = []
+        for i, stage in enumerate(self.stages):
+            downstream = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                threads.append(threading.Thread(target=self._worker, daemon=True,
+                                                args=(stage, queues[i], queues[i + 1], remaining, downstream)))
+
+        def feed():
+            try:
+                for item in items:
+                    queues[0].put(item)
+            except Exception as e:
+                self.fail("-", "read", str(e))
+            finally:
+                # always, or the stages and the writer would wait for input forever
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(_STOP)
+
+        threads.append(threading.Thread(target=feed, daemon=True))
+        for t in threads:
+            t.start()
+
+        # the writer runs on the calling thread, which holds the app context
+        started = time.monotonic()
+        next_report = started + self.progress_every
+        batch = []
+        while True:
+            try:
+                item = queues[-1].get(timeout=1.0)
+            except queue.Empty:
+                item = None
+            if item is not None and item is not _STOP:
+                batch.append(item)
+            if batch and (len(batch) >= self.batch_size or item is None or item is _STOP):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= next_report:
+                self.print_progress(started)
+                next_report += self.progress_every
+            if item is _STOP:
+                break
+        for t in threads:
+            t.join()
+        return time.monotonic() - started
+
+    def _flush(self, batch):
+        t0 = time.perf_counter()
+        try:
+            self.write_batch(batch)
+            for _ in batch:
+                self.writer.record(True)
+        except Exception as e:
+            db.session.rollback()
+            for item in batch:
+                self.writer.record(False)
+                self.failures.append((item["key"], "write", str(e)))
+        self.writer.busy += time.perf_counter() - t0
+
+    def print_progress(self, started):
+        print(f"[{time.monotonic() - started:.0f}s] " + ", ".join(
+            f"{s.name} {s.done}" for s in self.stages + [self.writer]))
+
+    def report(self):
+        return "\n".join(s.report() for s in self.stages + [self.writer])
+
+
+def ingest_stages(summary="ai", geocode_workers=INGEST_GEOCODE_WORKERS, weather_workers=INGEST_WEATHER_WORKERS,
+                  summary_workers=INGEST_SUMMARY_WORKERS):
+    """geocode -> weather -> summary stages; repeated places are resolved and fetched once per run"""
+    places, forecasts = {}, {}
+
+    def needs_geocode(item):
+        return (item["lat"] is None or item["lon"] is None) and item["location"].lower() not in places
+
+    def geocode(item):
+        if item["lat"] is None or item["lon"] is None:
+            query = item["location"]
+            if query.lower() not in places:
+                location = geolocator.geocode(query, exactly_one=True)
+                if not location:
+                    raise LookupError(f"could not resolve {query!r}")
+                places[query.lower()] = (location.address, location.latitude, location.longitude)
+            item["name"], item["lat"], item["lon"] = places[query.lower()]
+        item["name"] = item["name"] or item["location"]
+        item["location"] = item["location"] or item["name"]
+        return item
+
+    def weather(item):
+        key = (location_id(item["lat"], item["lon"]), item["start_date"], item["end_date"])
+        if key not in forecasts:
+            forecasts[key] = get_weather(item["lat"], item["lon"], start_date=item["start_date"], end_date=item["end_date"])
+        item["weather"] = forecasts[key]
+        return item
+
+    def summarize(item):
+        if summary == "ai":
+            item["summary"] = ai_generate_summary(item["weather"], item["name"])
+        elif summary == "simple":
+            item["summary"] = create_enhanced_summary(item["weather"], item["name"])
+        else:
+            item["summary"] = None  # generated (and streamed) on first view
+        return item
+
+    return [
+        Stage("geocode", geocode, geocode_workers, INGEST_GEOCODE_INTERVAL, needs_geocode),
+        Stage("weather", weather, weather_workers),
+        Stage("summary", summarize, summary_workers),
+    ]
+
+def completed_keys(job):
+    return {key for (key,) in db.session.query(IngestProgress.item_key).filter_by(job=job)}
+
+def write_batch(job, items):
+    """Insert a batch of requests and their checkpoints in one transaction"""
+    recs = []
+    for item in items:
+        rec = WeatherRequest(user_input=item["location"], resolved_name=item["name"], lat=item["lat"], lon=item["lon"],
+                             start_date=item["start_date"], end_date=item["end_date"], ai_summary=item.get("summary"))
+        store_weather(rec, item["weather"])
+        recs.append(rec)
+    db.session.add_all(recs)
+    db.session.flush()
+    db.session.add_all(IngestProgress(job=job, item_key=item["key"], request_id=rec.id) for item, rec in zip(items, recs))
+    db.session.commit()
+    try:
+        record_observations([(item["lat"], item["lon"], item["name"], item["weather"]) for item in items])
+    except Exception as e:
+        print(f"Could not record observations for batch: {e}")
+
+def run_ingest(path, job=None, summary="ai", batch_size=INGEST_BATCH_SIZE, **workers):
+    """Ingest a location list; returns (pipeline, written, skipped, seconds)"""
+    job = job or os.path.basename(path)
+    done = completed_keys(job)
+    skipped = [0]
+
+    def pending():
+        for key, fields, error in read_locations(path):
+            if error:
+                pipeline.fail(key, "read", error)
+                continue
+            if key in done:
+                skipped[0] += 1
+                continue
+            item = make_item(key, fields)
+            if not item["location"] and (item["lat"] is None or item["lon"] is None):
+                pipeline.fail(key, "read", "no location or coordinates")
+                continue
+            yield item
+
+    pipeline = IngestPipeline(ingest_stages(summary, **workers), lambda batch: write_batch(job, batch), batch_size)
+    seconds = pipeline.run(pending())
+    return pipeline, pipeline.writer.done, skipped[0], seconds
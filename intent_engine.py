@@ -0,0 +1,126 @@
+import re
+from datetime import date, timedelta
+
+# Intent and entity extraction for DynamicWeatherChatbot.
+#
+# All keyword patterns are compiled into one alternation with token boundaries,
+# so a message is scanned once and "do" no longer matches "don't", nor "temp"
+# "attempt". Each keyword maps back to its intent; a message can carry several.
+
+# (intent, keyword patterns) in answer priority order
+INTENTS = [
+    ("clothing", [r"wear(?:ing)?", r"clothes", r"clothing", r"dress(?:ed)?", r"outfits?", r"jackets?", r"coats?"]),
+    ("rain", [r"rain(?:s|y|ing)?", r"umbrellas?", r"wet", r"precipitation", r"showers?", r"drizzle"]),
+    ("activity", [r"activit(?:y|ies)", r"picnics?", r"outdoors?", r"visit(?:ing)?", r"hik(?:e|ing)",
+                  r"(?:things|what) to do", r"what can i do", r"should i do", r"go out"]),
+    ("travel", [r"travel(?:l?ing)?", r"drive", r"driving", r"flights?", r"fly(?:ing)?", r"transport", r"commute", r"roads?"]),
+    ("temperature", [r"temperatures?", r"temps?", r"hot", r"cold", r"warm", r"chilly", r"degrees?"]),
+    ("forecast", [r"forecasts?", r"future", r"upcoming", r"week ahead", r"coming days"]),
+    ("humidity", [r"humid(?:ity)?", r"muggy"]),
+    ("history", [r"history", r"historical", r"(?:last|past) (?:week|month|few days|\d+ days)", r"so far", r"recently"]),
+]
+INTENT_PRIORITY = {name: i for i, (name, _) in enumerate(INTENTS)}
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7}
+
+DATE_PATTERN = (
+    r"(?P<iso>\d{4}-\d{2}-\d{2})"
+    r"|(?P<day_after>(?:the\s+)?day\s+after\s+tomorrow)"
+    # follow-ups, relative to the date already under discussion
+    r"|(?P<next_day>(?:the\s+)?(?:day\s+after|next\s+day|following\s+day))"
+    r"|(?P<day_before>(?:the\s+)?day\s+before)"
+    r"|(?P<tomorrow>tomorrow|tmrw)"
+    r"|(?P<today>today|tonight|right\s+now|now)"
+    r"|(?P<weekend>(?:this\s+|the\s+)?weekend)"
+    r"|in\s+(?P<in_days>\d+|" + "|".join(NUMBER_WORDS) + r")\s+days?"
+    r"|(?P<modifier>next|this|on|coming)?\s*(?P<weekday>" + "|".join(WEEKDAYS) + r")"
+)
+
+# the capture may not contain another preposition, so "for a picnic in Delhi" resolves to "Delhi";
+# a period ends it unless it follows an abbreviation such as "St. Louis" or "Mt. Abu"
+LOCATION_PATTERN = (r"\b(?:in|at|for|to)\s+((?:(?!\b(?:in|at|for|to)\b)[A-Za-z0-9\s,.'-]){2,60}?)"
+                    r"(?=\s+(?:on|this|next|last|past|over|during|and|or|with|be|is|will|was)\b|[?!,;]"
+                    r"|(?<!\bSt)(?<!\bMt)(?<!\bFt)(?<!\bPt)(?<!\bSte)\.|$)")
+LOCATION_STOPWORDS = {"it", "me", "go", "do", "the", "be", "wear", "travel", "visit", "a", "an", "outside", "work", "school"}
+
+
+class IntentEngine:
+    """Compiled, single-pass intent and entity extraction"""
+
+    def __init__(self, intents=INTENTS):
+        self.keyword_intent = {}
+        groups = []
+        for i, (name, patterns) in enumerate(intents):
+            group = f"i{i}"
+            self.keyword_intent[group] = name
+            groups.append(f"(?P<{group}>{'|'.join(patterns)})")
+        self.intent_re = re.compile(r"(?<![\w'])(?:" + "|".join(groups) + r")(?![\w'])", re.I)
+        self.date_re = re.compile(r"\b(?:" + DATE_PATTERN + r")\b", re.I)
+        self.location_re = re.compile(LOCATION_PATTERN, re.I)
+
+    def intents(self, message):
+        """Distinct intents in the message, highest priority first"""
+        found = {self.keyword_intent[m.lastgroup] for m in self.intent_re.finditer(message)}
+        return sorted(found, key=INTENT_PRIORITY.get)
+
+    def resolve_date(self, match, today, base=None):
+        g = match.groupdict()
+        if g["iso"]:
+            try:
+                return date.fromisoformat(g["iso"])
+            except ValueError:
+                return None
+        if g["day_after"]:
+            return today + timedelta(days=2)
+        if g["next_day"]:
+            return (base or today) + timedelta(days=1)
+        if g["day_before"]:
+            return (base or today) - timedelta(days=1)
+        if g["tomorrow"]:
+            return today + timedelta(days=1)
+        if g["today"]:
+            return today
+        if g["weekend"]:
+            return today + timedelta(days=max(0, 5 - today.weekday()))
+        if g["in_days"]:
+            n = g["in_days"].lower()
+            return today + timedelta(days=int(n) if n.isdigit() else NUMBER_WORDS[n])
+        if g["weekday"]:
+            ahead = (WEEKDAYS.index(g["weekday"].lower()) - today.weekday()) % 7
+            # naming today's weekday means the next one, unless it is "this monday"
+            if ahead == 0 and (g["modifier"] or "").lower() != "this":
+                ahead = 7
+            return today + timedelta(days=ahead)
+        return None
+
+    def parse(self, message, today=None, base=None):
+        """Extract intents, location and target date from a message.
+
+        base is the date a conversation is already about, for "the day after" style follow-ups.
+        """
+        today = today or date.today()
+        target_date = None
+        stripped = message
+        m = self.date_re.search(message)
+        if m:
+            target_date = self.resolve_date(m, today, base)
+            # blank date expressions so "in 3 days" or "on friday" are not taken for a location
+            stripped = self.date_re.sub(lambda d: " " * len(d.group(0)), message)
+        location = None
+        for lm in self.location_re.finditer(stripped):
+            candidate = re.sub(r"\s+", " ", lm.group(1)).strip(" .,!?'-")
+            if candidate and candidate.lower() not in LOCATION_STOPWORDS and not self.intent_re.search(candidate):
+                location = candidate
+                break
+        return {"intents": self.intents(message), "location": location, "date": target_date}
+
+
+_engine = None
+
+def get_engine():
+    """Shared engine; patterns are compiled once per process"""
+    global _engine
+    if _engine is None:
+        _engine = IntentEngine()
+    return _engine
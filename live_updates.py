@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from collections import deque
+from datetime import date
+
+# Live weather for open /view pages whose date range includes today. Pages
+# subscribe to their location; each distinct location gets one poller thread
+# that fetches on the provider's update cadence and fans the payload out to every
+# subscriber, so upstream calls scale with locations, not viewers. Subscribers
+# hold a small drop-oldest buffer: each update is a full snapshot, so a slow
+# client only ever needs the newest one. Updates are only pushed to the open
+# pages; stored records are never rewritten from here.
+#
+# Pollers are per worker process; with several gunicorn workers each worker polls
+# the locations its own viewers are subscribed to.
+
+# OpenWeatherMap publishes a new observation roughly every 10 minutes
+LIVE_POLL_SECONDS = int(os.getenv("LIVE_POLL_SECONDS", os.getenv("WEATHER_FRESHNESS_SECONDS", "600")))
+# wait before re-polling after an error or an unchanged observation
+LIVE_RETRY_SECONDS = int(os.getenv("LIVE_RETRY_SECONDS", "60"))
+LIVE_QUEUE_SIZE = int(os.getenv("LIVE_QUEUE_SIZE", "2"))
+# threads per worker (gunicorn --threads); every open stream holds one of them for as long as the page is open,
+# so by default at most half go to live streams and the rest keep serving ordinary requests
+WEB_THREADS = int(os.getenv("WEB_THREADS", "16"))
+LIVE_MAX_SUBSCRIBERS = int(os.getenv("LIVE_MAX_SUBSCRIBERS", str(max(1, WEB_THREADS // 2))))
+LIVE_HEARTBEAT_SECONDS = int(os.getenv("LIVE_HEARTBEAT_SECONDS", "15"))
+
+def covers_today(start_date, end_date, today=None):
+    """Whether a record's date range includes today; records without a range follow the current weather"""
+    today = (today or date.today()).isoformat()
+    return (not start_date or start_date <= today) and (not end_date or today <= end_date)
+
+def location_key(lat, lon):
+    """Poller key; ~100 m grid so viewers of the same place share one poller"""
+    return (round(float(lat), 3), round(float(lon), 3))
+
+def location_id(lat, lon):
+    """location_key as a string, for storage"""
+    return "%.3f,%.3f" % location_key(lat, lon)
+
+
+class Subscription:
+    """One viewer's bounded update buffer"""
+
+    def __init__(self, hub, key, record_id=None, maxsize=LIVE_QUEUE_SIZE):
+        self.hub = hub
+        self.key = key
+        self.record_id = record_id
+        self.dropped = 0
+        self.closed = False
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+
+    def push(self, weather):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(weather)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Next update, or None after timeout (or once closed)"""
+        with self._cond:
+            if not self._items and not self.closed:
+                self._cond.wait(timeout)
+            return self._items.popleft() if self._items else None
+
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            self._cond.notify_all()
+        self.hub.unsubscribe(self)
+
+
+class LocationChannel:
+    """Subscribers of one location plus the thread polling it"""
+
+    def __init__(self, hub, key, last_dt=None):
+        self.hub = hub
+        self.key = key
+        self.subscribers = set()
+        self.latest = None
+        self.last_dt = last_dt
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"live-poller-{key[0]},{key[1]}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        delay = self.hub.next_delay(self.last_dt, floor=0)
+        while not self._stop.wait(delay):
+            try:
+                weather = self.hub.fetch(*self.key)
+            except Exception as e:
+                print(f"Live update fetch failed for {self.key}: {e}")
+                delay = self.hub.retry_seconds
+                continue
+            finally:
+                self.hub.count_fetch()
+            dt = (weather.get("current") or {}).get("dt")
+            if dt is not None and dt == self.last_dt:
+                # the provider has not published a newer observation yet
+                delay = self.hub.retry_seconds
+                continue
+            self.last_dt = dt
+            self.latest = weather
+            self.hub.publish(self, weather)
+            delay = self.hub.next_delay(dt)
+
+
+class LiveHub:
+    """Location channels, their pollers and fan-out to subscribers"""
+
+    def __init__(self, fetch, on_update=None, poll_seconds=LIVE_POLL_SECONDS, retry_seconds=LIVE_RETRY_SECONDS,
+                 queue_size=LIVE_QUEUE_SIZE, max_subscribers=LIVE_MAX_SUBSCRIBERS):
+        self.fetch = fetch
+        self.on_update = on_update
+        self.poll_seconds = poll_seconds
+        self.retry_seconds = retry_seconds
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.channels = {}
+        self.fetches = self.published = 0
+        self._lock = threading.Lock()
+
+    def next_delay(self, last_dt, floor=None):
+        """Seconds until the provider should have an observation newer than last_dt"""
+        floor = self.retry_seconds if floor is None else floor
+        if last_dt is None:
+            return floor
+        return max(floor, min(self.poll_seconds, last_dt + self.poll_seconds - time.time()))
+
+    def subscribe(self, lat, lon, record_id=None, last_dt=None):
+        """Subscribe to a location; None when the subscriber limit is reached"""
+        key = location_key(lat, lon)
+        with self._lock:
+            if sum(len(c.subscribers) for c in self.channels.values()) >= self.max_subscribers:
+                return None
+            sub = Subscription(self, key, record_id, self.queue_size)
+            channel = self.channels.get(key)
+            if channel is None:
+                channel = self.channels[key] = LocationChannel(self, key, last_dt)
+                channel.start()
+            channel.subscribers.add(sub)
+            latest = channel.latest
+        # a page rendered from older data than the poller already has gets it straight away
+        if latest is not None and (latest.get("current") or {}).get("dt") != last_dt:
+            sub.push(latest)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            channel = self.channels.get(sub.key)
+            if channel is None:
+                return
+            channel.subscribers.discard(sub)
+            if not channel.subscribers:
+                channel.stop()
+                del self.channels[sub.key]
+
+    def count_fetch(self):
+        with self._lock:
+            self.fetches += 1
+
+    def publish(self, channel, weather):
+        with self._lock:
+            subscribers = list(channel.subscribers)
+            self.published += 1
+        if self.on_update:
+            try:
+                self.on_update(channel.key, {s.record_id for s in subscribers if s.record_id is not None}, weather)
+            except Exception as e:
+                print(f"Live update hook failed for {channel.key}: {e}")
+        for sub in subscribers:
+            sub.push(weather)
+
+    def stats(self):
+        with self._lock:
+            subscribers = [s for c in self.channels.values() for s in c.subscribers]
+            return {
+                "locations": len(self.channels),
+                "subscribers": len(subscribers),
+                "max_subscribers": self.max_subscribers,
+                "upstream_fetches": self.fetches,
+                "updates_published": self.published,
+                "updates_dropped": sum(s.dropped for s in subscribers),
+                "poll_seconds": self.poll_seconds,
+            }
@@ -0,0 +1,99 @@
+import os
+import gc
+import time
+import resource
+import threading
+import tracemalloc
+
+# Process memory inspection shared by /debug/memory and the soak test.
+#
+# RSS comes from /proc (current) and getrusage (peak). Allocation sites come
+# from tracemalloc, which only sees allocations made after tracing starts and
+# slows allocation-heavy code, so it is off unless MEMORY_TRACE_FRAMES is set
+# or tracing is switched on at runtime. Each snapshot is compared with the
+# previous one, so repeated calls show which sites keep growing.
+
+MEMORY_TRACE_FRAMES = int(os.getenv("MEMORY_TRACE_FRAMES", "0"))  # >0 traces allocations from startup
+
+_IGNORED = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"), tracemalloc.Filter(False, "<unknown>"))
+
+def start_tracing(frames=1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(max(1, frames))
+
+if MEMORY_TRACE_FRAMES:
+    start_tracing(MEMORY_TRACE_FRAMES)
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class MemoryWatch:
+    """Snapshots of RSS and top allocation sites, each with the growth since the previous one"""
+
+    def __init__(self):
+        self._previous = None
+        self._lock = threading.Lock()
+
+    def snapshot(self, top=15):
+        info = {
+            "pid": os.getpid(),
+            "time": time.time(),
+            "rss_mb": round(rss_mb(), 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+            "gc_objects": len(gc.get_objects()),
+            "gc_counts": gc.get_count(),
+            "tracing": tracemalloc.is_tracing(),
+        }
+        if not info["tracing"]:
+            return info
+        current, peak = tracemalloc.get_traced_memory()
+        info["traced_mb"], info["traced_peak_mb"] = round(current / 2 ** 20, 2), round(peak / 2 ** 20, 2)
+        snap = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+        with self._lock:
+            previous, self._previous = self._previous, snap
+        info["top"] = [{"where": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                       for stat in snap.statistics("lineno")[:top]]
+        if previous is not None:
+            info["growth"] = [{"where": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1),
+                               "growth_kb": round(stat.size_diff / 1024, 1), "count_diff": stat.count_diff}
+                              for stat in snap.compare_to(previous, "lineno")[:top] if stat.size_diff > 0]
+        return info
+
+memory_watch = MemoryWatch()
+
+def _slope(samples):
+    """Least-squares slope (MB/hour) of (seconds, MB) samples"""
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_m = sum(m for _, m in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples) or 1e-9
+    return sum((t - mean_t) * (m - mean_m) for t, m in samples) / var * 3600
+
+def growth_trend(samples, warmup=0.1):
+    """Least-squares slope (MB/hour) of (seconds, MB) samples after the warmup fraction, and whether growth is sustained.
+
+    The slope is None when there are too few samples to tell.
+
+    Growth counts as sustained when the slope is positive and each third of the
+    post-warmup window keeps climbing on its own, at a third of the overall
+    slope or more. A one-off step (a model load, a cache filling up) raises the
+    overall slope but leaves the thirds around it flat.
+    """
+    samples = samples[int(len(samples) * warmup):]
+    if len(samples) < 6:
+        return None, False
+    n = len(samples)
+    slope = _slope(samples)
+    thirds = [_slope(samples[i * n // 3:(i + 1) * n // 3]) for i in range(3)]
+    return slope, slope > 0 and min(thirds) >= slope / 3
@@ -1,6 +1,10 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import inspect, text, event
+from sqlalchemy.orm import defer
 import json
+import hashlib
+from compression import CompressedText
 
 db = SQLAlchemy()
 
@@ -13,12 +17,79 @@ class WeatherRequest(db.Model):
     lon = db.Column(db.Float)
     start_date = db.Column(db.String(20))                         
     end_date = db.Column(db.String(20))
-    weather_json = db.Column(db.Text)                             
+    weather_json = db.Column(CompressedText)                             
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    ai_summary = db.Column(db.Text)
+    ai_summary = db.Column(CompressedText)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    payload_hash = db.Column(db.String(40))
+    derived_json = db.Column(db.Text)
+    # short digest of ai_summary, so validators never decode it
+    summary_hash = db.Column(db.String(16))
 
     def weather(self):
         try:
             return json.loads(self.weather_json)
         except:
             return {}
+
+def summary_digest(summary):
+    return hashlib.sha1(summary.encode("utf-8")).hexdigest()[:16] if summary else None
+
+@event.listens_for(WeatherRequest.ai_summary, "set")
+def _track_summary(target, value, oldvalue, initiator):
+    target.summary_hash = summary_digest(value)
+
+# query option for conditional GETs: the compressed columns load only if the response is built
+WITHOUT_PAYLOAD = (defer(WeatherRequest.weather_json), defer(WeatherRequest.ai_summary))
+
+class WeatherAlert(db.Model):
+    """One alert rule firing for one tracked location; the row is reactivated when it fires again"""
+    __tablename__ = "weather_alerts"
+    __table_args__ = (db.UniqueConstraint("location_key", "rule"),)
+    id = db.Column(db.Integer, primary_key=True)
+    location_key = db.Column(db.String(32), nullable=False, index=True)
+    location_name = db.Column(db.String(256))
+    request_id = db.Column(db.Integer)
+    rule = db.Column(db.String(32), nullable=False)
+    severity = db.Column(db.String(16))
+    target_date = db.Column(db.String(10))
+    value = db.Column(db.Float)
+    message = db.Column(db.String(256))
+    active = db.Column(db.Boolean, default=True, index=True)
+    first_seen = db.Column(db.DateTime)
+    last_seen = db.Column(db.DateTime)
+    notified_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            "location": self.location_name,
+            "location_key": self.location_key,
+            "request_id": self.request_id,
+            "rule": self.rule,
+            "severity": self.severity,
+            "date": self.target_date,
+            "value": self.value,
+            "message": self.message,
+            "active": self.active,
+            "first_seen": self.first_seen.isoformat() if self.first_seen else None,
+            "last_seen": self.last_seen.isoformat() if self.last_seen else None,
+            "notified_at": self.notified_at.isoformat() if self.notified_at else None,
+        }
+
+class IngestProgress(db.Model):
+    """Checkpoint of a bulk ingestion job: one row per input item, written in the same transaction as its request"""
+    __tablename__ = "ingest_progress"
+    job = db.Column(db.String(128), primary_key=True)
+    item_key = db.Column(db.String(128), primary_key=True)
+    request_id = db.Column(db.Integer)
+    done_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+def ensure_columns():
+    """Add columns introduced after weather_requests was first created (create_all never alters tables)"""
+    table = WeatherRequest.__table__
+    existing = {c["name"] for c in inspect(db.engine).get_columns(table.name)}
+    for column in table.columns:
+        if column.name not in existing:
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+    db.session.commit()
@@ -0,0 +1,89 @@
+import numpy as np
+
+# Temperature trend models over the (at most 5 point) daily forecast.
+# Each model has a batch form that scores many series in one vectorized call;
+# series of different lengths are packed left-aligned into a NaN-padded matrix.
+
+def daily_series(weather_data, key="day"):
+    """Daily temperatures of one kind (day / min / max) from a weather payload"""
+    temps = []
+    for day in weather_data.get("daily", []):
+        value = day.get("temp", {}).get(key)
+        if value is not None:
+            temps.append(value)
+    return temps
+
+def pack_series(series_list):
+    """Pack variable-length series into a NaN-padded matrix plus per-row lengths"""
+    lengths = np.fromiter((len(s) for s in series_list), dtype=np.int64, count=len(series_list))
+    width = int(lengths.max()) if len(series_list) else 0
+    matrix = np.full((len(series_list), max(width, 1)), np.nan)
+    for i, s in enumerate(series_list):
+        matrix[i, :len(s)] = s
+    return matrix, lengths
+
+def batch_linear_trend(matrix, lengths):
+    """Closed-form least-squares line per row, evaluated one step past the last point"""
+    x = np.arange(matrix.shape[1], dtype=float)
+    mask = x < lengths[:, None]
+    y = np.where(mask, matrix, 0.0)
+    xm = np.where(mask, x, 0.0)
+    n = lengths.astype(float)
+    sx, sy = xm.sum(axis=1), y.sum(axis=1)
+    sxx, sxy = (xm * xm).sum(axis=1), (xm * y).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+        pred = intercept + slope * n
+    pred[lengths < 2] = np.nan
+    return pred
+
+def batch_holt(matrix, lengths, alpha=0.6, beta=0.3):
+    """Holt's linear exponential smoothing per row, forecasting one step ahead"""
+    level = matrix[:, 0].copy()
+    trend = matrix[:, 1] - matrix[:, 0] if matrix.shape[1] > 1 else np.zeros(len(matrix))
+    for t in range(1, matrix.shape[1]):
+        active = t < lengths
+        y = matrix[:, t]
+        new_level = alpha * y + (1 - alpha) * (level + trend)
+        new_trend = beta * (new_level - level) + (1 - beta) * trend
+        level = np.where(active, new_level, level)
+        trend = np.where(active, new_trend, trend)
+    pred = level + trend
+    pred[lengths < 2] = np.nan
+    return pred
+
+MODELS = {
+    "linear": batch_linear_trend,
+    "holt": batch_holt,
+}
+
+def _round(value):
+    return None if value is None or np.isnan(value) else round(float(value), 2)
+
+def predict_series(temps, model="linear"):
+    """Predict the next value of a single series, or None with fewer than two points"""
+    if len(temps) < 2:
+        return None
+    matrix, lengths = pack_series([temps])
+    return _round(MODELS[model](matrix, lengths)[0])
+
+def predict_next_temp(weather_data, model="linear", history=None):
+    """Predict next day temperature from the daily forecast, preceded by observed daily means if given"""
+    return predict_series(list(history or []) + daily_series(weather_data), model)
+
+def predict_min_max(weather_data):
+    """Per-day min/max trend: next day's (min, max) from separate linear fits"""
+    return predict_series(daily_series(weather_data, "min")), predict_series(daily_series(weather_data, "max"))
+
+def score_payloads(payloads, model="linear", key="day"):
+    """Score many weather payloads in one vectorized call; returns an array with NaN where unpredictable"""
+    series = [daily_series(p, key) for p in payloads]
+    if not series:
+        return np.array([])
+    matrix, lengths = pack_series(series)
+    return MODELS[model](matrix, lengths)
+
+def score_records(records, model="linear", key="day"):
+    """Score stored WeatherRequest rows by their forecast (see score_payloads)"""
+    return score_payloads([rec.weather() for rec in records], model, key)
@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import random
+import zlib
+import threading
+from collections import Counter
+from datetime import datetime
+from html import escape
+from flask import g, request
+
+# Opt-in sampling profiler.
+#
+# One background thread reads the stacks of the threads currently serving a
+# profiled request (sys._current_frames) every PROFILE_INTERVAL_MS, so nothing
+# is traced and unprofiled requests cost a dict insert at most. A request is
+# profiled when it is picked by PROFILE_SAMPLE_RATE, or, with PROFILE_SLOW_MS
+# set, every request is sampled and its stacks are kept only if it was slow.
+# Server-sent event streams are never profiled: they are slow by design and
+# mostly idle. Results are written to PROFILE_DIR as collapsed stacks
+# (flamegraph.pl, speedscope and inferno read these) plus a self-contained SVG
+# flamegraph; past PROFILE_MAX_FILES files the oldest are deleted.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # fraction of requests, 0 = off
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))  # keep any request slower than this, 0 = off
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))  # .collapsed and .svg files kept in PROFILE_DIR
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN")  # enables POST /debug/profile; send it as X-Profile-Token
+PROFILE_MAX_SECONDS = 60
+# long-lived SSE endpoints; any other text/event-stream response is dropped in after_request
+UNPROFILED_ENDPOINTS = {"static", "api_live", "api_summary_stream", "api_chat_stream"}
+
+def _collapse(frame, root):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.append(root)
+    return ";".join(reversed(stack))
+
+
+class Sampler:
+    """Samples the stacks of registered threads into one Counter per registration"""
+
+    def __init__(self, interval=PROFILE_INTERVAL_MS / 1000.0):
+        self.interval = interval
+        self._targets = {}  # thread id -> (root label, Counter)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, thread_id, root):
+        stacks = Counter()
+        with self._lock:
+            self._targets[thread_id] = (root, stacks)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+        return stacks
+
+    def stop(self, thread_id):
+        with self._lock:
+            self._targets.pop(thread_id, None)
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            # under the lock, so a request never reads its Counter while it is being updated
+            with self._lock:
+                if not self._targets:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, (root, stacks) in self._targets.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None and thread_id != own:
+                        stacks[_collapse(frame, root)] += 1
+
+_sampler = Sampler()
+
+def capture(seconds, interval=None):
+    """Sample every thread in this worker for `seconds`; returns collapsed stacks"""
+    interval = interval or PROFILE_INTERVAL_MS / 1000.0
+    stacks = Counter()
+    own = threading.get_ident()
+    names = {}
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if thread_id not in names:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            stacks[_collapse(frame, names.get(thread_id, str(thread_id)))] += 1
+        time.sleep(interval)
+    return stacks
+
+def collapsed_text(stacks):
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+def flamegraph_svg(stacks, title="", width=1200, row=16):
+    """Minimal SVG flamegraph (root at the bottom) of collapsed stacks"""
+    tree = {"children": {}, "count": 0}
+    for stack, count in stacks.items():
+        node = tree
+        node["count"] += count
+        for name in stack.split(";"):
+            node = node["children"].setdefault(name, {"children": {}, "count": 0})
+            node["count"] += count
+    total = tree["count"] or 1
+
+    def depth(node):
+        return 1 + max((depth(c) for c in node["children"].values()), default=0)
+
+    height = (depth(tree) + 1) * row + 24
+    rects = []
+
+    def draw(node, x, level):
+        for name, child in sorted(node["children"].items()):
+            w = child["count"] / total * width
+            if w >= 0.5:
+                y = height - (level + 1) * row
+                hue = 20 + zlib.crc32(name.split(":")[0].encode()) % 40
+                fits = int((w - 6) / 7)
+                label = escape(name if len(name) <= fits else name[:fits - 2] + "..") if fits >= 4 else ""
+                rects.append(
+                    f'<g><title>{escape(name)} ({child["count"]} samples, {child["count"] * 100 / total:.1f}%)</title>'
+                    f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row - 1}" fill="hsl({hue},85%,60%)"/>'
+                    f'<text x="{x + 3:.1f}" y="{y + row - 4}" font-size="11" font-family="monospace">{label}</text></g>')
+                draw(child, x, level + 1)
+            x += w
+
+    draw(tree, 0.0, 0)
+    return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}">'
+            f'<text x="4" y="16" font-size="13" font-family="sans-serif">{escape(title)} ({total} samples)</text>'
+            + "".join(rects) + "</svg>")
+
+def write_profile(stacks, label):
+    """Write <label>.collapsed and <label>.svg into PROFILE_DIR; returns the collapsed file's path"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S}-{os.getpid()}-{label}")
+    with open(base + ".collapsed", "w") as f:
+        f.write(collapsed_text(stacks))
+    with open(base + ".svg", "w") as f:
+        f.write(flamegraph_svg(stacks, label))
+    prune_profiles()
+    return base + ".collapsed"
+
+def prune_profiles(limit=None):
+    """Delete the oldest profile files beyond limit (PROFILE_MAX_FILES); returns how many were removed"""
+    limit = PROFILE_MAX_FILES if limit is None else limit
+    try:
+        entries = [e for e in os.scandir(PROFILE_DIR)
+                   if e.is_file() and e.name.endswith((".collapsed", ".svg"))]
+    except OSError:
+        return 0
+    if len(entries) <= limit:
+        return 0
+    entries.sort(key=lambda e: (e.stat().st_mtime, e.name))
+    removed = 0
+    for entry in entries[:len(entries) - limit]:
+        try:
+            os.remove(entry.path)
+            removed += 1
+        except OSError:
+            pass
+    return removed
+
+def _label(endpoint, elapsed_ms):
+    return f"{(endpoint or 'unknown').replace('.', '_')}-{elapsed_ms:.0f}ms"
+
+def install_profiler(app):
+    """Register the per-request hooks when sampling is configured"""
+    if not (PROFILE_SAMPLE_RATE > 0 or PROFILE_SLOW_MS > 0):
+        return
+
+    @app.before_request
+    def _start_profile():
+        if request.endpoint in UNPROFILED_ENDPOINTS:
+            return
+        picked = PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        if picked or PROFILE_SLOW_MS > 0:
+            g.profile = (time.perf_counter(), picked, _sampler.start(threading.get_ident(), request.endpoint or "request"))
+
+    @app.after_request
+    def _skip_streams(response):
+        # the stream runs after this returns; its teardown would profile the whole connection
+        if response.mimetype == "text/event-stream" and g.pop("profile", None) is not None:
+            _sampler.stop(threading.get_ident())
+        return response
+
+    @app.teardown_request
+    def _finish_profile(exc=None):
+        profile = g.pop("profile", None)
+        if profile is None:
+            return
+        _sampler.stop(threading.get_ident())
+        started, picked, stacks = profile
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if stacks and (picked or elapsed_ms >= PROFILE_SLOW_MS):
+            try:
+                write_profile(stacks, _label(request.endpoint, elapsed_ms))
+            except OSError as e:
+                print(f"Could not write profile: {e}")
@@ -0,0 +1,234 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout, as_completed, wait
+import requests
+from geopy import exc as geopy_exc
+
+# Guards for upstream calls (OpenWeatherMap, Nominatim).
+#
+# A Deadline is the latency budget of one incoming request; every upstream call
+# made for it gets at most the time that is left. Each upstream has a circuit
+# breaker: after repeated failures calls are refused immediately for a while
+# instead of tying up workers on timeouts. When weather can't be fetched in
+# time, callers fall back to the last payload fetched for that location.
+
+REQUEST_BUDGET_SECONDS = float(os.getenv("REQUEST_BUDGET_SECONDS", "8"))
+UPSTREAM_TIMEOUT_SECONDS = float(os.getenv("UPSTREAM_TIMEOUT_SECONDS", "10"))  # cap for a single call
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))  # consecutive failures that open a breaker
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# send a second identical GET when the first hasn't answered after this long (0 = off)
+HEDGE_AFTER_SECONDS = float(os.getenv("HEDGE_AFTER_SECONDS", "0"))
+LAST_KNOWN_SIZE = int(os.getenv("LAST_KNOWN_SIZE", "1024"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "5"))  # Retry-After sent when an upstream gives none
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+class UpstreamUnavailable(Exception):
+    """An upstream is down, overloaded or unreachable; worth retrying after retry_after seconds"""
+    def __init__(self, message, retry_after=RETRY_AFTER_SECONDS):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpen(UpstreamUnavailable):
+    def __init__(self, name, retry_after):
+        super().__init__(f"{name} is unavailable (circuit open, retry in {retry_after:.0f}s)", retry_after)
+        self.name = name
+
+def upstream_error(exc, name):
+    """exc as DeadlineExceeded (too slow) or UpstreamUnavailable (down), or None for any other error"""
+    if isinstance(exc, (UpstreamUnavailable, DeadlineExceeded)):
+        return exc
+    if isinstance(exc, (requests.Timeout, geopy_exc.GeocoderTimedOut)):
+        return DeadlineExceeded(f"{name} did not answer in time: {exc}")
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        if status != 429 and status < 500:
+            return None
+        retry_after = exc.response.headers.get("Retry-After", "")
+        return UpstreamUnavailable(f"{name} returned {status}",
+                                   float(retry_after) if retry_after.isdigit() else RETRY_AFTER_SECONDS)
+    if isinstance(exc, geopy_exc.GeocoderRateLimited):
+        return UpstreamUnavailable(f"{name} is rate limiting: {exc}", float(exc.retry_after or RETRY_AFTER_SECONDS))
+    if isinstance(exc, (requests.ConnectionError, geopy_exc.GeocoderUnavailable)):
+        return UpstreamUnavailable(f"{name} is unreachable: {exc}")
+    return None
+
+
+class Deadline:
+    """Latency budget for one request, passed down to every upstream call made for it"""
+
+    def __init__(self, seconds=REQUEST_BUDGET_SECONDS):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def timeout(self, cap=UPSTREAM_TIMEOUT_SECONDS, minimum=0.05):
+        """Timeout for the next call: what's left of the budget, at most `cap`"""
+        left = self.remaining()
+        if left < minimum:
+            raise DeadlineExceeded("request budget exhausted")
+        return min(cap, left)
+
+def call_timeout(deadline, cap=UPSTREAM_TIMEOUT_SECONDS):
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+class CircuitBreaker:
+    """closed -> open after `failures` consecutive failures -> one trial call after `reset_seconds`"""
+
+    def __init__(self, name, failures=BREAKER_FAILURES, reset_seconds=BREAKER_RESET_SECONDS):
+        self.name = name
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive = 0
+        self.opened_at = None
+        self.trial = False
+        self.stats = {"calls": 0, "failures": 0, "rejected": 0, "opened": 0}
+        self._lock = threading.Lock()
+
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state()
+            # while half-open a single trial call goes through; the rest are refused until it finishes
+            if state == "open" or (state == "half-open" and self.trial):
+                self.stats["rejected"] += 1
+                raise CircuitOpen(self.name, max(0.0, self.opened_at + self.reset_seconds - time.monotonic()))
+            self.trial = state == "half-open"
+            self.stats["calls"] += 1
+
+    def record(self, ok):
+        with self._lock:
+            self.trial = False
+            if ok:
+                self.consecutive, self.opened_at = 0, None
+                return
+            self.stats["failures"] += 1
+            self.consecutive += 1
+            if self.opened_at is not None or self.consecutive >= self.failures:
+                if self.opened_at is None:
+                    self.stats["opened"] += 1
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        self.before_call()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            self.record(not is_upstream_failure(e))
+            raise
+        self.record(True)
+        return result
+
+    def to_dict(self):
+        return dict(self.stats, name=self.name, state=self.state(), consecutive_failures=self.consecutive)
+
+def is_upstream_failure(exc):
+    """Whether an error says the upstream is unhealthy (a 4xx such as a bad API key does not)"""
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return not isinstance(exc, (ValueError, KeyError, DeadlineExceeded))
+
+BREAKERS = {name: CircuitBreaker(name) for name in ("openweather", "nominatim")}
+
+def breaker_stats():
+    return {name: b.to_dict() for name, b in BREAKERS.items()}
+
+
+_hedge_pool = None
+_hedge_lock = threading.Lock()
+
+def _get_hedge_pool():
+    global _hedge_pool
+    with _hedge_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+        return _hedge_pool
+
+def _get(url, params, timeout):
+    r = requests.get(url, params=params, timeout=timeout)
+    r.raise_for_status()
+    return r
+
+def upstream_get(breaker, url, params, deadline=None):
+    """GET through the named upstream's breaker, within the deadline, hedged when HEDGE_AFTER_SECONDS is set"""
+    timeout = call_timeout(deadline)
+    if not HEDGE_AFTER_SECONDS or timeout <= HEDGE_AFTER_SECONDS:
+        return BREAKERS[breaker].call(_get, url, params, timeout)
+
+    def hedged():
+        pool = _get_hedge_pool()
+        futures = [pool.submit(_get, url, params, timeout)]
+        done, _ = wait(futures, timeout=HEDGE_AFTER_SECONDS)
+        if not done:
+            futures.append(pool.submit(_get, url, params, timeout - HEDGE_AFTER_SECONDS))
+        error = None
+        try:
+            for future in as_completed(futures, timeout=timeout):
+                if future.exception() is None:
+                    return future.result()  # a slower copy finishes in the background
+                error = future.exception()
+        except FuturesTimeout:
+            raise requests.Timeout(f"no response from {url} within {timeout:.1f}s")
+        raise error
+
+    return BREAKERS[breaker].call(hedged)
+
+
+class LastKnown:
+    """Most recent good payload per location, kept so a failed fetch can be answered stale"""
+
+    def __init__(self, size=LAST_KNOWN_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def put(self, key, weather):
+        with self._lock:
+            self._items[key] = (time.time(), weather)
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        """(fetched_at, weather) or None"""
+        with self._lock:
+            return self._items.get(key)
+
+    def revalidate(self, key, fetch):
+        """Refresh one location in the background (at most one refresh per location at a time)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.put(key, fetch())
+            except Exception as e:
+                print(f"Background refresh of {key} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True).start()
+
+last_known = LastKnown()
+
+def mark_stale(weather, fetched_at, reason):
+    """Copy of a payload flagged as served from the last known data"""
+    return dict(weather, stale=True, stale_reason=reason,
+                stale_age_seconds=int(time.time() - fetched_at) if fetched_at else None)
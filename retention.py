@@ -0,0 +1,128 @@
+import os
+import gzip
+import json
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from models import db, WeatherRequest
+from compression import MIN_COMPRESS_BYTES
+
+# Retention, recompression and incremental compaction for weather_requests.
+# Every job works in small batches with a commit in between, so no single
+# transaction holds the SQLite write lock for long. Payloads are only compressed
+# on SQLite, so recompression and compaction do nothing elsewhere.
+
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "0"))  # 0 keeps everything
+BATCH_SIZE = 200
+
+def _is_sqlite():
+    return db.engine.dialect.name == "sqlite"
+
+def _row_dict(rec):
+    return {c.name: (getattr(rec, c.name).isoformat() if isinstance(getattr(rec, c.name), datetime) else getattr(rec, c.name))
+            for c in WeatherRequest.__table__.columns}
+
+def prune_old_records(days=RETENTION_DAYS, archive_path=None, batch=BATCH_SIZE):
+    """Delete rows older than `days`, appending them to a gzipped NDJSON archive first if given"""
+    if not days:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    archive = gzip.open(archive_path, "at", encoding="utf-8") if archive_path else None
+    pruned = 0
+    try:
+        while True:
+            recs = (WeatherRequest.query.filter(WeatherRequest.created_at < cutoff)
+                    .order_by(WeatherRequest.id).limit(batch).all())
+            if not recs:
+                break
+            if archive:
+                for rec in recs:
+                    archive.write(json.dumps(_row_dict(rec)) + "\n")
+                archive.flush()
+            WeatherRequest.query.filter(WeatherRequest.id.in_([r.id for r in recs])).delete(synchronize_session=False)
+            db.session.commit()
+            pruned += len(recs)
+    finally:
+        if archive:
+            archive.close()
+    return pruned
+
+def recompress_records(batch=BATCH_SIZE, pause=0.0):
+    """Rewrite rows still stored as plain text in compressed form"""
+    if not _is_sqlite():
+        return 0
+    table = WeatherRequest.__table__
+    rewritten, last_id = 0, 0
+    while True:
+        # values shorter than MIN_COMPRESS_BYTES stay plain text when rewritten, so skip them rather than
+        # rewriting (and counting) them again on every run
+        ids = [row[0] for row in db.session.execute(
+            text("SELECT id FROM weather_requests WHERE id > :last AND "
+                 "((typeof(weather_json) = 'text' AND length(weather_json) >= :min) OR "
+                 "(typeof(ai_summary) = 'text' AND length(ai_summary) >= :min)) ORDER BY id LIMIT :n"),
+            {"last": last_id, "n": batch, "min": MIN_COMPRESS_BYTES})]
+        if not ids:
+            break
+        for rec in WeatherRequest.query.filter(WeatherRequest.id.in_(ids)):
+            # core update with updated_at set explicitly so the onupdate hook (and Last-Modified) is untouched
+            db.session.execute(table.update().where(table.c.id == rec.id).values(
+                weather_json=rec.weather_json, ai_summary=rec.ai_summary, updated_at=rec.updated_at))
+        db.session.commit()
+        rewritten += len(ids)
+        last_id = ids[-1]
+        if pause:
+            time.sleep(pause)
+    return rewritten
+
+def compact(step_pages=256, pause=0.05, enable_incremental=False):
+    """Reclaim free pages a step at a time with incremental_vacuum instead of one long VACUUM"""
+    if not _is_sqlite():
+        raise RuntimeError("compact only applies to SQLite databases")
+    conn = db.session.connection()
+    mode = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+    if mode != 2:
+        if not enable_incremental:
+            raise RuntimeError("auto_vacuum is not INCREMENTAL; run once with enable_incremental=True "
+                               "(a single full VACUUM) to switch the database over")
+        db.session.commit()
+        with db.engine.connect() as raw:
+            raw.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            raw.exec_driver_sql("VACUUM")
+    reclaimed = 0
+    while True:
+        free = db.session.execute(text("PRAGMA freelist_count")).scalar()
+        if not free:
+            break
+        db.session.execute(text(f"PRAGMA incremental_vacuum({min(step_pages, free)})"))
+        db.session.commit()
+        reclaimed += min(step_pages, free)
+        time.sleep(pause)
+    db.session.execute(text("PRAGMA wal_checkpoint(TRUNCATE)"))
+    db.session.commit()
+    return reclaimed
+
+def storage_stats():
+    """Stored vs decoded size of the payload columns"""
+    if not _is_sqlite():
+        decoded = sum(len((w or "").encode("utf-8")) + len((s or "").encode("utf-8"))
+                      for w, s in db.session.query(WeatherRequest.weather_json, WeatherRequest.ai_summary))
+        return {"rows": WeatherRequest.query.count(), "compressed_rows": 0, "stored_bytes": decoded,
+                "decoded_bytes": decoded, "ratio": 1.0 if decoded else None}
+    rows, compressed = db.session.execute(text(
+        "SELECT count(*), sum(typeof(weather_json) = 'blob') FROM weather_requests")).one()
+    stored = db.session.execute(text(
+        "SELECT coalesce(sum(length(CAST(weather_json AS BLOB))), 0) + coalesce(sum(length(CAST(ai_summary AS BLOB))), 0) "
+        "FROM weather_requests")).scalar()
+    decoded = 0
+    for weather_json, ai_summary in db.session.query(WeatherRequest.weather_json, WeatherRequest.ai_summary):
+        decoded += len((weather_json or "").encode("utf-8")) + len((ai_summary or "").encode("utf-8"))
+    page_size = db.session.execute(text("PRAGMA page_size")).scalar()
+    return {
+        "rows": rows,
+        "compressed_rows": compressed or 0,
+        "stored_bytes": stored,
+        "decoded_bytes": decoded,
+        "ratio": round(decoded / stored, 2) if stored else None,
+        "file_bytes": page_size * db.session.execute(text("PRAGMA page_count")).scalar(),
+        "free_bytes": page_size * db.session.execute(text("PRAGMA freelist_count")).scalar(),
+    }
@@ -0,0 +1,207 @@
+// Weather Insights Dashboard for view.html.
+// Plotly and the chart series are only fetched once the dashboard is about to
+// scroll into view, so they stay off the critical path of the page.
+
+function showChartMessage(text, perChart) {
+    const names = { temperatureChart: 'Temperature', humidityChart: 'Humidity', combinedChart: 'Combined' };
+    Object.entries(names).forEach(([id, name]) => {
+        document.getElementById(id).innerHTML =
+            `<p class="text-muted text-center p-4">${perChart ? `${name} ${text}` : text}</p>`;
+    });
+}
+
+function renderWeatherCharts(chart) {
+    if (chart.labels && chart.labels.length > 0) {
+        // Series are precomputed when the weather is stored
+        var dayTemps = chart.day;
+        var minTemps = chart.min;
+        var maxTemps = chart.max;
+        var labels = chart.labels;
+
+        // Create humidity data (mock data if not available)
+        var humidity = labels.map(() => Math.floor(Math.random() * 40) + 40); // 40-80%
+
+        // Temperature Chart with Min/Max Range
+        var tempTrace1 = {
+            x: labels,
+            y: dayTemps,
+            type: 'scatter',
+            mode: 'lines+markers',
+            name: 'Average Temperature',
+            line: { color: '#007bff', width: 3 },
+            marker: { size: 8, color: '#007bff' }
+        };
+
+        var tempTrace2 = {
+            x: labels,
+            y: maxTemps,
+            type: 'scatter',
+            mode: 'lines',
+            name: 'Max Temperature',
+            line: { color: '#ff6b6b', width: 2, dash: 'dash' },
+            showlegend: true
+        };
+
+        var tempTrace3 = {
+            x: labels,
+            y: minTemps,
+            type: 'scatter',
+            mode: 'lines',
+            name: 'Min Temperature',
+            line: { color: '#74c0fc', width: 2, dash: 'dash' },
+            fill: 'tonexty',
+            fillcolor: 'rgba(116, 192, 252, 0.1)'
+        };
+
+        var tempLayout = {
+            title: {
+                text: 'Temperature Forecast',
+                font: { size: 16, color: '#333' }
+            },
+            xaxis: { title: 'Days' },
+            yaxis: { title: 'Temperature (°C)' },
+            plot_bgcolor: '#f8f9fa',
+            paper_bgcolor: '#ffffff',
+            showlegend: true,
+            legend: { x: 0, y: 1 }
+        };
+
+        Plotly.newPlot('temperatureChart', [tempTrace3, tempTrace2, tempTrace1], tempLayout, { responsive: true });
+
+        // Humidity Chart
+        var humidityTrace = {
+            x: labels,
+            y: humidity,
+            type: 'bar',
+            name: 'Humidity',
+            marker: {
+                color: humidity.map(h => `rgba(54, 162, 235, ${h / 100})`),
+                line: { color: '#36a2eb', width: 1 }
+            }
+        };
+
+        var humidityLayout = {
+            title: {
+                text: 'Humidity Levels',
+                font: { size: 16, color: '#333' }
+            },
+            xaxis: { title: 'Days' },
+            yaxis: { title: 'Humidity (%)' },
+            plot_bgcolor: '#f8f9fa',
+            paper_bgcolor: '#ffffff'
+        };
+
+        Plotly.newPlot('humidityChart', [humidityTrace], humidityLayout, { responsive: true });
+
+        // Combined Weather Overview
+        var combinedTrace1 = {
+            x: labels,
+            y: dayTemps,
+            type: 'scatter',
+            mode: 'lines+markers',
+            name: 'Temperature (°C)',
+            yaxis: 'y',
+            line: { color: '#007bff', width: 3 },
+            marker: { size: 10, color: '#007bff' }
+        };
+
+        var combinedTrace2 = {
+            x: labels,
+            y: humidity,
+            type: 'bar',
+            name: 'Humidity (%)',
+            yaxis: 'y2',
+            opacity: 0.6,
+            marker: { color: '#28a745' }
+        };
+
+        var combinedLayout = {
+            title: {
+                text: 'Complete Weather Overview',
+                font: { size: 18, color: '#333' }
+            },
+            xaxis: { title: 'Days' },
+            yaxis: {
+                title: 'Temperature (°C)',
+                side: 'left'
+            },
+            yaxis2: {
+                title: 'Humidity (%)',
+                side: 'right',
+                overlaying: 'y'
+            },
+            plot_bgcolor: '#f8f9fa',
+            paper_bgcolor: '#ffffff',
+            showlegend: true,
+            legend: { x: 0, y: 1 }
+        };
+
+        Plotly.newPlot('combinedChart', [combinedTrace1, combinedTrace2], combinedLayout, { responsive: true });
+
+        // Add current weather indicator
+        if (chart.current_temp) {
+            var currentAnnotation = {
+                x: 'Today',
+                y: chart.current_temp,
+                text: `Current: ${chart.current_temp.toFixed(1)}°C`,
+                showarrow: true,
+                arrowhead: 2,
+                arrowcolor: '#ff4757',
+                bgcolor: '#ff4757',
+                bordercolor: '#ff4757',
+                font: { color: 'white' }
+            };
+
+            Plotly.relayout('temperatureChart', {
+                annotations: [currentAnnotation]
+            });
+        }
+
+    } else {
+        showChartMessage('chart unavailable', true);
+    }
+}
+
+function loadScript(src) {
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = src;
+        script.async = true;
+        script.onload = resolve;
+        script.onerror = () => reject(new Error(`Could not load ${src}`));
+        document.head.appendChild(script);
+    });
+}
+
+(function () {
+    const section = document.getElementById('weatherCharts');
+    if (!section) return;
+    let started = false;
+
+    async function start() {
+        if (started) return;
+        started = true;
+        try {
+            const [, chart] = await Promise.all([
+                window.Plotly ? null : loadScript(section.dataset.plotlySrc),
+                fetch(section.dataset.chartUrl).then((response) => response.json()),
+            ]);
+            renderWeatherCharts(chart);
+        } catch (error) {
+            console.log('Weather charts error:', error);
+            showChartMessage('Charts temporarily unavailable', false);
+        }
+    }
+
+    if ('IntersectionObserver' in window) {
+        const observer = new IntersectionObserver((entries) => {
+            if (entries.some((entry) => entry.isIntersecting)) {
+                observer.disconnect();
+                start();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(section);
+    } else {
+        start();
+    }
+})();
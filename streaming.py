@@ -0,0 +1,117 @@
+import json
+import re
+import threading
+from flask import Response, stream_with_context
+
+# Server-sent events for the summary and chat streams. Each event's data is one
+# JSON document, so clients can JSON.parse it whatever text it carries.
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # stop nginx-style proxies from buffering the stream until it ends
+    "X-Accel-Buffering": "no",
+}
+
+def sse_event(data, event=None):
+    """One SSE frame"""
+    frame = f"event: {event}\n" if event else ""
+    return frame + f"data: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    """Stream an iterable of SSE frames, keeping the request context alive while it runs"""
+    return Response(stream_with_context(events), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+def sentence_chunks(text):
+    """Split a finished reply into sentence-sized pieces for streaming"""
+    return [piece for piece in re.split(r"(?<=[.!?])(?=\s)", text) if piece]
+
+
+class _SharedStream:
+    def __init__(self):
+        self.pieces = []
+        self.readers = 0
+        self.done = False
+        self.changed = threading.Condition()
+
+    def follow(self, idle_timeout):
+        """Every piece from the start; None after idle_timeout without one, so the caller can check the client"""
+        i = 0
+        while True:
+            with self.changed:
+                if i == len(self.pieces) and not self.done:
+                    self.changed.wait(idle_timeout)
+                pieces, done = self.pieces[i:], self.done
+            i += len(pieces)
+            for piece in pieces:
+                yield piece
+            if done and i == len(self.pieces):
+                return
+            if not pieces:
+                yield None
+
+
+class SharedStreams:
+    """At most one producer per key, followed by any number of readers.
+
+    The first reader starts the producer in a background thread; later readers
+    replay what it has produced so far and then follow it live. When the last
+    reader leaves, the producer is closed between pieces, and on_done only runs
+    for a producer that finished.
+    """
+
+    def __init__(self, idle_timeout=15):
+        self.idle_timeout = idle_timeout
+        self._streams = {}
+        self._lock = threading.Lock()
+
+    def follow(self, key, produce, on_done=None):
+        """Generator over the pieces of the producer for key, starting produce() if none is running"""
+        with self._lock:
+            stream = self._streams.get(key)
+            if stream is None:
+                stream = self._streams[key] = _SharedStream()
+                threading.Thread(target=self._run, args=(key, stream, produce, on_done), daemon=True).start()
+            stream.readers += 1
+        try:
+            yield from stream.follow(self.idle_timeout)
+        finally:
+            with self._lock:
+                stream.readers -= 1
+
+    def _run(self, key, stream, produce, on_done):
+        pieces = produce()
+        finished = False
+        try:
+            for piece in pieces:
+                with self._lock:
+                    if stream.readers == 0:
+                        self._unregister(key, stream)
+                        break
+                with stream.changed:
+                    stream.pieces.append(piece)
+                    stream.changed.notify_all()
+            else:
+                finished = True
+        except Exception as e:
+            print(f"Shared stream {key} failed: {e}")
+        finally:
+            pieces.close()
+            if finished and on_done is not None:
+                try:
+                    on_done("".join(stream.pieces))
+                except Exception as e:
+                    print(f"Shared stream {key} completion failed: {e}")
+            # unregister only after on_done, so a reader arriving meanwhile still attaches here
+            with self._lock:
+                self._unregister(key, stream)
+            with stream.changed:
+                stream.done = True
+                stream.changed.notify_all()
+
+    def _unregister(self, key, stream):
+        # a newer stream may already hold key once this one gave up; leave it alone
+        if self._streams.get(key) is stream:
+            del self._streams[key]
+
+    def __len__(self):
+        return len(self._streams)
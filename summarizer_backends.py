@@ -0,0 +1,65 @@
+import os
+
+# Inference backends for ai_generate_summary. Every loader returns a transformers
+# summarization pipeline (or a drop-in callable), so callers don't care which one
+# is configured:
+#
+#   bart       full-precision facebook/bart-large-cnn (the original behaviour)
+#   int8       the same model with dynamic int8 quantization of its Linear layers
+#   onnx       the same model exported to ONNX and run by onnxruntime (needs optimum[onnxruntime])
+#   distilled  a smaller distilled checkpoint (sshleifer/distilbart-cnn-12-6 by default)
+
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "bart")
+SUMMARIZER_MODEL = os.getenv("SUMMARIZER_MODEL", "facebook/bart-large-cnn")
+DISTILLED_MODEL = os.getenv("SUMMARIZER_DISTILLED_MODEL", "sshleifer/distilbart-cnn-12-6")
+# where the exported ONNX graph is cached so workers don't re-export on start
+ONNX_DIR = os.getenv("SUMMARIZER_ONNX_DIR", os.path.join("instance", "onnx-summarizer"))
+SUMMARIZER_THREADS = int(os.getenv("SUMMARIZER_THREADS", "0"))  # 0 leaves the framework default
+
+def _set_threads():
+    if SUMMARIZER_THREADS:
+        import torch
+        torch.set_num_threads(SUMMARIZER_THREADS)
+
+def load_bart(model_name=SUMMARIZER_MODEL):
+    from transformers import pipeline
+    return pipeline("summarization", model=model_name)
+
+def load_int8(model_name=SUMMARIZER_MODEL):
+    import torch
+    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSeq2SeqLM.from_pretrained(model_name).eval()
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+def load_onnx(model_name=SUMMARIZER_MODEL, onnx_dir=ONNX_DIR):
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    from transformers import AutoTokenizer, pipeline
+    if os.path.isdir(onnx_dir):
+        model = ORTModelForSeq2SeqLM.from_pretrained(onnx_dir)
+        tokenizer = AutoTokenizer.from_pretrained(onnx_dir)
+    else:
+        model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model.save_pretrained(onnx_dir)
+        tokenizer.save_pretrained(onnx_dir)
+    return pipeline("summarization", model=model, tokenizer=tokenizer)
+
+def load_distilled(model_name=DISTILLED_MODEL):
+    from transformers import pipeline
+    return pipeline("summarization", model=model_name)
+
+BACKENDS = {
+    "bart": load_bart,
+    "int8": load_int8,
+    "onnx": load_onnx,
+    "distilled": load_distilled,
+}
+
+def load_summarizer(backend=SUMMARIZER_BACKEND):
+    """Load the configured summarization backend"""
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown SUMMARIZER_BACKEND {backend!r}; choose from {', '.join(BACKENDS)}")
+    _set_threads()
+    return BACKENDS[backend]()
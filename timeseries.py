@@ -0,0 +1,222 @@
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import text
+from live_updates import location_id
+
+# Observation history for tracked locations.
+#
+# Raw observations are append-only and partitioned by month into
+# observations_YYYYMM tables (clustered by location, then time), so a range
+# query touches only the months it covers. Hourly and daily rollups
+# (count, temperature min/max/sum, humidity and wind sums, wind max) are
+# updated incrementally with every new observation. Buckets are in UTC.
+# The tables use SQLite DDL and upserts; on other databases history is off and
+# every function here is a no-op.
+
+COLLECTOR_INTERVAL_SECONDS = int(os.getenv("COLLECTOR_INTERVAL_SECONDS", "3600"))
+# "lat,lon[,name];..." always collected, on top of the most requested locations
+COLLECTOR_LOCATIONS = os.getenv("COLLECTOR_LOCATIONS", "")
+COLLECTOR_TOP_N = int(os.getenv("COLLECTOR_TOP_N", "10"))
+
+GRANULARITIES = {"hour": 3600, "day": 86400}
+PARTITION_RE = re.compile(r"^observations_(\d{6})$")
+
+_engine = None
+_partitions = set()
+_lock = threading.Lock()
+
+def init_timeseries(engine):
+    """Create the rollup and location tables and remember the engine (SQLite only)"""
+    global _engine
+    if engine.dialect.name != "sqlite":
+        return
+    _engine = engine
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS observation_rollups ("
+            "location_key VARCHAR(32) NOT NULL, granularity VARCHAR(8) NOT NULL, bucket INTEGER NOT NULL, "
+            "n INTEGER NOT NULL, temp_sum REAL, temp_min REAL, temp_max REAL, humidity_sum REAL, "
+            "wind_sum REAL, wind_max REAL, PRIMARY KEY (location_key, granularity, bucket)) WITHOUT ROWID"))
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS tracked_locations ("
+            "location_key VARCHAR(32) PRIMARY KEY, name VARCHAR(256), lat REAL, lon REAL, "
+            "first_seen INTEGER, last_seen INTEGER)"))
+        _refresh_partitions(conn)
+
+def _refresh_partitions(conn):
+    # other workers may have created partitions since this one last looked
+    names = conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE 'observations_%'"))
+    _partitions.update(name for (name,) in names if PARTITION_RE.match(name))
+
+def partition_name(dt):
+    return "observations_" + datetime.fromtimestamp(dt, timezone.utc).strftime("%Y%m")
+
+def _ensure_partition(conn, name, created):
+    """Create a partition inside the caller's transaction; it joins _partitions only once that commits"""
+    if name not in _partitions and name not in created:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {name} ("
+            "location_key VARCHAR(32) NOT NULL, dt INTEGER NOT NULL, temp REAL, feels_like REAL, humidity REAL, "
+            "pressure REAL, wind_speed REAL, visibility REAL, condition VARCHAR(32), "
+            "PRIMARY KEY (location_key, dt)) WITHOUT ROWID"))
+        created.add(name)
+
+def partitions_between(start, end):
+    """Existing partitions overlapping [start, end] (epoch seconds)"""
+    first, last = partition_name(start)[-6:], partition_name(end)[-6:]
+    return sorted(p for p in _partitions if first <= p[-6:] <= last)
+
+ROLLUP_UPSERT = text(
+    "INSERT INTO observation_rollups (location_key, granularity, bucket, n, temp_sum, temp_min, temp_max, "
+    "humidity_sum, wind_sum, wind_max) VALUES (:key, :granularity, :bucket, 1, :temp, :temp, :temp, :humidity, :wind, :wind) "
+    "ON CONFLICT (location_key, granularity, bucket) DO UPDATE SET n = n + 1, "
+    "temp_sum = temp_sum + excluded.temp_sum, temp_min = MIN(temp_min, excluded.temp_min), "
+    "temp_max = MAX(temp_max, excluded.temp_max), humidity_sum = humidity_sum + excluded.humidity_sum, "
+    "wind_sum = wind_sum + excluded.wind_sum, wind_max = MAX(wind_max, excluded.wind_max)")
+
+def record_observations(items):
+    """Append (lat, lon, name, weather) current observations in one transaction; returns how many were new.
+
+    An observation already stored for the same location and provider timestamp is
+    skipped, so the rollups count every observation exactly once.
+    """
+    if _engine is None:
+        return 0
+    added = 0
+    created = set()
+    with _lock:
+        with _engine.begin() as conn:
+            for lat, lon, name, weather in items:
+                current = (weather or {}).get("current") or {}
+                dt, temp, humidity = current.get("dt"), current.get("temp"), current.get("humidity")
+                if dt is None or temp is None or humidity is None or lat is None or lon is None:
+                    continue
+                key = location_id(lat, lon)
+                table = partition_name(dt)
+                _ensure_partition(conn, table, created)
+                wind = current.get("wind_speed") or 0
+                inserted = conn.execute(text(
+                    f"INSERT OR IGNORE INTO {table} (location_key, dt, temp, feels_like, humidity, pressure, wind_speed, "
+                    "visibility, condition) VALUES (:key, :dt, :temp, :feels_like, :humidity, :pressure, :wind, :visibility, :condition)"),
+                    {"key": key, "dt": dt, "temp": temp, "feels_like": current.get("feels_like"), "humidity": humidity,
+                     "pressure": current.get("pressure"), "wind": wind, "visibility": current.get("visibility"),
+                     "condition": current.get("main")}).rowcount
+                conn.execute(text(
+                    "INSERT INTO tracked_locations (location_key, name, lat, lon, first_seen, last_seen) "
+                    "VALUES (:key, :name, :lat, :lon, :dt, :dt) ON CONFLICT (location_key) DO UPDATE SET "
+                    "name = COALESCE(excluded.name, name), last_seen = MAX(last_seen, excluded.last_seen)"),
+                    {"key": key, "name": name, "lat": lat, "lon": lon, "dt": dt})
+                if not inserted:
+                    continue
+                for granularity, width in GRANULARITIES.items():
+                    conn.execute(ROLLUP_UPSERT, {"key": key, "granularity": granularity, "bucket": dt - dt % width,
+                                                 "temp": temp, "humidity": humidity, "wind": wind})
+                added += 1
+        # only after the commit: a rolled-back transaction takes its CREATE TABLE with it
+        _partitions.update(created)
+    return added
+
+def record_observation(lat, lon, weather, name=None):
+    """Append one payload's current observation; never raises into the caller"""
+    try:
+        return record_observations([(lat, lon, name, weather)])
+    except Exception as e:
+        print(f"Could not record observation for {name or (lat, lon)}: {e}")
+        return 0
+
+def query_observations(key, start, end):
+    """Raw observations for a location between two epoch timestamps, oldest first"""
+    if _engine is None:
+        return []
+    with _engine.connect() as conn:
+        _refresh_partitions(conn)
+        tables = partitions_between(start, end)
+        if not tables:
+            return []
+        union = " UNION ALL ".join(
+            f"SELECT dt, temp, feels_like, humidity, pressure, wind_speed, visibility, condition FROM {t} "
+            "WHERE location_key = :key AND dt BETWEEN :start AND :end" for t in tables)
+        rows = conn.execute(text(union + " ORDER BY dt"), {"key": key, "start": start, "end": end})
+        return [dict(row._mapping) for row in rows]
+
+def query_rollups(key, granularity="day", start=None, end=None):
+    """Rollup buckets for a location, oldest first, with means filled in"""
+    if _engine is None:
+        return []
+    end = end if end is not None else int(datetime.now(timezone.utc).timestamp())
+    start = start if start is not None else end - 30 * 86400
+    with _engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT bucket, n, temp_sum, temp_min, temp_max, humidity_sum, wind_sum, wind_max FROM observation_rollups "
+            "WHERE location_key = :key AND granularity = :granularity AND bucket BETWEEN :start AND :end ORDER BY bucket"),
+            {"key": key, "granularity": granularity, "start": start - start % GRANULARITIES[granularity], "end": end})
+        return [{
+            "start": datetime.fromtimestamp(r.bucket, timezone.utc).isoformat(),
+            "count": r.n,
+            "temp_mean": round(r.temp_sum / r.n, 2),
+            "temp_min": r.temp_min,
+            "temp_max": r.temp_max,
+            "humidity_mean": round(r.humidity_sum / r.n, 1),
+            "wind_mean": round(r.wind_sum / r.n, 2),
+            "wind_max": r.wind_max,
+        } for r in rows]
+
+def daily_history(lat, lon, days=30):
+    """Daily rollups for the last `days` days at a location"""
+    return query_rollups(location_id(lat, lon), "day", int(datetime.now(timezone.utc).timestamp()) - days * 86400)
+
+def recent_daily_means(lat, lon, before, days=14):
+    """Observed daily mean temperatures for the unbroken run of days ending the day before `before` (YYYY-MM-DD)"""
+    if _engine is None or lat is None or lon is None or not before:
+        return []
+    end = int(datetime.fromisoformat(before).replace(tzinfo=timezone.utc).timestamp()) - 86400
+    try:
+        with _engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT bucket, temp_sum / n FROM observation_rollups WHERE location_key = :key AND granularity = 'day' "
+                "AND bucket BETWEEN :start AND :end ORDER BY bucket DESC"),
+                {"key": location_id(lat, lon), "start": end - (days - 1) * 86400, "end": end}).fetchall()
+    except Exception as e:
+        print(f"Could not read observed history: {e}")
+        return []
+    means, expected = [], end
+    for bucket, mean in rows:
+        if bucket != expected:
+            break  # a gap would skew the evenly spaced trend fit
+        means.append(mean)
+        expected -= 86400
+    return means[::-1]
+
+def collection_targets(engine, top_n=COLLECTOR_TOP_N, configured=COLLECTOR_LOCATIONS):
+    """(lat, lon, name) to collect: configured locations plus the most requested ones"""
+    targets = {}
+    for entry in filter(None, (e.strip() for e in configured.split(";"))):
+        parts = [p.strip() for p in entry.split(",", 2)]
+        try:
+            lat, lon = float(parts[0]), float(parts[1])
+        except (ValueError, IndexError):
+            print(f"Ignoring COLLECTOR_LOCATIONS entry {entry!r}")
+            continue
+        targets[location_id(lat, lon)] = (lat, lon, parts[2] if len(parts) > 2 else None)
+    if top_n:
+        with engine.connect() as conn:
+            rows = conn.execute(text(
+                "SELECT ROUND(lat, 3) AS lat, ROUND(lon, 3) AS lon, MAX(resolved_name) AS name, COUNT(*) AS hits "
+                "FROM weather_requests WHERE lat IS NOT NULL AND lon IS NOT NULL "
+                "GROUP BY ROUND(lat, 3), ROUND(lon, 3) ORDER BY hits DESC LIMIT :n"), {"n": top_n})
+            for lat, lon, name, _ in rows:
+                targets.setdefault(location_id(lat, lon), (lat, lon, name))
+    return list(targets.values())
+
+def collect_once(fetch, targets):
+    """Fetch current conditions for every target and append them; returns (new observations, failures)"""
+    items, failures = [], 0
+    for lat, lon, name in targets:
+        try:
+            items.append((lat, lon, name, fetch(lat, lon)))
+        except Exception as e:
+            failures += 1
+            print(f"Collector fetch failed for {name or (lat, lon)}: {e}")
+    return record_observations(items), failures
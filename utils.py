@@ -1,22 +1,32 @@
 import os
 import requests
+from threading import Event
 from geopy.geocoders import Nominatim
 from dotenv import load_dotenv
+from live_updates import location_id
+from resilience import (UPSTREAM_TIMEOUT_SECONDS, BREAKERS, CircuitOpen, DeadlineExceeded, UpstreamUnavailable,
+                        upstream_error, call_timeout, upstream_get, last_known, mark_stale)
+from http_cache import WEATHER_FRESHNESS_SECONDS
 load_dotenv()
 
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_API_KEY")
 USER_AGENT = os.getenv("USER_AGENT", "weather-app")
 
-geolocator = Nominatim(user_agent=USER_AGENT, timeout=10)
+geolocator = Nominatim(user_agent=USER_AGENT, timeout=UPSTREAM_TIMEOUT_SECONDS)
 
-def geocode_location(query):
+def geocode_location(query, deadline=None):
     # try direct geocode (handles city, zip, landmark)
     try:
-        location = geolocator.geocode(query, addressdetails=True, exactly_one=True)
+        location = BREAKERS["nominatim"].call(geolocator.geocode, query, addressdetails=True, exactly_one=True,
+                                              timeout=call_timeout(deadline))
         if location:
             name = location.address
             return {"name": name, "lat": location.latitude, "lon": location.longitude}
     except Exception as e:
+        # an outage or a blown deadline is not an unknown place; let the caller answer 503/504
+        upstream = upstream_error(e, "Nominatim")
+        if upstream is not None:
+            raise upstream from e
         print("Geocode error:", e)
     return None
 
@@ -29,7 +39,28 @@ def reverse_geocode(lat, lon):
         print("Reverse geocode:", e)
     return None
 
-def get_weather(lat, lon, units="metric", start_date=None, end_date=None):
+def current_from_api(current_data):
+    """Current conditions in the payload format, from an OpenWeatherMap /weather response"""
+    return {
+        "dt": current_data["dt"],
+        "temp": current_data["main"]["temp"],
+        "feels_like": current_data["main"]["feels_like"],
+        "humidity": current_data["main"]["humidity"],
+        "pressure": current_data["main"]["pressure"],
+        "visibility": current_data.get("visibility", 10000) / 1000,  # Convert to km
+        "wind_speed": current_data.get("wind", {}).get("speed", 0),
+        "weather": current_data["weather"],
+        "description": current_data["weather"][0]["description"] if current_data["weather"] else "N/A",
+        "main": current_data["weather"][0]["main"] if current_data["weather"] else "N/A"
+    }
+
+def get_current_observation(lat, lon, units="metric", deadline=None):
+    """Current conditions only (one upstream call instead of get_weather's two)"""
+    r = upstream_get("openweather", "https://api.openweathermap.org/data/2.5/weather",
+                     {"lat": lat, "lon": lon, "units": units, "appid": OPENWEATHER_KEY}, deadline)
+    return {"current": current_from_api(r.json())}
+
+def get_weather(lat, lon, units="metric", start_date=None, end_date=None, deadline=None):
     
     # Current weather
     current_url = f"https://api.openweathermap.org/data/2.5/weather"
@@ -41,29 +72,14 @@ def get_weather(lat, lon, units="metric", start_date=None, end_date=None):
     
     try:
         # Get current weather
-        current_r = requests.get(current_url, params=current_params, timeout=10)
-        current_r.raise_for_status()
-        current_data = current_r.json()
+        current_data = upstream_get("openweather", current_url, current_params, deadline).json()
         
-        # Get forecast
-        forecast_r = requests.get(forecast_url, params=forecast_params, timeout=10)
-        forecast_r.raise_for_status()
-        forecast_data = forecast_r.json()
+        # Get forecast (within whatever is left of the deadline)
+        forecast_data = upstream_get("openweather", forecast_url, forecast_params, deadline).json()
         
         # Transform to match the expected format
         result = {
-            "current": {
-                "dt": current_data["dt"],
-                "temp": current_data["main"]["temp"],
-                "feels_like": current_data["main"]["feels_like"],
-                "humidity": current_data["main"]["humidity"],
-                "pressure": current_data["main"]["pressure"],
-                "visibility": current_data.get("visibility", 10000) / 1000,  # Convert to km
-                "wind_speed": current_data.get("wind", {}).get("speed", 0),
-                "weather": current_data["weather"],
-                "description": current_data["weather"][0]["description"] if current_data["weather"] else "N/A",
-                "main": current_data["weather"][0]["main"] if current_data["weather"] else "N/A"
-            },
+            "current": current_from_api(current_data),
             "daily": [],
             "requested_start_date": start_date,
             "requested_end_date": end_date
@@ -114,97 +130,201 @@ def get_weather(lat, lon, units="metric", start_date=None, end_date=None):
                 "main_condition": data["weather"][0]["main"] if data["weather"] else "N/A"
             })
         
+        last_known.put((location_id(lat, lon), start_date or "", end_date or ""), result)
         return result
         
-    except requests.exceptions.HTTPError as e:
-        if e.response.status_code == 401:
+    except (UpstreamUnavailable, DeadlineExceeded):
+        raise
+    except Exception as e:
+        # timeouts, connection errors, 429 and 5xx become DeadlineExceeded/UpstreamUnavailable (504/503)
+        upstream = upstream_error(e, "OpenWeatherMap")
+        if upstream is not None:
+            raise upstream from e
+        if isinstance(e, requests.exceptions.HTTPError) and e.response.status_code == 401:
             raise Exception(f"Invalid API key. Please check your OpenWeatherMap API key. Error: {e}")
-        else:
+        if isinstance(e, requests.exceptions.HTTPError):
             raise Exception(f"Weather API error: {e}")
-    except Exception as e:
         raise Exception(f"Failed to fetch weather data: {e}")
     
-from transformers import pipeline
+def get_weather_or_stale(lat, lon, start_date=None, end_date=None, deadline=None, fallback=None):
+    """get_weather, or the last known payload for the location (marked stale) when the upstream is down or too slow.
+
+    fallback() may supply (fetched_at, weather) when this process has nothing cached, e.g. from stored records.
+    """
+    key = (location_id(lat, lon), start_date or "", end_date or "")
+    try:
+        return get_weather(lat, lon, start_date=start_date, end_date=end_date, deadline=deadline)
+    except Exception as e:
+        cached = last_known.get(key) or (fallback() if fallback else None)
+        if not cached:
+            raise
+        if not isinstance(e, CircuitOpen):
+            # slow rather than down: finish the fetch off the request path for the next caller
+            last_known.revalidate(key, lambda: get_weather(lat, lon, start_date=start_date, end_date=end_date))
+        print(f"Serving stale weather for {key[0]}: {e}")
+        return mark_stale(cached[1], cached[0], str(e))
+
+def restrict_to_dates(weather_data, start_date=None, end_date=None):
+    """Copy of an unfiltered payload limited to a record's date range, as get_weather would return it"""
+    result = dict(weather_data, requested_start_date=start_date, requested_end_date=end_date)
+    if start_date and end_date:
+        result["daily"] = [d for d in weather_data.get("daily", []) if start_date <= d.get("date", "") <= end_date]
+    return result
+
+def refilter_weather(weather_data, old_start, old_end, start_date=None, end_date=None):
+    """Stored payload re-filtered to a new date range, or None when its days don't cover the range and it must be refetched"""
+    days = [d.get("date") for d in weather_data.get("daily", []) if d.get("date")]
+    if not days:
+        return None
+    if old_start and old_end:
+        # a filtered payload only knows the days inside its own range
+        covered = bool(start_date and end_date) and old_start <= start_date and end_date <= old_end
+    else:
+        covered = not end_date or end_date <= days[-1]
+    return restrict_to_dates(weather_data, start_date, end_date) if covered else None
+
+from summarizer_backends import SUMMARIZER_BACKEND, load_summarizer
 
 # Initialize summarizer as None - will load on demand
 summarizer = None
 
+# generation settings shared by every backend (and the summarizer benchmark)
+SUMMARY_GENERATION = {"max_length": 150, "min_length": 50, "do_sample": False}
+
 def get_summarizer():
-    """Lazy load the summarizer model"""
+    """Lazy load the summarizer model for the configured SUMMARIZER_BACKEND"""
     global summarizer
     if summarizer is None:
         try:
-            summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
+            summarizer = load_summarizer(SUMMARIZER_BACKEND)
         except Exception as e:
-            print(f"Warning: Could not load AI model: {e}")
+            print(f"Warning: Could not load AI model ({SUMMARIZER_BACKEND} backend): {e}")
             summarizer = False  
     return summarizer if summarizer is not False else None
 
-def ai_generate_summary(weather_data, city):
+def build_summary_prompt(weather_data, city):
+    """Text handed to the summarization model"""
+    # Work with the current data structure
+    current = weather_data.get("current", {})
+    daily_forecast = weather_data.get("daily", [])
+    
+    # Build a comprehensive context for AI summarization
+    text = f"Weather analysis for {city}: "
+    
+    # Add current weather with more context
+    if current:
+        temp = current.get("temp", "N/A")
+        feels_like = current.get("feels_like", temp)
+        humidity = current.get("humidity", "N/A")
+        desc = current.get("weather", [{}])[0].get("description", "unknown")
+        
+        text += f"Currently experiencing {desc} with actual temperature of {temp}°C (feels like {feels_like}°C) and {humidity}% humidity. "
+    
+    # Add trend analysis and recommendations
+    if daily_forecast:
+        temps = [day.get("temp", {}).get("day", 0) for day in daily_forecast if day.get("temp", {}).get("day")]
+        if len(temps) >= 2:
+            trend = "rising" if temps[-1] > temps[0] else "falling" if temps[-1] < temps[0] else "stable"
+            text += f"Temperature trend is {trend} over the next few days. "
+        
+        # Add weather pattern analysis
+        weather_types = [day.get("weather", [{}])[0].get("main", "").lower() for day in daily_forecast]
+        rain_days = weather_types.count("rain")
+        clear_days = weather_types.count("clear")
+        
+        if rain_days > 2:
+            text += "Expect frequent rainfall, consider carrying an umbrella. "
+        elif clear_days > 2:
+            text += "Generally clear skies ahead, great for outdoor activities. "
+    
+    # Add daily forecast with insights
+    for i, day in enumerate(daily_forecast[:5]):
+        temp_min = day.get("temp", {}).get("min", "N/A")
+        temp_max = day.get("temp", {}).get("max", "N/A")
+        desc = day.get("weather", [{}])[0].get("description", "unknown")
+        
+        if i == 0:
+            text += f"Today: {desc} with temperatures ranging from {temp_min}°C to {temp_max}°C. "
+        elif i == 1:
+            text += f"Tomorrow: {desc}, expect {temp_min}°C to {temp_max}°C. "
+        else:
+            text += f"Day {i+1}: {desc} with range {temp_min}°C to {temp_max}°C. "
+
+    return text
+
+# below this much of the request budget the template summary is used instead of the model
+SUMMARY_MIN_BUDGET_SECONDS = float(os.getenv("SUMMARY_MIN_BUDGET_SECONDS", "3"))
+
+def ai_generate_summary(weather_data, city, deadline=None):
     """Generates a natural language summary from forecast data."""
     try:
         # Try to get the AI summarizer
         model = get_summarizer()
-        if model is None:
-            # Fallback to enhanced simple text summary if AI model unavailable
+        if model is None or (deadline is not None and deadline.remaining() < SUMMARY_MIN_BUDGET_SECONDS):
+            # Fallback to enhanced simple text summary if AI model unavailable or out of time
             return create_enhanced_summary(weather_data, city)
         
-        # Work with the current data structure
-        current = weather_data.get("current", {})
-        daily_forecast = weather_data.get("daily", [])
-        
-        # Build a comprehensive context for AI summarization
-        text = f"Weather analysis for {city}: "
-        
-        # Add current weather with more context
-        if current:
-            temp = current.get("temp", "N/A")
-            feels_like = current.get("feels_like", temp)
-            humidity = current.get("humidity", "N/A")
-            desc = current.get("weather", [{}])[0].get("description", "unknown")
-            
-            text += f"Currently experiencing {desc} with actual temperature of {temp}°C (feels like {feels_like}°C) and {humidity}% humidity. "
-        
-        # Add trend analysis and recommendations
-        if daily_forecast:
-            temps = [day.get("temp", {}).get("day", 0) for day in daily_forecast if day.get("temp", {}).get("day")]
-            if len(temps) >= 2:
-                trend = "rising" if temps[-1] > temps[0] else "falling" if temps[-1] < temps[0] else "stable"
-                text += f"Temperature trend is {trend} over the next few days. "
-            
-            # Add weather pattern analysis
-            weather_types = [day.get("weather", [{}])[0].get("main", "").lower() for day in daily_forecast]
-            rain_days = weather_types.count("rain")
-            clear_days = weather_types.count("clear")
-            
-            if rain_days > 2:
-                text += "Expect frequent rainfall, consider carrying an umbrella. "
-            elif clear_days > 2:
-                text += "Generally clear skies ahead, great for outdoor activities. "
-        
-        # Add daily forecast with insights
-        for i, day in enumerate(daily_forecast[:5]):
-            temp_min = day.get("temp", {}).get("min", "N/A")
-            temp_max = day.get("temp", {}).get("max", "N/A")
-            desc = day.get("weather", [{}])[0].get("description", "unknown")
-            
-            if i == 0:
-                text += f"Today: {desc} with temperatures ranging from {temp_min}°C to {temp_max}°C. "
-            elif i == 1:
-                text += f"Tomorrow: {desc}, expect {temp_min}°C to {temp_max}°C. "
-            else:
-                text += f"Day {i+1}: {desc} with range {temp_min}°C to {temp_max}°C. "
+        text = build_summary_prompt(weather_data, city)
 
         # Ensure text is adequate for summarization
         if len(text.split()) < 15:
             return create_enhanced_summary(weather_data, city)
             
-        summary = model(text, max_length=150, min_length=50, do_sample=False)
+        summary = model(text, **SUMMARY_GENERATION)
         return summary[0]['summary_text']
     except Exception as e:
         print("AI summary error:", e)
         return create_enhanced_summary(weather_data, city)
 
+SUMMARY_STREAM_TIMEOUT = float(os.getenv("SUMMARY_STREAM_TIMEOUT", "60"))
+
+def stream_summary(weather_data, city):
+    """Yield the summary in pieces as the model decodes it (whole text for the fallback summary).
+
+    Closing the generator early stops the model at its next decoding step.
+    """
+    model = get_summarizer()
+    text = build_summary_prompt(weather_data, city) if model is not None else ""
+    if model is None or len(text.split()) < 15:
+        yield create_enhanced_summary(weather_data, city)
+        return
+    produced = False
+    stop = Event()
+    try:
+        from threading import Thread
+        from transformers import TextIteratorStreamer, StoppingCriteria, StoppingCriteriaList
+        streamer = TextIteratorStreamer(model.tokenizer, skip_prompt=True, skip_special_tokens=True,
+                                        timeout=SUMMARY_STREAM_TIMEOUT)
+        errors = []
+
+        class StopWhenClosed(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                return stop.is_set()
+
+        def generate():
+            try:
+                model(text, streamer=streamer, stopping_criteria=StoppingCriteriaList([StopWhenClosed()]),
+                      **SUMMARY_GENERATION)
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        Thread(target=generate, daemon=True).start()
+        for piece in streamer:
+            if piece:
+                produced = True
+                yield piece
+        if errors:
+            raise errors[0]
+        if not produced:
+            yield create_enhanced_summary(weather_data, city)
+    except Exception as e:
+        print("AI summary stream error:", e)
+        if not produced:
+            yield create_enhanced_summary(weather_data, city)
+    finally:
+        stop.set()
+
 def create_enhanced_summary(weather_data, city):
     """Create an enhanced natural language summary without AI"""
     try:
@@ -335,8 +455,12 @@ def create_simple_summary(weather_data, city):
         return f"Weather data available for {city}"
 
 import requests
-import re
+import time
 from datetime import datetime, timedelta, date
+from intent_engine import get_engine
+from answer_cache import AnswerCache
+from conversation import get_conversation_store, compact_weather
+from timeseries import daily_history
 
 class DynamicWeatherChatbot:
     """Advanced weather chatbot that uses real-time data for specific locations"""
@@ -344,6 +468,9 @@ class DynamicWeatherChatbot:
     def __init__(self):
         self.openweather_key = os.getenv("OPENWEATHER_API_KEY", "YOUR_WEATHER_API_KEY")
         self.geolocator = Nominatim(user_agent="dynamic-weather-chatbot", timeout=10)
+        # keyword and date patterns are compiled once and shared by every chatbot instance
+        self.engine = get_engine()
+        self.answer_cache = AnswerCache()
     
     def get_weather_for_location(self, location_name):
         """Fetch real-time weather data for a specific location"""
@@ -540,42 +667,35 @@ class DynamicWeatherChatbot:
 
     def parse_location_and_date(self, message):
         """Extract location and date context from message"""
-        location = None
-        date_ctx = None
+        parsed = self.engine.parse(message)
+        return parsed["location"], parsed["date"]
 
-        # Extract location using regex
-        m = re.search(r"\b(?:in|at|for|to)\s+([A-Za-z0-9\s,.'-]{2,60}?)(?=(?:\s+(?:today|tomorrow|on|this|next)\b)|[?.!,]|$)", message, re.I)
-        if m:
-            location = m.group(1).strip().strip(".,!?")
+    def get_response(self, message, location_name=None, date_context=None, start_date=None, end_date=None, snapshot=None, context=None):
+        """Generate dynamic response based on real weather data.
 
-        # Extract date keywords
-        if re.search(r"\btomorrow\b", message, re.I):
-            date_ctx = date.today() + timedelta(days=1)
-        elif re.search(r"\btoday\b", message, re.I):
-            date_ctx = date.today()
-
-        # Clean location of date words
-        if location:
-            location = re.sub(r"\b(today|tomorrow)\b", "", location, flags=re.I).strip()
-
-        return location, date_ctx
-
-    def get_response(self, message, location_name=None, date_context=None, start_date=None, end_date=None):
-        """Generate dynamic response based on real weather data"""
-        message = message.lower().strip()
+        snapshot identifies the weather the question is about (record id, payload hash);
+        when given, answers are cached under the normalized question and that snapshot.
+        context is the conversation session (see conversation.py); it is read for
+        follow-ups and updated in place with what this turn resolved.
+        """
+        base = None
+        if context and context.get("date"):
+            base = date.fromisoformat(context["date"])
+        parsed = self.engine.parse(message, base=base)
         
-        # Extract location and date from message if not provided
-        if not location_name:
-            loc, dt = self.parse_location_and_date(message)
-            if loc:
-                location_name = loc
-            if dt and not date_context:
-                date_context = dt
+        # Use location from message if not provided; a date named in the message beats the record's dates
+        if not location_name and parsed["location"]:
+            location_name = parsed["location"]
+        if not location_name and context:
+            location_name = context.get("location")
+        if parsed["date"]:
+            date_context = parsed["date"]
+        elif base:
+            date_context = base
 
         # If start_date is provided, use it as the primary date context
         if start_date and not date_context:
             try:
-                from datetime import datetime
                 if isinstance(start_date, str):
                     date_context = datetime.strptime(start_date, '%Y-%m-%d').date()
                 else:
@@ -586,10 +706,47 @@ class DynamicWeatherChatbot:
         if not location_name:
             return "I'd be happy to help! Please specify a location, for example: 'What should I wear in Mumbai?' or 'Is it good weather for a picnic in Delhi?'"
 
-        # Fetch real weather data with date range
-        weather_data, error = self.get_weather_for_location_with_dates(location_name, start_date, end_date)
-        if error:
-            return f"Sorry, {error}. Please check the location name and try again."
+        intents = parsed["intents"]
+        if not intents and context and context.get("intents"):
+            # "and the day after?" asks the previous question again
+            intents = context["intents"]
+        elif not intents and parsed["date"] and parsed["date"] != date.today():
+            # "what about friday?" carries only a date: treat it as a forecast question
+            intents = ["forecast"]
+
+        if snapshot is None:
+            response = self.compose_answer(intents, location_name, date_context, start_date, end_date, context)[0]
+        else:
+            key = (tuple(intents), location_name.strip().lower(), str(date_context), start_date or "", end_date or "", snapshot)
+            response = self.answer_cache.get(key)
+            if response is None:
+                response, cacheable = self.compose_answer(intents, location_name, date_context, start_date, end_date, context)
+                if cacheable:
+                    self.answer_cache.put(key, response, tag=snapshot[0])
+
+        if context is not None:
+            context["location"] = location_name
+            context["date"] = date_context.isoformat() if isinstance(date_context, date) else None
+            context["intents"] = intents
+            context.setdefault("turns", []).append([message, response])
+        return response
+
+    def compose_answer(self, intents, location_name, date_context=None, start_date=None, end_date=None, context=None):
+        """Fetch and analyze the weather, then answer the intents; returns (response, cacheable)"""
+        same_place = bool(context) and (context.get("location") or "").lower() == location_name.lower()
+        if same_place and context.get("weather") and time.time() - context.get("fetched_at", 0) < WEATHER_FRESHNESS_SECONDS:
+            # follow-up about the same place: reuse the weather resolved earlier in the conversation
+            weather_data = context["weather"]
+        else:
+            # Fetch real weather data with date range (skipping the geocode if the place is already resolved)
+            resolved = context.get("resolved") if same_place else None
+            weather_data, error = self.get_weather_for_location_with_dates(location_name, start_date, end_date, resolved)
+            if error:
+                return f"Sorry, {error}. Please check the location name and try again.", False
+            if context is not None:
+                context["resolved"] = weather_data.get("location")
+                context["weather"] = compact_weather(weather_data)
+                context["fetched_at"] = time.time()
 
         # Analyze the weather
         analysis = self.analyze_weather_context(weather_data, date_context)
@@ -601,29 +758,38 @@ class DynamicWeatherChatbot:
         elif date_context:
             date_info = f" (for {date_context})"
 
-        # Generate responses based on question type
-        if any(word in message for word in ['wear', 'clothes', 'clothing', 'dress', 'outfit']):
-            response = self.get_clothing_advice(analysis)
-            return response + date_info
+        # Answer every intent in the message, in priority order
+        answers = [self.answer_intent(intent, analysis, weather_data, date_context, date_info, start_date, end_date)
+                   for intent in intents]
+        if len(answers) == 1:
+            return answers[0], True
+        if answers:
+            return " ".join(a if a.rstrip().endswith((".", "!", "?")) else a + "." for a in answers), True
         
-        elif any(word in message for word in ['rain', 'umbrella', 'wet', 'precipitation']):
+        # Default comprehensive response
+        return f"Weather in {analysis['location']}{date_info}: around {analysis['current_temp']}°C (feels like {analysis['feels_like']}°C) with {analysis['condition']}. Humidity: {analysis['humidity']}%, Wind: {analysis['wind_speed']} m/s. Ask me about clothing, activities, or travel advice for this location!", True
+
+    def answer_intent(self, intent, analysis, weather_data, date_context=None, date_info="", start_date=None, end_date=None):
+        """Answer a single intent from the analyzed weather"""
+        if intent == "clothing":
+            return self.get_clothing_advice(analysis) + date_info
+        
+        elif intent == "rain":
             if analysis["precipitation"] in ["rainy", "stormy"]:
                 return f"Yes! It's expected to be {analysis['condition']} in {analysis['location']}{date_info}. Definitely bring an umbrella or waterproof jacket. Temperature around {analysis['current_temp']}°C."
             else:
                 return f"No rain expected in {analysis['location']}{date_info} - it should be {analysis['condition']} at around {analysis['current_temp']}°C. You can leave the umbrella at home!"
         
-        elif any(word in message for word in ['activity', 'activities', 'do', 'picnic', 'outdoor', 'visit']):
-            response = self.get_activity_advice(analysis)
-            return response + date_info
+        elif intent == "activity":
+            return self.get_activity_advice(analysis) + date_info
         
-        elif any(word in message for word in ['travel', 'drive', 'driving', 'flight', 'transport']):
-            response = self.get_travel_advice(analysis)
-            return response + date_info
+        elif intent == "travel":
+            return self.get_travel_advice(analysis) + date_info
         
-        elif any(word in message for word in ['temperature', 'temp', 'hot', 'cold', 'warm']):
+        elif intent == "temperature":
             return f"In {analysis['location']}{date_info}, expect around {analysis['current_temp']}°C (feels like {analysis['feels_like']}°C) with {analysis['condition']}. Humidity around {analysis['humidity']}% and wind speed {analysis['wind_speed']} m/s."
         
-        elif any(word in message for word in ['forecast', 'tomorrow', 'next', 'future']):
+        elif intent == "forecast":
             daily = weather_data.get("daily", [])
             
             # If user specified a date range, show forecast for that period
@@ -643,7 +809,7 @@ class DynamicWeatherChatbot:
                         target_day = d
                         break
 
-            if not target_day and re.search(r"\btomorrow\b", message, re.I) and len(daily) >= 2:
+            if not target_day and date_context == date.today() + timedelta(days=1) and len(daily) >= 2:
                 target_day = daily[1]
 
             if target_day:
@@ -658,30 +824,48 @@ class DynamicWeatherChatbot:
 
             return f"I don't have the forecast for {analysis['location']} right now. Current conditions: {analysis['condition']} at {analysis['current_temp']}°C."
         
-        elif any(word in message for word in ['humid', 'humidity']):
+        elif intent == "humidity":
             humidity = analysis['humidity']
             comfort = "very humid" if humidity > 80 else "humid" if humidity > 60 else "comfortable" if humidity > 30 else "dry"
             return f"Humidity in {analysis['location']}{date_info} should be around {humidity}% - that feels {comfort}. Temperature around {analysis['current_temp']}°C with {analysis['condition']}."
         
-        # Default comprehensive response
-        return f"Weather in {analysis['location']}{date_info}: around {analysis['current_temp']}°C (feels like {analysis['feels_like']}°C) with {analysis['condition']}. Humidity: {analysis['humidity']}%, Wind: {analysis['wind_speed']} m/s. Ask me about clothing, activities, or travel advice for this location!"
+        elif intent == "history":
+            return self.get_history_summary(analysis, weather_data)
+        
+        return ""
 
-    def get_weather_for_location_with_dates(self, location_name, start_date=None, end_date=None):
+    def get_history_summary(self, analysis, weather_data, days=30):
+        """Observed temperatures over the last days, from the collector's daily rollups"""
+        place = weather_data.get("location") or {}
+        buckets = daily_history(place["lat"], place["lon"], days) if place.get("lat") is not None else []
+        if not buckets:
+            return f"I don't have recorded history for {analysis['location']} yet - observations build up once a location is tracked. Right now it's {analysis['current_temp']}°C with {analysis['condition']}."
+        means = [b["temp_mean"] for b in buckets]
+        change = means[-1] - means[0]
+        trend = f"warmed by {change:.1f}°C" if change > 1 else f"cooled by {-change:.1f}°C" if change < -1 else "stayed fairly steady"
+        low, high = min(b["temp_min"] for b in buckets), max(b["temp_max"] for b in buckets)
+        return f"Over the last {len(buckets)} recorded day(s) in {analysis['location']}, temperatures averaged {sum(means) / len(means):.1f}°C, ranging from {low:.1f}°C to {high:.1f}°C. Daily averages have {trend} since {buckets[0]['start'][:10]}."
+
+    def get_weather_for_location_with_dates(self, location_name, start_date=None, end_date=None, resolved=None):
         """Fetch weather data for location with optional date filtering"""
         try:
-            # Geocode the location
-            location = self.geolocator.geocode(location_name, exactly_one=True)
-            if not location:
-                return None, f"Could not find location: {location_name}"
-            
-            lat, lon = location.latitude, location.longitude
+            if resolved:
+                # Location already resolved earlier in the conversation
+                name, lat, lon = resolved["name"], resolved["lat"], resolved["lon"]
+            else:
+                # Geocode the location
+                location = self.geolocator.geocode(location_name, exactly_one=True)
+                if not location:
+                    return None, f"Could not find location: {location_name}"
+                
+                name, lat, lon = location.address, location.latitude, location.longitude
             
             # Use the existing get_weather function which now supports date ranges
             weather_data = get_weather(lat, lon, start_date=start_date, end_date=end_date)
             
             # Add location information
             weather_data["location"] = {
-                "name": location.address,
+                "name": name,
                 "lat": lat,
                 "lon": lon
             }
@@ -800,11 +984,25 @@ class DynamicWeatherChatbot:
 # Initialize the dynamic chatbot
 _dynamic_chatbot = None
 
-def ai_chat_response(user_message, city, weather_data, start_date=None, end_date=None):
-    """Dynamic weather chatbot with location and date awareness"""
+def get_chatbot():
+    """Shared chatbot instance (and with it the answer cache)"""
     global _dynamic_chatbot
     if _dynamic_chatbot is None:
         _dynamic_chatbot = DynamicWeatherChatbot()
+    return _dynamic_chatbot
+
+def invalidate_chat_answers(record_id):
+    """Drop cached answers about a record after it is edited, refreshed or deleted"""
+    return get_chatbot().answer_cache.invalidate(record_id)
+
+def chat_cache_stats():
+    return get_chatbot().answer_cache.stats()
+
+def ai_chat_response(user_message, city, weather_data, start_date=None, end_date=None, snapshot=None, session_id=None):
+    """Dynamic weather chatbot with location and date awareness"""
+    chatbot = get_chatbot()
+    store = get_conversation_store() if session_id else None
+    context = (store.get(session_id) or {}) if store is not None else None
     
     try:
         # Parse date context from the message or use provided dates
@@ -823,41 +1021,22 @@ def ai_chat_response(user_message, city, weather_data, start_date=None, end_date
                 pass
         
         # Use the dynamic chatbot with the provided city, date context, and date range
-        response = _dynamic_chatbot.get_response(
+        response = chatbot.get_response(
             user_message, 
             location_name=city, 
             date_context=date_context,
             start_date=start_date,
-            end_date=end_date
+            end_date=end_date,
+            snapshot=snapshot,
+            context=context
         )
+        if store is not None:
+            store.save(session_id, context)
         return response
     except Exception as e:
         # Fallback to simple response
         date_info = f" for {start_date} to {end_date}" if start_date and end_date else ""
         return f"Sorry, I'm having trouble processing your request. Please try asking a different question about weather in {city}{date_info}."
 
-import numpy as np
-from sklearn.linear_model import LinearRegression
-
-def predict_next_temp(weather_data):
-    """Predict next temperature using linear regression on daily forecast data"""
-    daily_forecast = weather_data.get("daily", [])
-    if len(daily_forecast) < 2:
-        return None
-    
-    # Extract day temperatures from daily forecast
-    temps = []
-    for day in daily_forecast:
-        day_temp = day.get("temp", {}).get("day")
-        if day_temp is not None:
-            temps.append(day_temp)
-    
-    if len(temps) < 2:
-        return None
-    
-    X = np.arange(len(temps)).reshape(-1, 1)
-    y = np.array(temps)
-    model = LinearRegression().fit(X, y)
-    pred = model.predict([[len(temps)]])[0]
-    return round(pred, 2)
-
+# Trend prediction lives in predictor.py (closed-form NumPy, no scikit-learn)
+from predictor import predict_next_temp